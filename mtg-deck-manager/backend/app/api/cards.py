@@ -1,42 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
-from sqlalchemy.orm import Session
-from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple, Union
 from sqlalchemy import func
 
-from app.database import get_db
-from app.schemas import Card, CardCreate, CardSearch
-from app.crud import (
-    get_card, get_cards, search_cards, search_cards_advanced, create_card,
-    update_card, delete_card, autocomplete_card_names
+from app.database import get_async_db, get_read_db
+from app.schemas import Card, CardCreate, CardSearch, CardSuggestion
+from app.crud import async_crud as crud
+from app.crud import iter_cards, filter_plan_cache, search_result_cache, card_catalog, card_cooccurrence
+from app.utils import (
+    get_card_by_name, get_scryfall_cache, scryfall_to_card_model,
+    parse_scryfall_query, ScryfallQueryError, UnsupportedQuery, ScryfallSearch
 )
-from app.utils import get_card_by_name, scryfall_to_card_model
+from app.api.streaming import NDJSON_RESPONSES, ndjson_response, wants_ndjson
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Card])
-def read_cards(
+@router.get("/", response_model=List[Card], responses=NDJSON_RESPONSES)
+async def read_cards(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all cards
+
+    Pass the X-Next-Cursor header of one page as `cursor` to fetch the next page;
+    unlike `skip`, this stays fast at any depth.
+
+    With `Accept: application/x-ndjson` the whole catalog is streamed instead,
+    one card per line in ID order (paging parameters are ignored).
     """
-    cards = get_cards(db, skip=skip, limit=limit)
+    if wants_ndjson(request):
+        return ndjson_response(iter_cards, Card)
+
+    try:
+        cards, next_cursor = await crud.get_cards(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return cards
 
 
 @router.post("/", response_model=Card)
-def create_new_card(card: CardCreate, db: Session = Depends(get_db)):
+async def create_new_card(card: CardCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new card
     """
-    return create_card(db, card)
+    return await crud.create_card(db, card)
 
 
 @router.get("/search", response_model=List[Card])
-def search_cards_endpoint(
+async def search_cards_endpoint(
     response: Response,
     skip: int = 0,
     limit: int = 100,
@@ -46,15 +66,23 @@ def search_cards_endpoint(
     cmc: Optional[int] = None,
     rarity: Optional[str] = None,
     set_code: Optional[str] = None,
+    color_identity: Optional[str] = None,
     filter_type: Optional[str] = None,
     filter_json: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Search for cards with various filters
     
     Supports both simple filtering and complex filtering with nested AND/OR conditions.
     For complex filtering, provide the filter_json parameter with a JSON structure.
+    
+    Results are ordered by `sort` (id, name, cmc or relevance) and can be paged with
+    the X-Next-Cursor header passed back as `cursor`. Set include_total=false to
+    skip counting matches for X-Total-Count.
     """
     try:
         # Log the search parameters for debugging
@@ -75,20 +103,24 @@ def search_cards_endpoint(
         if filter_json:
             import json
             try:
-                filter_data = json.loads(filter_json)
-                print(f"Parsed filter JSON: {filter_data}")
+                # Parsed, normalized and compiled once per distinct filter
+                filter_plan = filter_plan_cache.plan_for_json(filter_json)
+                print(f"Using filter plan {filter_plan.key}: {filter_plan.tree}")
                 
                 # Use the advanced search function
-                cards, total_count = search_cards_advanced(
+                cards, total_count, next_cursor = await crud.search_cards_advanced(
                     db,
-                    filter_data=filter_data,
+                    filter_data=filter_plan,
                     skip=skip,
-                    limit=limit
+                    limit=limit,
+                    cursor=cursor,
+                    sort=sort,
+                    include_total=include_total
                 )
             except json.JSONDecodeError as e:
                 print(f"Error decoding filter JSON: {e}")
                 # Fall back to simple search if JSON parsing fails
-                cards, total_count = search_cards(
+                cards, total_count, next_cursor = await crud.search_cards(
                     db,
                     name=name,
                     colors=colors,
@@ -96,12 +128,16 @@ def search_cards_endpoint(
                     cmc=cmc_value,
                     rarity=rarity,
                     set_code=set_code,
+                    color_identity=color_identity,
                     skip=skip,
-                    limit=limit
+                    limit=limit,
+                    cursor=cursor,
+                    sort=sort,
+                    include_total=include_total
                 )
         else:
             # Use the simple search function
-            cards, total_count = search_cards(
+            cards, total_count, next_cursor = await crud.search_cards(
                 db,
                 name=name,
                 colors=colors,
@@ -109,17 +145,27 @@ def search_cards_endpoint(
                 cmc=cmc_value,
                 rarity=rarity,
                 set_code=set_code,
+                color_identity=color_identity,
                 skip=skip,
-                limit=limit
+                limit=limit,
+                cursor=cursor,
+                sort=sort,
+                include_total=include_total
             )
         
         print(f"Found {len(cards)} cards out of {total_count} total matching the search criteria")
         
-        # Set the total count in the response header
-        response.headers["X-Total-Count"] = str(total_count)
-        print(f"Setting X-Total-Count header to: {total_count}")
+        # Set the total count and next page cursor in the response headers
+        if total_count is not None:
+            response.headers["X-Total-Count"] = str(total_count)
+            print(f"Setting X-Total-Count header to: {total_count}")
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         return cards
+    except ValueError as e:
+        # Malformed cursor
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error in search_cards_endpoint: {str(e)}")
         print(f"Error type: {type(e)}")
@@ -131,31 +177,143 @@ def search_cards_endpoint(
         )
 
 
+@router.get("/search/scryfall", response_model=List[Union[Card, CardCreate]])
+async def search_cards_scryfall_syntax(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search for cards with Scryfall query syntax, e.g. `t:elf c>=g mv<=2 -o:trample`
+
+    Name words, "quoted phrases", !"exact names", c:, id:, t:, o:, mv:/cmc:, r:,
+    s:, f:, banned: and restricted: with `or`, `-` negation and parentheses are
+    answered from the local catalog, paged like /search. Queries using anything
+    else are sent to Scryfall, fetching only the result pages the requested
+    `skip`/`limit` window falls on; those cards have no local id. The
+    X-Search-Source header says which answered ("local" or "scryfall").
+    """
+    try:
+        filter_data = parse_scryfall_query(q)
+    except UnsupportedQuery as e:
+        print(f"Searching Scryfall for {q!r}: {e} can't be answered locally")
+        search = ScryfallSearch(q)
+        results = await search.cards(skip=skip, limit=limit)
+        response.headers["X-Search-Source"] = "scryfall"
+        if include_total and search.total_cards is not None:
+            response.headers["X-Total-Count"] = str(search.total_cards)
+        return [scryfall_to_card_model(card) for card in results]
+    except ScryfallQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        cards, total_count, next_cursor = await crud.search_cards_advanced(
+            db,
+            filter_data=filter_plan_cache.plan_for(filter_data),
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            include_total=include_total
+        )
+    except ValueError as e:
+        # Malformed cursor
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers["X-Search-Source"] = "local"
+    if total_count is not None:
+        response.headers["X-Total-Count"] = str(total_count)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return cards
+
+
+@router.get("/search/plan-cache")
+async def filter_plan_cache_stats():
+    """
+    Hit/miss statistics of the compiled advanced-filter plan cache
+    """
+    return filter_plan_cache.stats()
+
+
+@router.get("/search/cache")
+async def search_cache_stats():
+    """
+    Statistics of the search result cache
+    """
+    return search_result_cache.stats()
+
+
+@router.get("/search/catalog")
+async def catalog_stats():
+    """
+    Size and memory use of the in-memory card catalog searches are evaluated against
+    """
+    return card_catalog.stats()
+
+
+@router.get("/scryfall-cache")
+async def scryfall_cache_stats():
+    """
+    Statistics of the Scryfall response cache
+    """
+    cache = get_scryfall_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
 @router.get("/autocomplete", response_model=List[str])
-def autocomplete_cards(
+async def autocomplete_cards(
     name_prefix: str = Query(..., min_length=1),
     limit: int = 10,
-    db: Session = Depends(get_db)
+    fuzzy: bool = False,
+    max_distance: int = Query(2, ge=0, le=3),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Autocomplete card names (optionally tolerating typos with fuzzy=true)
+    """
+    return await crud.autocomplete_card_names(db, name_prefix, limit=limit, fuzzy=fuzzy, max_distance=max_distance)
+
+
+@router.get("/suggestions", response_model=List[CardSuggestion])
+async def suggest_cards(
+    card_ids: List[int] = Query(..., max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Autocomplete card names
+    Suggest cards often played alongside the given cards (e.g. a partial
+    deck), scored by how often decks with those cards also play them
+    """
+    suggestions = await crud.get_card_suggestions(db, card_ids, limit=limit)
+    return [{"card": card, "score": score, "decks": decks} for card, score, decks in suggestions]
+
+
+@router.get("/cooccurrence")
+async def cooccurrence_stats():
+    """
+    Size of the card co-occurrence matrix suggestions are computed from
     """
-    results = autocomplete_card_names(db, name_prefix, limit)
-    return [result[0] for result in results]
+    return card_cooccurrence.stats()
 
 
 @router.post("/fetch-from-scryfall", response_model=Card)
 async def fetch_card_from_scryfall(
     name: str = Query(..., min_length=1),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Fetch a card from Scryfall API and save it to the database
     """
     # First check if the card already exists in our database
-    existing_card = search_cards(db, name=name, limit=1)
+    existing_card = await crud.get_card_by_name(db, name)
     if existing_card:
-        return existing_card[0]
+        return existing_card
     
     # Fetch from Scryfall
     scryfall_data = await get_card_by_name(name)
@@ -164,37 +322,37 @@ async def fetch_card_from_scryfall(
     
     # Convert to our model and save
     card_data = scryfall_to_card_model(scryfall_data)
-    return create_card(db, card_data)
+    return await crud.create_card(db, card_data)
 
 
 @router.get("/{card_id}", response_model=Card)
-def read_card(card_id: int, db: Session = Depends(get_db)):
+async def read_card(card_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Get a specific card by ID
     """
-    db_card = get_card(db, card_id=card_id)
+    db_card = await crud.get_card(db, card_id=card_id)
     if db_card is None:
         raise HTTPException(status_code=404, detail="Card not found")
     return db_card
 
 
 @router.put("/{card_id}", response_model=Card)
-def update_existing_card(card_id: int, card: CardCreate, db: Session = Depends(get_db)):
+async def update_existing_card(card_id: int, card: CardCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Update a card
     """
-    db_card = update_card(db, card_id=card_id, card_data=card.model_dump())
+    db_card = await crud.update_card(db, card_id=card_id, card_data=card.model_dump())
     if db_card is None:
         raise HTTPException(status_code=404, detail="Card not found")
     return db_card
 
 
 @router.delete("/{card_id}")
-def delete_existing_card(card_id: int, db: Session = Depends(get_db)):
+async def delete_existing_card(card_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a card
     """
-    success = delete_card(db, card_id=card_id)
+    success = await crud.delete_card(db, card_id=card_id)
     if not success:
         raise HTTPException(status_code=404, detail="Card not found")
     return {"ok": True}
\ No newline at end of file
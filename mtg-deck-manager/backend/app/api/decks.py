@@ -1,109 +1,290 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 import asyncio
+import hashlib
+import json
 
-from app.database import get_db
+from app.database import get_async_db, get_read_db
 from app.schemas import (
-    Deck, DeckCreate, DeckWithCards, DeckImport, 
-    DeckCard, DeckCardCreate, DeckStatistics
+    Deck, DeckCreate, DeckWithCards, DeckSummary, DeckImport, 
+    DeckCard, DeckCardCreate, DeckStatistics, ImportJobStatus, SimilarDeck, CardSuggestion,
+    DeckProbabilities
 )
-from app.crud import (
-    get_deck, get_decks, create_deck, update_deck, delete_deck,
-    add_card_to_deck, remove_card_from_deck, update_card_in_deck,
-    get_deck_statistics
-)
-from app.utils import import_deck_to_db
+from app.crud import async_crud as crud
+from app.crud.deck_probabilities import PROBABILITY_SAMPLES, PROBABILITY_MAX_SAMPLES
+from app.crud import iter_decks_with_cards, deck_similarity_index, probability_cache
+from app.utils import import_deck_to_db, import_jobs, ScryfallUnavailable
+from app.api.streaming import NDJSON_RESPONSES, ndjson_response, wants_ndjson
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Deck])
-def read_decks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[DeckSummary], responses=NDJSON_RESPONSES)
+async def read_decks(request: Request, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_read_db)):
     """
-    Get all decks
+    Get all decks (summaries only; fetch a deck by ID for its cards)
+
+    With `Accept: application/x-ndjson` every deck is streamed instead, with
+    its cards, one deck per line in ID order (paging parameters are ignored).
     """
-    decks = get_decks(db, skip=skip, limit=limit)
+    if wants_ndjson(request):
+        return ndjson_response(iter_decks_with_cards, DeckWithCards)
+
+    decks = await crud.get_decks(db, skip=skip, limit=limit)
     return decks
 
 
 @router.post("/", response_model=Deck, status_code=status.HTTP_201_CREATED)
-def create_new_deck(deck: DeckCreate, db: Session = Depends(get_db)):
+async def create_new_deck(deck: DeckCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new deck
     """
-    return create_deck(db, deck)
+    return await crud.create_deck(db, deck)
+
+
+@router.get("/stats", response_model=Dict[int, DeckStatistics])
+async def get_many_deck_stats(
+    deck_ids: List[int] = Query(..., max_length=500),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get statistics for many decks in one call, keyed by deck ID
+    (unknown deck IDs are omitted)
+    """
+    return await crud.get_decks_statistics(db, deck_ids=deck_ids)
+
+
+@router.get("/similarity")
+async def get_similarity_index_stats():
+    """
+    Size and LSH settings of the deck similarity index
+    """
+    return deck_similarity_index.stats()
+
+
+@router.get("/probabilities")
+async def get_probability_cache_stats():
+    """
+    Size and hit rate of the deck probability result cache
+    """
+    return probability_cache.stats()
+
+
+def _submit_imports(deck_imports: List[DeckImport]) -> List[dict]:
+    try:
+        jobs = import_jobs.submit(deck_imports)
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many imports are waiting; try again shortly",
+            headers={"Retry-After": "5"}
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return [job.to_dict() for job in jobs]
+
+
+@router.post("/import/jobs", response_model=ImportJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_import_job(deck_import: DeckImport):
+    """
+    Queue a deck import in MTGA format and return its job immediately;
+    follow it with GET /import/jobs/{job_id} or its /events stream
+    """
+    return _submit_imports([deck_import])[0]
+
+
+@router.post("/import/jobs/batch", response_model=List[ImportJobStatus], status_code=status.HTTP_202_ACCEPTED)
+async def submit_import_batch(deck_imports: List[DeckImport] = Body(..., min_length=1, max_length=100)):
+    """
+    Queue many deck imports at once; cards shared between the decks are
+    resolved once for the whole batch
+    """
+    return _submit_imports(deck_imports)
+
+
+def _get_import_job(job_id: str):
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.get("/import/jobs/{job_id}", response_model=ImportJobStatus)
+async def get_import_job(job_id: str):
+    """
+    Get the status and progress of a deck import job
+    """
+    return _get_import_job(job_id).to_dict()
+
+
+@router.get("/import/jobs/{job_id}/events")
+async def stream_import_job(job_id: str):
+    """
+    Server-sent events with the job's status each time it changes, ending
+    once the import has succeeded or failed
+    """
+    job = _get_import_job(job_id)
+
+    async def events():
+        while True:
+            data = ImportJobStatus.model_validate(job.to_dict()).model_dump_json()
+            yield f"event: {job.status}\ndata: {data}\n\n"
+            if job.finished:
+                break
+            # Repeat the status as a keep-alive when nothing happens for a while
+            await job.wait_for_change(timeout=15)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
 
 
 @router.get("/{deck_id}", response_model=DeckWithCards)
-def read_deck(deck_id: int, db: Session = Depends(get_db)):
+async def read_deck(deck_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Get a specific deck by ID
     """
-    db_deck = get_deck(db, deck_id=deck_id)
+    db_deck = await crud.get_deck(db, deck_id=deck_id)
     if db_deck is None:
         raise HTTPException(status_code=404, detail="Deck not found")
     return db_deck
 
 
 @router.put("/{deck_id}", response_model=Deck)
-def update_existing_deck(deck_id: int, deck: DeckCreate, db: Session = Depends(get_db)):
+async def update_existing_deck(deck_id: int, deck: DeckCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Update a deck
     """
-    db_deck = update_deck(db, deck_id=deck_id, deck_data=deck)
+    db_deck = await crud.update_deck(db, deck_id=deck_id, deck_data=deck)
     if db_deck is None:
         raise HTTPException(status_code=404, detail="Deck not found")
     return db_deck
 
 
 @router.delete("/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_existing_deck(deck_id: int, db: Session = Depends(get_db)):
+async def delete_existing_deck(deck_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a deck
     """
-    success = delete_deck(db, deck_id=deck_id)
+    success = await crud.delete_deck(db, deck_id=deck_id)
     if not success:
         raise HTTPException(status_code=404, detail="Deck not found")
     return {"ok": True}
 
 
+@router.get("/{deck_id}/similar", response_model=List[SimilarDeck])
+async def read_similar_decks(
+    deck_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    min_similarity: float = Query(0.0, ge=0.0, le=1.0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get the decks with the most similar card lists, most similar first
+
+    Similarity is the Jaccard similarity of the two decks' cards (main deck
+    and sideboard, counting copies and ignoring printings), estimated from
+    MinHash signatures. Only decks sharing an LSH bucket are compared, so
+    decks much less similar than the index's threshold (see /similarity) are
+    usually left out; set min_similarity near 1 to find near-duplicates.
+    """
+    matches = await crud.get_similar_decks(db, deck_id, limit=limit, min_similarity=min_similarity)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return [
+        {**DeckSummary.model_validate(deck).model_dump(), "similarity": similarity}
+        for deck, similarity in matches
+    ]
+
+
+@router.get("/{deck_id}/suggestions", response_model=List[CardSuggestion])
+async def read_deck_suggestions(
+    deck_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Suggest cards often played alongside the deck's cards in other decks,
+    best first; cards already in the deck are left out
+    """
+    suggestions = await crud.get_deck_suggestions(db, deck_id, limit=limit)
+    if suggestions is None:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return [{"card": card, "score": score, "decks": decks} for card, score, decks in suggestions]
+
+
+@router.get("/{deck_id}/probabilities", response_model=DeckProbabilities)
+async def read_deck_probabilities(
+    deck_id: int,
+    turns: int = Query(10, ge=1, le=20),
+    on_the_draw: bool = False,
+    keep_min_lands: int = Query(2, ge=0, le=7),
+    keep_max_lands: int = Query(5, ge=0, le=7),
+    max_mulligans: int = Query(2, ge=0, le=6),
+    samples: int = Query(PROBABILITY_SAMPLES, ge=1000, le=PROBABILITY_MAX_SAMPLES),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get opening hand, land drop and castability odds of the deck's main deck
+
+    Opening hand and land drop odds are exact. Each spell gets the chance it
+    can be cast by each turn (a copy drawn and enough lands in play, one
+    played per turn when available): exact when every land produces the
+    spell's colors, otherwise estimated from `samples` simulated shuffles.
+    Results are cached by deck composition.
+    """
+    if keep_min_lands > keep_max_lands:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="keep_min_lands must not be greater than keep_max_lands"
+        )
+    probabilities = await crud.get_deck_probabilities(
+        db, deck_id, turns=turns, on_the_draw=on_the_draw, keep_min_lands=keep_min_lands,
+        keep_max_lands=keep_max_lands, max_mulligans=max_mulligans, samples=samples
+    )
+    if probabilities is None:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return probabilities
+
+
 @router.post("/{deck_id}/cards", response_model=DeckCard)
-def add_card_to_existing_deck(
-    deck_id: int, deck_card: DeckCardCreate, db: Session = Depends(get_db)
+async def add_card_to_existing_deck(
+    deck_id: int, deck_card: DeckCardCreate, db: AsyncSession = Depends(get_async_db)
 ):
     """
     Add a card to a deck
     """
-    db_deck = get_deck(db, deck_id=deck_id)
+    db_deck = await crud.get_deck(db, deck_id=deck_id)
     if db_deck is None:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    return add_card_to_deck(db, deck_id=deck_id, deck_card=deck_card)
+    return await crud.add_card_to_deck(db, deck_id=deck_id, deck_card=deck_card)
 
 
 @router.delete("/{deck_id}/cards/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_card_from_existing_deck(
-    deck_id: int, card_id: int, db: Session = Depends(get_db)
+async def remove_card_from_existing_deck(
+    deck_id: int, card_id: int, db: AsyncSession = Depends(get_async_db)
 ):
     """
     Remove a card from a deck
     """
-    success = remove_card_from_deck(db, deck_id=deck_id, card_id=card_id)
+    success = await crud.remove_card_from_deck(db, deck_id=deck_id, card_id=card_id)
     if not success:
         raise HTTPException(status_code=404, detail="Card not found in deck")
     return {"ok": True}
 
 
 @router.put("/{deck_id}/cards/{card_id}", response_model=DeckCard)
-def update_card_in_existing_deck(
+async def update_card_in_existing_deck(
     deck_id: int, card_id: int, quantity: int, is_sideboard: bool = False, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a card in a deck (quantity and sideboard status)
     """
-    db_deck_card = update_card_in_deck(
+    db_deck_card = await crud.update_card_in_deck(
         db, deck_id=deck_id, card_id=card_id, 
         quantity=quantity, is_sideboard=is_sideboard
     )
@@ -113,18 +294,32 @@ def update_card_in_existing_deck(
 
 
 @router.get("/{deck_id}/stats", response_model=DeckStatistics)
-def get_deck_stats(deck_id: int, db: Session = Depends(get_db)):
+async def get_deck_stats(
+    deck_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)
+):
     """
     Get statistics for a deck
+
+    The response carries an ETag; clients that send it back in If-None-Match
+    get an empty 304 response while the statistics are unchanged.
     """
-    stats = get_deck_statistics(db, deck_id=deck_id)
+    stats = await crud.get_deck_statistics(db, deck_id=deck_id)
     if stats is None:
         raise HTTPException(status_code=404, detail="Deck not found")
+
+    digest = hashlib.sha1(json.dumps(stats, sort_keys=True).encode()).hexdigest()
+    etag = f'"{deck_id}-{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
     return stats
 
 
 @router.post("/import", response_model=Deck, status_code=status.HTTP_201_CREATED)
-async def import_deck(deck_import: DeckImport, db: Session = Depends(get_db)):
+async def import_deck(deck_import: DeckImport, db: AsyncSession = Depends(get_async_db)):
     """
     Import a deck from MTGA format
     """
@@ -146,7 +341,10 @@ async def import_deck(deck_import: DeckImport, db: Session = Depends(get_db)):
         )
         
         # Get the created deck with all its cards
-        return get_deck(db, deck_id=result["deck_id"])
+        return await crud.get_deck(db, deck_id=result["deck_id"])
+    except ScryfallUnavailable as e:
+        # Nothing was saved; the import can be retried once Scryfall answers
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         # Log the error
         print(f"Error importing deck: {str(e)}")
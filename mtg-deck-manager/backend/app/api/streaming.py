@@ -0,0 +1,50 @@
+from typing import Callable, Iterable, Type
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.database import ReadSessionLocal
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# OpenAPI description of the streaming alternative of a list endpoint
+NDJSON_RESPONSES = {200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for a newline-delimited JSON stream"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(rows: Callable[[Session], Iterable], schema: Type[BaseModel],
+                    chunk_size: int = 64 * 1024) -> StreamingResponse:
+    """
+    Stream the rows produced by `rows(db)` as one JSON object per line.
+
+    Rows are serialized as they are fetched and written out in small chunks, so
+    the first bytes go out immediately and memory does not grow with the size
+    of the collection. The stream opens its own read-only session because it
+    outlives the request's session.
+    """
+    def generate():
+        db = ReadSessionLocal()
+        try:
+            chunk = []
+            size = 0
+            for row in rows(db):
+                line = schema.model_validate(row).model_dump_json() + "\n"
+                chunk.append(line)
+                size += len(line)
+                if size >= chunk_size:
+                    yield "".join(chunk)
+                    chunk = []
+                    size = 0
+            if chunk:
+                yield "".join(chunk)
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
@@ -1,11 +1,21 @@
 from app.crud.deck import (
-    get_deck, get_decks, create_deck, update_deck, delete_deck,
-    add_card_to_deck, remove_card_from_deck, update_card_in_deck,
-    get_deck_statistics
+    get_deck, get_decks, iter_decks_with_cards, create_deck, update_deck, delete_deck,
+    add_card_to_deck, add_cards_to_deck, remove_card_from_deck, update_card_in_deck,
+    get_deck_statistics, get_decks_statistics, get_similar_decks, get_deck_suggestions,
+    get_deck_probabilities
 )
 
 from app.crud.card import (
-    get_card, get_card_by_scryfall_id, get_card_by_name, get_cards,
+    get_card, get_card_by_scryfall_id, get_card_by_name, get_cards, iter_cards,
+    get_cards_by_names, get_cards_by_printings,
     search_cards, search_cards_advanced, create_card, update_card, delete_card,
-    get_or_create_card, autocomplete_card_names
-)
\ No newline at end of file
+    get_or_create_card, bulk_get_or_create_cards, autocomplete_card_names,
+    get_card_suggestions,
+    filter_plan_cache
+)
+from app.crud.result_cache import search_result_cache
+from app.crud.columnar import card_catalog
+from app.crud.deck_similarity import deck_similarity_index
+from app.crud.card_cooccurrence import card_cooccurrence
+from app.crud.deck_indexes import refresh_deck_indexes, invalidate_deck_indexes
+from app.crud.deck_probabilities import probability_cache
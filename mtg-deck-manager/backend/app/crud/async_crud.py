@@ -0,0 +1,169 @@
+"""
+Async versions of the CRUD functions for the API's AsyncSession.
+
+Each wraps the sync implementation, so the query logic, caches and indexes
+stay in one place. AsyncSession.run_sync runs the function on the event
+loop's thread (only the driver's I/O is awaited), so it is used for calls
+that mostly wait on the database. Calls that do real work in Python - the
+in-memory catalog, name index and deck indexes, and the writes that update
+them - go through run_in_thread instead, which keeps the loop free to serve
+other requests meanwhile. Deck probabilities are computed on a worker thread
+after the deck has been read, without holding a session.
+
+Results are serialized after the call returns, where lazy loads are not
+possible, so any relationship a response schema reads is loaded before
+returning.
+"""
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import card, deck
+from app.crud.deck_probabilities import cached_deck_probabilities
+from app.crud.filter_plans import FilterPlan
+from app.database import thread_sessionmaker_for
+from app.models import Card, Deck, DeckCard
+from app.schemas import CardCreate, DeckCardCreate, DeckCreate
+
+T = TypeVar("T")
+
+
+async def run_in_thread(db: AsyncSession, function: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a sync CRUD function on a worker thread with a short-lived sync Session
+    on the same database and pool (read-only or not) as `db`
+    """
+    session_factory = thread_sessionmaker_for(db)
+
+    def call():
+        with session_factory() as session:
+            return function(session, *args, **kwargs)
+
+    return await anyio.to_thread.run_sync(call)
+
+
+# Cards
+
+async def get_card(db: AsyncSession, card_id: int) -> Optional[Card]:
+    return await db.run_sync(card.get_card, card_id)
+
+
+async def get_card_by_name(db: AsyncSession, name: str) -> Optional[Card]:
+    return await db.run_sync(card.get_card_by_name, name)
+
+
+async def get_cards(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                    sort: str = "id") -> Tuple[List[Card], Optional[str]]:
+    return await db.run_sync(card.get_cards, skip=skip, limit=limit, cursor=cursor, sort=sort)
+
+
+async def search_cards(db: AsyncSession, **filters) -> Tuple[List[Card], Optional[int], Optional[str]]:
+    return await run_in_thread(db, card.search_cards, **filters)
+
+
+async def search_cards_advanced(db: AsyncSession, filter_data: Union[Dict[str, Any], FilterPlan],
+                                **options) -> Tuple[List[Card], Optional[int], Optional[str]]:
+    return await run_in_thread(db, card.search_cards_advanced, filter_data, **options)
+
+
+async def create_card(db: AsyncSession, card_data: CardCreate) -> Card:
+    return await run_in_thread(db, card.create_card, card_data)
+
+
+async def update_card(db: AsyncSession, card_id: int, card_data: Dict[str, Any]) -> Optional[Card]:
+    return await run_in_thread(db, card.update_card, card_id, card_data)
+
+
+async def delete_card(db: AsyncSession, card_id: int) -> bool:
+    return await run_in_thread(db, card.delete_card, card_id)
+
+
+async def autocomplete_card_names(db: AsyncSession, name_prefix: str, **options) -> List[str]:
+    return await run_in_thread(db, card.autocomplete_card_names, name_prefix, **options)
+
+
+async def get_card_suggestions(db: AsyncSession, card_ids: List[int], limit: int = 20) -> List[Tuple[Card, float, int]]:
+    return await run_in_thread(db, card.get_card_suggestions, card_ids, limit=limit)
+
+
+# Decks
+
+async def get_deck(db: AsyncSession, deck_id: int) -> Optional[Deck]:
+    return await db.run_sync(deck.get_deck, deck_id)
+
+
+async def get_decks(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Deck]:
+    return await db.run_sync(deck.get_decks, skip=skip, limit=limit)
+
+
+async def create_deck(db: AsyncSession, deck_data: DeckCreate) -> Deck:
+    def create(session):
+        db_deck = deck.create_deck(session, deck_data)
+        return deck.get_deck(session, db_deck.id)
+    return await db.run_sync(create)
+
+
+async def update_deck(db: AsyncSession, deck_id: int, deck_data: DeckCreate) -> Optional[Deck]:
+    def update(session):
+        if deck.update_deck(session, deck_id, deck_data) is None:
+            return None
+        return deck.get_deck(session, deck_id)
+    return await db.run_sync(update)
+
+
+async def delete_deck(db: AsyncSession, deck_id: int) -> bool:
+    return await run_in_thread(db, deck.delete_deck, deck_id)
+
+
+def _with_card(db_deck_card: Optional[DeckCard]) -> Optional[DeckCard]:
+    """Load a deck entry's card, which the DeckCard schema includes"""
+    if db_deck_card is not None:
+        db_deck_card.card
+    return db_deck_card
+
+
+async def add_card_to_deck(db: AsyncSession, deck_id: int, deck_card: DeckCardCreate) -> DeckCard:
+    return await run_in_thread(
+        db, lambda session: _with_card(deck.add_card_to_deck(session, deck_id, deck_card))
+    )
+
+
+async def remove_card_from_deck(db: AsyncSession, deck_id: int, card_id: int) -> bool:
+    return await run_in_thread(db, deck.remove_card_from_deck, deck_id, card_id)
+
+
+async def update_card_in_deck(db: AsyncSession, deck_id: int, card_id: int, quantity: int,
+                              is_sideboard: bool) -> Optional[DeckCard]:
+    return await run_in_thread(
+        db, lambda session: _with_card(deck.update_card_in_deck(session, deck_id, card_id, quantity, is_sideboard))
+    )
+
+
+async def get_deck_statistics(db: AsyncSession, deck_id: int) -> Optional[dict]:
+    return await db.run_sync(deck.get_deck_statistics, deck_id)
+
+
+async def get_decks_statistics(db: AsyncSession, deck_ids: List[int]) -> Dict[int, dict]:
+    return await db.run_sync(deck.get_decks_statistics, deck_ids)
+
+
+async def get_similar_decks(db: AsyncSession, deck_id: int, limit: int = 10,
+                            min_similarity: float = 0.0) -> Optional[List[Tuple[Deck, float]]]:
+    return await run_in_thread(db, deck.get_similar_decks, deck_id, limit=limit, min_similarity=min_similarity)
+
+
+async def get_deck_suggestions(db: AsyncSession, deck_id: int,
+                               limit: int = 20) -> Optional[List[Tuple[Card, float, int]]]:
+    return await run_in_thread(db, deck.get_deck_suggestions, deck_id, limit=limit)
+
+
+async def get_deck_probabilities(db: AsyncSession, deck_id: int, **options) -> Optional[dict]:
+    # Only the deck read uses the session; the computation runs on a worker
+    # thread without holding a connection
+    entries = await db.run_sync(deck.get_deck_entries, deck_id)
+    if entries is None:
+        return None
+    result, cached = await anyio.to_thread.run_sync(partial(cached_deck_probabilities, entries, **options))
+    return {**result, "cached": cached}
@@ -1,11 +1,31 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional, Dict, Any, Union, Tuple
-from app.models import Card
+from sqlalchemy import or_, and_, not_, tuple_, insert, func, false
+from typing import List, Optional, Dict, Any, Union, Tuple, Hashable, Callable
+from app.models import Card, DeckCard
+from app.models.card_fields import card_derived_fields, color_mask, subset_masks, superset_masks
+from app.models.card_search import cards_fts, fts_can_search, fts_matches
+from app.crud.stats_cache import deck_stats_cache
+from app.crud.deck_indexes import refresh_deck_indexes, sync_deck_indexes
+from app.crud.card_cooccurrence import card_cooccurrence
+from app.crud.name_index import card_name_index
+from app.crud.query_cache import bump_catalog_version, sync_catalog_generation
+from app.crud.filter_plans import FilterPlan, FilterPlanCache, canonical_colors
+from app.crud.result_cache import search_result_cache
+from app.crud.columnar import CatalogResult, UnsupportedSearch, card_catalog
 from app.schemas import CardCreate
+import base64
 import json
 
 
+# Columns cards can be ordered by for keyset pagination; NULLs are coalesced
+# so (sort value, id) is always comparable
+SORT_COLUMNS = {
+    "id": Card.id,
+    "name": func.coalesce(Card.name, ""),
+    "cmc": func.coalesce(Card.cmc, -1),
+}
+
+
 def get_card(db: Session, card_id: int):
     return db.query(Card).filter(Card.id == card_id).first()
 
@@ -18,26 +38,247 @@ def get_card_by_name(db: Session, name: str):
     return db.query(Card).filter(Card.name == name).first()
 
 
-def get_cards(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Card).offset(skip).limit(limit).all()
+def get_cards_by_names(db: Session, names: List[str]) -> Dict[str, Card]:
+    """Look up many cards by exact name in one query (first printing per name)"""
+    cards = {}
+    for card in db.query(Card).filter(Card.name.in_(names)).order_by(Card.id):
+        cards.setdefault(card.name, card)
+    return cards
+
+
+def get_cards_by_printings(db: Session, printings: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Card]:
+    """Look up many cards by (set_code, collector_number) in one query"""
+    query = db.query(Card).filter(tuple_(Card.set_code, Card.collector_number).in_(printings))
+    return {(card.set_code, card.collector_number): card for card in query}
+
+
+def encode_cursor(sort_value: Any, card_id: int) -> str:
+    payload = json.dumps([sort_value, card_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        sort_value, card_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, int(card_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def paginate(query, sort_key, cursor: Optional[str] = None, skip: int = 0,
+             limit: int = 100) -> Tuple[List[Card], Optional[str]]:
+    """
+    Order a card query by (sort_key, id) and fetch one page.
+
+    With a cursor the page starts right after the row it points at (keyset
+    pagination, constant cost at any depth); without one, `skip` rows are skipped.
+    Returns the cards and the cursor for the next page, or None on the last page.
+    """
+    query = query.add_columns(sort_key.label("sort_key")).order_by(sort_key, Card.id)
+    if cursor:
+        sort_value, card_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_key > sort_value,
+            and_(sort_key == sort_value, Card.id > card_id)
+        ))
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    cards = [card for card, _ in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last_card, last_sort_value = rows[limit - 1]
+        next_cursor = encode_cursor(last_sort_value, last_card.id)
+    return cards, next_cursor
+
+
+def fold_text(value: Optional[str]) -> Optional[str]:
+    """
+    Case-fold a substring search term for use in a cache key; only ASCII is
+    folded since SQLite's LIKE ignores case for ASCII letters only
+    """
+    if value and value.isascii():
+        return value.lower()
+    return value
+
+
+def cached_search(db: Session, query, sort_key, key: Hashable, cursor: Optional[str] = None,
+                  skip: int = 0, limit: int = 100, include_total: bool = True,
+                  catalog_search: Optional[Callable[[], Optional[CatalogResult]]] = None
+                  ) -> Tuple[List[Card], Optional[int], Optional[str]]:
+    """
+    Fetch one page of a search through search_result_cache.
+
+    The first request for a search stores its ordered (sort value, id) rows and
+    total; later pages, by skip or by cursor, are then sliced from the cached
+    rows and loaded by primary key. Searches matching more than
+    search_result_cache.max_ids cards only have their total cached and page
+    through SQL. Cursors are the same either way, so a walk can continue after
+    the cache entry expires. Catalog changes committed by other processes
+    (bulk loads) are picked up before the lookup (see sync_catalog_generation).
+
+    `catalog_search` evaluates the search against the in-memory card catalog
+    (returning None when it can't); when given, misses and searches too large
+    to cache are answered from it instead of SQL.
+    """
+    sync_catalog_generation(db)
+    entry = search_result_cache.get(key)
+    result = None
+    if (entry is None or entry["rows"] is None) and catalog_search is not None:
+        version = search_result_cache.snapshot()
+        result = catalog_search()
+        if result is not None and entry is None:
+            rows = result.rows() if len(result) <= search_result_cache.max_ids else None
+            entry = {"total": len(result), "rows": rows}
+            search_result_cache.put(key, entry["total"], entry["rows"], version)
+
+    if entry is None:
+        version = search_result_cache.snapshot()
+        max_ids = search_result_cache.max_ids
+        rows = (
+            query.with_entities(Card.id, sort_key.label("sort_key"))
+            .order_by(sort_key, Card.id)
+            .limit(max_ids + 1)
+            .all()
+        )
+        if len(rows) > max_ids:
+            entry = {"total": query.count() if include_total else None, "rows": None}
+        else:
+            entry = {"total": len(rows), "rows": [[sort_value, card_id] for card_id, sort_value in rows]}
+        search_result_cache.put(key, entry["total"], entry["rows"], version)
+    elif entry["total"] is None and include_total:
+        version = search_result_cache.snapshot()
+        entry["total"] = len(result) if result is not None else query.count()
+        search_result_cache.put(key, entry["total"], entry["rows"], version)
+
+    total_count = entry["total"] if include_total else None
+    rows = entry["rows"]
+    size = len(rows) if rows is not None else len(result) if result is not None else None
+
+    start = skip
+    if size is not None and cursor:
+        _, card_id = decode_cursor(cursor)
+        if rows is not None:
+            start = next((i + 1 for i, (_, row_id) in enumerate(rows) if row_id == card_id), None)
+        else:
+            start = result.position_after(card_id)
+
+    if size is None or start is None:
+        cards, next_cursor = paginate(query, sort_key, cursor, skip, limit)
+        return cards, total_count, next_cursor
+
+    page = rows[start:start + limit] if rows is not None else result.rows(start, start + limit)
+    by_id = {card.id: card for card in db.query(Card).filter(Card.id.in_([row_id for _, row_id in page]))}
+    cards = [by_id[row_id] for _, row_id in page if row_id in by_id]
+    next_cursor = encode_cursor(*page[-1]) if page and start + limit < size else None
+    return cards, total_count, next_cursor
+
+
+def catalog_search(db: Session, tree: Optional[Dict[str, Any]], order: str) -> Optional[CatalogResult]:
+    """
+    Evaluate a normalized filter tree against the in-memory card catalog, or
+    None if the catalog isn't built or can't evaluate the filter exactly like SQL
+    """
+    if not card_catalog.ready:
+        return None
+    card_catalog.sync(db)
+    try:
+        return card_catalog.search(tree, order)
+    except UnsupportedSearch:
+        return None
+
+
+def iter_cards(db: Session, batch_size: int = 500):
+    """
+    Iterate over the whole catalog in id order, fetching `batch_size` rows at a
+    time so memory stays flat however large the catalog is
+    """
+    return db.query(Card).order_by(Card.id).yield_per(batch_size)
+
+
+def get_cards(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+              sort: str = "id") -> Tuple[List[Card], Optional[str]]:
+    return paginate(db.query(Card), SORT_COLUMNS.get(sort, Card.id), cursor, skip, limit)
+
+
+def text_contains(field: str, value: str):
+    """
+    Clause matching cards whose text `field` contains `value` (case-insensitive),
+    answered from the full-text index when possible instead of a LIKE scan
+    """
+    if fts_can_search(field, value):
+        return Card.id.in_(fts_matches(field, value).with_only_columns(cards_fts.c.rowid))
+    return getattr(Card, field).ilike(f"%{value}%")
+
+
+# Bitmask column behind each color field, and the comparison each operator makes
+COLOR_MASK_COLUMNS = {"colors": Card.color_mask, "color_identity": Card.color_identity_mask}
+COLOR_OPERATORS = {
+    "contains": "superset", "superset": "superset", "includes": "superset",
+    "subset": "subset", "within": "subset",
+    "is": "exactly", "exactly": "exactly",
+}
+
+
+def color_clause(field: str, value: str, operator: str = "superset"):
+    """
+    Compare a color field against a set of colors ("W,U", "WU" or "C" for colorless)
+    using its indexed bitmask column: superset (has all the colors), subset (has
+    only these colors, e.g. playable in a commander deck of that identity) or exactly.
+    Subset and superset are expanded to IN lists of masks so they can use the index.
+    """
+    column = COLOR_MASK_COLUMNS[field]
+    mask = color_mask(value)
+    comparison = COLOR_OPERATORS[operator]
+    if comparison == "superset":
+        return column.in_(superset_masks(mask))
+    if comparison == "subset":
+        return column.in_(subset_masks(mask))
+    return column == mask
 
 
 def search_cards(db: Session, name: Optional[str] = None, colors: Optional[str] = None,
                 type_line: Optional[str] = None, cmc: Optional[int] = None,
                 rarity: Optional[str] = None, set_code: Optional[str] = None,
-                skip: int = 0, limit: int = 100) -> Tuple[List[Card], int]:
+                color_identity: Optional[str] = None, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                sort: Optional[str] = None,
+                include_total: bool = True) -> Tuple[List[Card], Optional[int], Optional[str]]:
+    """
+    Search cards with simple filters.
+
+    `colors` matches cards having all the given colors; `color_identity` matches
+    cards whose identity lies within the given colors (commander deck legality).
+    Results are ordered by `sort` ("id", "name", "cmc" or, for name searches,
+    "relevance", the default) and paginated by cursor or skip; pages are served
+    through the search result cache (see cached_search), with misses evaluated
+    against the in-memory card catalog unless ranked by relevance.
+    Returns (cards, total count or None if not requested, next page cursor).
+    """
     query = db.query(Card)
+    sort_key = SORT_COLUMNS.get(sort, Card.id)
     
-    if name:
+    if name and fts_can_search("name", name):
+        matches = fts_matches("name", name).subquery()
+        query = query.join(matches, matches.c.rowid == Card.id)
+        if sort in (None, "relevance"):
+            # Rank name matches by relevance
+            sort_key = matches.c.rank
+    elif name:
         query = query.filter(Card.name.ilike(f"%{name}%"))
     
     if colors:
-        # For each color in the search, check if it's in the card's colors
-        for color in colors.split(','):
-            query = query.filter(Card.colors.like(f"%{color}%"))
+        # Cards that have every color in the search
+        query = query.filter(color_clause("colors", colors, "superset"))
+    
+    if color_identity:
+        # Cards playable in a deck of this color identity
+        query = query.filter(color_clause("color_identity", color_identity, "subset"))
     
     if type_line:
-        query = query.filter(Card.type_line.ilike(f"%{type_line}%"))
+        query = query.filter(text_contains("type_line", type_line))
     
     if cmc is not None:
         query = query.filter(Card.cmc == cmc)
@@ -48,13 +289,32 @@ def search_cards(db: Session, name: Optional[str] = None, colors: Optional[str]
     if set_code:
         query = query.filter(Card.set_code == set_code)
     
-    # Get total count before applying pagination
-    total_count = query.count()
+    order = sort if sort in SORT_COLUMNS else "id"
+    if sort_key is not SORT_COLUMNS.get(sort, Card.id):
+        order = "relevance"
+    key = (
+        "simple", fold_text(name), canonical_colors(colors) if colors else None,
+        canonical_colors(color_identity) if color_identity else None,
+        fold_text(type_line), cmc, rarity, set_code, order
+    )
     
-    # Apply pagination and return results
-    cards = query.offset(skip).limit(limit).all()
+    # The same filters as a filter tree for the in-memory catalog, which can't
+    # rank by relevance
+    evaluate = None
+    if order != "relevance":
+        conditions = [
+            {"field": "name", "operator": "contains", "value": name} if name else None,
+            {"field": "colors", "operator": "superset", "value": colors} if colors else None,
+            {"field": "color_identity", "operator": "subset", "value": color_identity} if color_identity else None,
+            {"field": "type_line", "operator": "contains", "value": type_line} if type_line else None,
+            {"field": "cmc", "operator": "equals", "value": cmc} if cmc is not None else None,
+            {"field": "rarity", "operator": "is", "value": rarity} if rarity else None,
+            {"field": "set_code", "operator": "is", "value": set_code} if set_code else None,
+        ]
+        tree = {"type": "AND", "conditions": [c for c in conditions if c is not None], "groups": []}
+        evaluate = lambda: catalog_search(db, tree, order)
     
-    return cards, total_count
+    return cached_search(db, query, sort_key, key, cursor, skip, limit, include_total, evaluate)
 
 
 def create_card(db: Session, card: CardCreate):
@@ -66,33 +326,58 @@ def create_card(db: Session, card: CardCreate):
         mana_cost=card.mana_cost,
         cmc=card.cmc,
         colors=card.colors,
+        color_identity=card.color_identity,
         rarity=card.rarity,
         set_code=card.set_code,
         collector_number=card.collector_number,
         oracle_text=card.oracle_text,
-        additional_data=card.additional_data
+        additional_data=card.additional_data,
+        **card_derived_fields(card)
     )
     db.add(db_card)
     db.commit()
     db.refresh(db_card)
+    bump_catalog_version()
+    card_name_index.add(db_card.name)
     return db_card
 
 
+def _decks_containing(db: Session, card_id: int) -> List[int]:
+    return [deck_id for deck_id, in db.query(DeckCard.deck_id).filter(DeckCard.card_id == card_id).distinct()]
+
+
 def update_card(db: Session, card_id: int, card_data: Dict[str, Any]):
     db_card = get_card(db, card_id)
     if db_card:
+        old_name = db_card.name
         for key, value in card_data.items():
             setattr(db_card, key, value)
+        for key, value in card_derived_fields(db_card).items():
+            setattr(db_card, key, value)
         db.commit()
         db.refresh(db_card)
+        card_catalog.update(db_card)
+        bump_catalog_version()
+        deck_stats_cache.clear()
+        if db_card.name != old_name:
+            card_name_index.remove(old_name)
+            card_name_index.add(db_card.name)
+            refresh_deck_indexes(db, _decks_containing(db, card_id))
     return db_card
 
 
 def delete_card(db: Session, card_id: int):
     db_card = get_card(db, card_id)
     if db_card:
+        name = db_card.name
+        deck_ids = _decks_containing(db, card_id)
         db.delete(db_card)
         db.commit()
+        card_catalog.remove(card_id)
+        bump_catalog_version()
+        deck_stats_cache.clear()
+        card_name_index.remove(name)
+        refresh_deck_indexes(db, deck_ids)
         return True
     return False
 
@@ -109,19 +394,143 @@ def get_or_create_card(db: Session, card_data: CardCreate):
     if db_card:
         return db_card
     
-    # Create a new card if not found
-    return create_card(db, card_data)
+    # Create a new card if not found; if another request inserted it meanwhile
+    # the insert is skipped and that row is returned
+    db_card = bulk_get_or_create_cards(db, [card_data])[0]
+    db.commit()
+    return db_card
+
+
+def insert_cards_ignoring_conflicts(db: Session, rows: List[Dict[str, Any]]) -> List[str]:
+    """
+    INSERT card rows, skipping any whose Scryfall ID already exists (e.g. inserted
+    by a concurrent import) instead of raising an IntegrityError.
+    Returns the names of the rows actually inserted.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.execute(insert(Card), rows)
+        return [row["name"] for row in rows]
+
+    statement = dialect_insert(Card).on_conflict_do_nothing(index_elements=[Card.scryfall_id])
+    return list(db.scalars(statement.returning(Card.name), rows))
+
+
+def bulk_get_or_create_cards(db: Session, cards: List[CardCreate]) -> List[Card]:
+    """
+    Resolve many cards at once, inserting the missing ones with one bulk INSERT.
+
+    Matches by Scryfall ID first and then by name, like get_or_create_card, but
+    with a single IN query and without committing; the caller owns the transaction.
+    Cards inserted concurrently by another transaction are reused, not duplicated.
+    Returns the Card rows aligned with `cards`.
+    """
+    def lookup():
+        scryfall_ids = [card.scryfall_id for card in cards if card.scryfall_id]
+        names = [card.name for card in cards]
+        by_scryfall_id, by_name = {}, {}
+        for db_card in db.query(Card).filter(
+            or_(Card.scryfall_id.in_(scryfall_ids), Card.name.in_(names))
+        ).order_by(Card.id):
+            if db_card.scryfall_id:
+                by_scryfall_id.setdefault(db_card.scryfall_id, db_card)
+            by_name.setdefault(db_card.name, db_card)
+        return [
+            by_scryfall_id.get(card.scryfall_id) or by_name.get(card.name)
+            for card in cards
+        ]
+
+    db_cards = lookup()
+
+    missing = {}
+    for card, db_card in zip(cards, db_cards):
+        if db_card is None:
+            missing.setdefault(card.scryfall_id or card.name, {
+                **card.model_dump(),
+                **card_derived_fields(card)
+            })
+    if not missing:
+        return db_cards
+
+    inserted = insert_cards_ignoring_conflicts(db, list(missing.values()))
+    if inserted:
+        bump_catalog_version()
+        card_name_index.add_many(inserted)
+    return lookup()
+
+
+def autocomplete_card_names(db: Session, name_prefix: str, limit: int = 10,
+                            fuzzy: bool = False, max_distance: int = 2) -> List[str]:
+    """
+    Card names starting with `name_prefix` (ignoring case and diacritics, and
+    matching either face of split/double-faced cards), served from the in-memory
+    name index. With `fuzzy`, names within `max_distance` typos are returned too.
+    """
+    card_name_index.sync(db)
+    
+    results = card_name_index.complete(name_prefix, limit)
+    if fuzzy and len(results) < limit:
+        for name in card_name_index.fuzzy(name_prefix, max_distance, limit):
+            if name not in results:
+                results.append(name)
+    return results[:limit]
+
+
+def suggest_cards_for_names(db: Session, names: List[str], limit: int = 20) -> List[Tuple[Card, float, int]]:
+    """
+    Cards most often played alongside the named cards across every deck, as
+    (card, score, decks playing the card) tuples, best first. The score is the
+    share of decks playing each named card that also play the suggestion,
+    averaged over the named cards; each suggestion is returned as its
+    lowest-ID printing.
+    """
+    sync_deck_indexes(db)
+    suggestions = card_cooccurrence.suggest(names, limit=limit)
+    if not suggestions:
+        return []
+    card_ids = db.query(func.min(Card.id)).filter(
+        Card.name.in_([name for name, _, _ in suggestions])
+    ).group_by(Card.name)
+    cards = {card.name: card for card in db.query(Card).filter(Card.id.in_(card_ids.scalar_subquery()))}
+    return [(cards[name], score, decks) for name, score, decks in suggestions if name in cards]
 
 
-def autocomplete_card_names(db: Session, name_prefix: str, limit: int = 10):
-    return db.query(Card.name).filter(
-        Card.name.ilike(f"{name_prefix}%")
-    ).distinct().limit(limit).all()
+def get_card_suggestions(db: Session, card_ids: List[int], limit: int = 20) -> List[Tuple[Card, float, int]]:
+    """
+    Cards most often played alongside the given cards, e.g. a deck being built
+    (see suggest_cards_for_names)
+    """
+    names = [name for name, in db.query(Card.name).filter(Card.id.in_(card_ids)).distinct()]
+    return suggest_cards_for_names(db, names, limit=limit)
 
 
 # Function removed - replaced by build_condition_clause
 
 
+# Legality statuses each legality operator accepts
+LEGALITY_STATUSES = {
+    "legal": ["legal", "restricted"],
+    "banned": ["banned"],
+    "restricted": ["restricted"],
+}
+
+
+def legality_clause(format_name: str, operator: str = "legal"):
+    """
+    Cards legal in (or banned or restricted in) a format, e.g. "modern"
+    """
+    statuses = LEGALITY_STATUSES.get(operator)
+    if statuses is None:
+        print(f"Warning: Unsupported operator {operator} for field legality")
+        return None
+    status = Card.additional_data["legalities"][format_name.lower()].as_string()
+    return status.in_(statuses)
+
+
 def build_condition_clause(condition: Dict[str, Any]):
     """Build a SQLAlchemy filter clause from a condition"""
     field = condition.get('field')
@@ -131,29 +540,30 @@ def build_condition_clause(condition: Dict[str, Any]):
     if not field or not operator or value is None or value == '':
         return None
     
+    # Format legality, read from the legalities Scryfall data stored with each card
+    if field == 'legality':
+        return legality_clause(str(value), operator)
+    
     # Get the model attribute
     model_attr = getattr(Card, field, None)
     if not model_attr:
         print(f"Warning: Field {field} not found in Card model")
         return None
     
-    # Handle special case for colors
-    if field == 'colors' and operator == 'contains':
-        # For colors, we need to check if each color is in the card's colors
-        clauses = []
-        for color in value.split(','):
-            if color:
-                clauses.append(model_attr.like(f"%{color}%"))
-        if clauses:
-            return and_(*clauses)
-        return None
+    # Color fields are compared through their bitmask columns
+    if field in COLOR_MASK_COLUMNS and operator in COLOR_OPERATORS:
+        return color_clause(field, value, operator)
     
     # Apply the operator
     try:
         if operator == 'is':
             return model_attr == value
         elif operator == 'contains':
-            return model_attr.ilike(f"%{value}%")
+            return text_contains(field, value)
+        elif operator == 'equals_ignoring_case':
+            # LIKE without wildcards; % and _ in the value match literally
+            literal = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            return model_attr.ilike(literal, escape="\\")
         elif operator == 'starts_with':
             return model_attr.ilike(f"{value}%")
         elif operator == 'ends_with':
@@ -201,14 +611,20 @@ def process_filter_group(group: Dict[str, Any]):
     # Combine all clauses based on group type
     if all_clauses:
         if group_type == 'AND':
-            return and_(*all_clauses)
+            clause = and_(*all_clauses)
         else:  # OR
-            return or_(*all_clauses)
+            clause = or_(*all_clauses)
+        if group.get('not'):
+            # Negated group; cards it can't be evaluated for (NULL columns) don't match it
+            clause = not_(func.coalesce(clause, false()))
+        return clause
     
     return None
 
 
-def search_cards_advanced(db: Session, filter_data: Dict[str, Any], skip: int = 0, limit: int = 100) -> Tuple[List[Card], int]:
+def search_cards_advanced(db: Session, filter_data: Union[Dict[str, Any], FilterPlan], skip: int = 0, limit: int = 100,
+                          cursor: Optional[str] = None, sort: Optional[str] = None,
+                          include_total: bool = True) -> Tuple[List[Card], Optional[int], Optional[str]]:
     """
     Search for cards with complex filter conditions
     
@@ -226,29 +642,40 @@ def search_cards_advanced(db: Session, filter_data: Dict[str, Any], skip: int =
         "groups": [
             {
                 "type": "AND" or "OR",
+                "not": true,  # optional, matches the cards the group doesn't
                 "conditions": [...],
                 "groups": [...]
             },
             ...
         ]
     }
+    
+    Besides the card columns, conditions may use the "legality" field with the
+    "legal", "banned" or "restricted" operator and a format name as the value.
+    
+    The filter is normalized and compiled once into a cached FilterPlan (a plan
+    from filter_plan_cache may also be passed directly), so repeated and paged
+    searches reuse the same clause and SQLAlchemy's compiled-statement cache;
+    pages are served through the search result cache (see cached_search), with
+    misses evaluated against the in-memory card catalog when it supports the filter.
     """
-    query = db.query(Card)
+    plan = filter_data if isinstance(filter_data, FilterPlan) else filter_plan_cache.plan_for(filter_data)
     
-    # Process the filter structure
-    filter_clause = process_filter_group(filter_data)
+    query = db.query(Card)
     
     # Apply the filter if it exists
-    if filter_clause is not None:
-        query = query.filter(filter_clause)
+    if plan.clause is not None:
+        query = query.filter(plan.clause)
     
-    # Get total count before applying pagination
-    total_count = query.count()
+    order = sort if sort in SORT_COLUMNS else "id"
     
-    # Apply pagination and return results
-    cards = query.offset(skip).limit(limit).all()
-    
-    return cards, total_count
+    return cached_search(db, query, SORT_COLUMNS[order], ("advanced", plan.key, order),
+                         cursor, skip, limit, include_total,
+                         lambda: catalog_search(db, plan.tree, order))
+
+
+# Duplicate function removed
 
 
-# Duplicate function removed
\ No newline at end of file
+# Compiled advanced-search filters, shared by every request
+filter_plan_cache = FilterPlanCache(process_filter_group)
@@ -0,0 +1,270 @@
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Changed matrix entries kept in the delta before it is merged into the CSR
+# arrays: at least this many, or a twentieth of the stored entries
+MERGE_MIN_ENTRIES = 50000
+MERGE_FRACTION = 0.05
+
+# Pair counts gathered while building are aggregated once this many are pending
+BUILD_MERGE_ENTRIES = 8_000_000
+
+
+def _aggregate(keys: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum the counts of equal keys, returning sorted distinct keys without zero counts"""
+    keys, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, weights=counts, minlength=len(keys)).astype(np.int64)
+    nonzero = counts != 0
+    return keys[nonzero], counts[nonzero]
+
+
+@lru_cache(maxsize=256)
+def _upper_pairs(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    return np.triu_indices(size, 1)
+
+
+class CardCooccurrence:
+    """
+    Sparse card x card matrix counting the decks that play both cards
+
+    Cards are identified by name, so printings count as one card. The matrix
+    is symmetric; the diagonal (decks playing each card) is kept as a dense
+    vector and the rest in CSR arrays (row pointers, column indices, counts).
+    Deck changes are applied as +1/-1 updates to a small row -> {column: change}
+    delta, which is merged into the CSR arrays once it grows, so updates
+    never rewrite the whole matrix.
+
+    Suggestions for a set of cards are one sparse matrix-vector product: the
+    rows of those cards, each weighted by one over its deck count, summed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self.stale = False
+        # Persisted catalog generation the index was built at (see deck_indexes)
+        self.generation = None
+
+    def _reset(self):
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.deck_counts = np.zeros(0, dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.data = np.zeros(0, dtype=np.int32)
+        self._delta: Dict[int, Dict[int, int]] = {}
+        self._delta_entries = 0
+        self._decks: Dict[int, np.ndarray] = {}
+        self._building = False
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._pending_entries = 0
+
+    def _code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+            if code >= len(self.deck_counts):
+                grown = np.zeros(max(1024, 2 * len(self.deck_counts)), dtype=np.int64)
+                grown[:len(self.deck_counts)] = self.deck_counts
+                self.deck_counts = grown
+        return code
+
+    # Maintenance
+
+    @contextmanager
+    def building(self):
+        """
+        Rebuild the matrix from the decks passed to put_many inside the block
+        (see deck_indexes.build_deck_indexes); queries wait until it is done
+        """
+        with self._lock:
+            self._reset()
+            self.ready = False
+            self._building = True
+            try:
+                yield
+                keys, counts = self._merge_pending()
+            except BaseException:
+                # Drop the partial matrix and pending counts; the next sync builds it again
+                self._reset()
+                self.stale = True
+                raise
+            finally:
+                self._building = False
+            self._store(keys, counts)
+            self.ready = True
+            self.stale = False
+
+    def invalidate(self):
+        """Rebuild on the next sync, for bulk changes to card names"""
+        self.stale = True
+
+    def put_many(self, decks: Dict[int, Dict[str, int]]):
+        """Add or replace decks given as card name -> quantity"""
+        with self._lock:
+            if not self._building:
+                self.apply(decks, decks)
+                return
+            pairs = []
+            for deck_id, cards in decks.items():
+                codes = sorted({self._code(name) for name, quantity in cards.items() if quantity > 0})
+                if not codes:
+                    continue
+                codes = np.array(codes, dtype=np.int64)
+                self._decks[deck_id] = codes.astype(np.int32)
+                self.deck_counts[codes] += 1
+                # Pairs above the diagonal; the lower half is mirrored when stored
+                rows, columns = _upper_pairs(len(codes))
+                pairs.append((codes[rows] << 32) | codes[columns])
+            if pairs:
+                keys = np.concatenate(pairs)
+                self._pending.append(_aggregate(keys, np.ones(len(keys), dtype=np.int64)))
+                self._pending_entries += len(self._pending[-1][0])
+                if self._pending_entries > BUILD_MERGE_ENTRIES:
+                    self._pending = [self._merge_pending()]
+                    self._pending_entries = len(self._pending[0][0])
+
+    def _merge_pending(self) -> Tuple[np.ndarray, np.ndarray]:
+        if not self._pending:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        keys = np.concatenate([keys for keys, _ in self._pending])
+        counts = np.concatenate([counts for _, counts in self._pending])
+        self._pending = []
+        return _aggregate(keys, counts)
+
+    def _store(self, keys: np.ndarray, counts: np.ndarray):
+        """Replace the CSR arrays with upper-triangle (row << 32 | column) counts, mirrored"""
+        rows, columns = keys >> 32, keys & 0xFFFFFFFF
+        rows, columns = np.concatenate((rows, columns)), np.concatenate((columns, rows))
+        counts = np.concatenate((counts, counts))
+        order = np.lexsort((columns, rows))
+        self.indices = columns[order].astype(np.int32)
+        self.data = counts[order].astype(np.int32)
+        self.indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.names)), out=self.indptr[1:])
+
+    def apply(self, deck_ids: Iterable[int], contents: Dict[int, Dict[str, int]]):
+        """
+        Update changed decks to their current contents; decks missing from
+        `contents` no longer exist or have no cards and are dropped
+        """
+        with self._lock:
+            for deck_id in deck_ids:
+                cards = contents.get(deck_id, {})
+                new = {self._code(name) for name, quantity in cards.items() if quantity > 0}
+                old = set(self._decks.pop(deck_id, np.zeros(0, dtype=np.int32)).tolist())
+                if new:
+                    self._decks[deck_id] = np.array(sorted(new), dtype=np.int32)
+                self._change_pairs(new - old, new, 1)
+                self._change_pairs(old - new, old, -1)
+            if self._delta_entries > max(MERGE_MIN_ENTRIES, len(self.data) * MERGE_FRACTION):
+                self._merge_delta()
+
+    def _change_pairs(self, changed: set, cards: set, change: int):
+        """
+        Add `change` to every pair of a deck's `cards` involving a `changed`
+        card, the pairs that appear or disappear when those cards are added
+        to or removed from the deck
+        """
+        for card in changed:
+            self.deck_counts[card] += change
+            for other in cards:
+                if other == card:
+                    continue
+                self._bump(card, other, change)
+                if other not in changed:
+                    self._bump(other, card, change)
+
+    def _bump(self, row: int, column: int, change: int):
+        entries = self._delta.setdefault(row, {})
+        if column not in entries:
+            self._delta_entries += 1
+        entries[column] = entries.get(column, 0) + change
+
+    def _merge_delta(self):
+        rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        upper = rows < self.indices
+        keys = [(rows[upper] << 32) | self.indices[upper]]
+        counts = [self.data[upper].astype(np.int64)]
+        for row, entries in self._delta.items():
+            columns = np.fromiter((column for column in entries if column > row), dtype=np.int64)
+            keys.append((row << 32) | columns)
+            counts.append(np.fromiter((entries[column] for column in columns.tolist()), dtype=np.int64))
+        self._store(*_aggregate(np.concatenate(keys), np.concatenate(counts)))
+        self._delta = {}
+        self._delta_entries = 0
+
+    # Queries
+
+    def scores(self, names: Iterable[str]) -> Optional[np.ndarray]:
+        """
+        Score every card against a set of cards: the share of decks playing
+        each of the cards that also play the candidate, averaged over the cards.
+        None if none of the cards appears in any deck.
+        """
+        with self._lock:
+            codes = [code for code in {self._codes.get(name) for name in names} if code is not None]
+            codes = [code for code in codes if self.deck_counts[code] > 0]
+            if not codes:
+                return None
+            codes = np.array(codes, dtype=np.int64)
+            weights = 1.0 / self.deck_counts[codes]
+            # Gather the cards' CSR rows and sum them, each scaled by its weight
+            # (cards added since the last merge only have delta rows)
+            stored = codes < len(self.indptr) - 1
+            starts, stops = self.indptr[codes[stored]], self.indptr[codes[stored] + 1]
+            lengths = stops - starts
+            positions = np.repeat(stops - lengths.cumsum(), lengths) + np.arange(lengths.sum())
+            scores = np.bincount(
+                self.indices[positions],
+                weights=self.data[positions] * np.repeat(weights[stored], lengths),
+                minlength=len(self.names)
+            ).astype(np.float64)  # bincount returns integers when no row was gathered
+            for code, weight in zip(codes.tolist(), weights.tolist()):
+                for column, change in self._delta.get(code, {}).items():
+                    scores[column] += change * weight
+            return scores / len(codes)
+
+    def suggest(self, names: Iterable[str], limit: int = 20,
+                exclude: Iterable[str] = ()) -> List[Tuple[str, float, int]]:
+        """
+        Cards most often played alongside `names`, as (name, score, decks
+        playing the card) tuples, best first; the cards themselves and
+        `exclude` are left out
+        """
+        names = set(names)
+        with self._lock:
+            scores = self.scores(names)
+            if scores is None:
+                return []
+            for name in names.union(exclude):
+                code = self._codes.get(name)
+                if code is not None:
+                    scores[code] = 0
+            candidates = np.flatnonzero(scores > 0)
+            order = np.lexsort((candidates, -scores[candidates]))[:limit]
+            return [
+                (self.names[code], float(scores[code]), int(self.deck_counts[code]))
+                for code in candidates[order].tolist()
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "cards": int(np.count_nonzero(self.deck_counts)),
+                "decks": len(self._decks),
+                "stored_entries": len(self.data),
+                "delta_entries": self._delta_entries,
+                "bytes": self.indptr.nbytes + self.indices.nbytes + self.data.nbytes + self.deck_counts.nbytes
+            }
+
+
+card_cooccurrence = CardCooccurrence()
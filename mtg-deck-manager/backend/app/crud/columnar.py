@@ -0,0 +1,380 @@
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Card
+from app.models.card_fields import color_mask, subset_masks, superset_masks
+from app.models.card_search import fts_can_search
+from app.crud.query_cache import catalog_generation
+
+
+# Rows fetched per round trip when loading the catalog
+LOAD_BATCH_SIZE = 5000
+
+# Columns loaded into the catalog, in query order
+_LOADED_COLUMNS = [
+    Card.id, Card.name, Card.type_line, Card.primary_type, Card.rarity, Card.set_code,
+    Card.cmc, Card.color_mask, Card.color_identity_mask
+]
+
+STRING_FIELDS = ["name", "type_line", "primary_type", "rarity", "set_code"]
+MASK_FIELDS = {"colors": "color_mask", "color_identity": "color_identity_mask"}
+
+# Case folding of each text matcher: SQLite's LIKE lowercases ASCII letters
+# only, the trigram FTS index folds Unicode letters too
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+FOLDS = {
+    "like": lambda value: value.translate(_ASCII_LOWER),
+    "fts": str.lower,
+}
+
+
+class UnsupportedSearch(Exception):
+    """A filter the catalog can't evaluate exactly like the SQL path"""
+
+
+class StringColumn:
+    """
+    Dictionary-encoded string column: each card stores a code into a table of
+    distinct values (code 0 is NULL), so a predicate runs once per distinct
+    value and reaches every card through one indexing operation
+    """
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.values: List[Optional[str]] = [None]
+        self._codes: Dict[str, int] = {}
+        self._folded: Dict[str, List[str]] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code_of(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def folded(self, fold: str) -> List[str]:
+        """The values case-folded by FOLDS[fold], extended as the table grows"""
+        folded = self._folded.setdefault(fold, [""])
+        if len(folded) < len(self.values):
+            folded.extend(map(FOLDS[fold], self.values[len(folded):]))
+        return folded
+
+    def lookup(self, predicate: Callable[[str], bool], fold: str) -> np.ndarray:
+        """Boolean table of predicate(folded value) for every code, False for NULL"""
+        values = self.folded(fold)
+        table = np.zeros(len(values), dtype=bool)
+        table[1:] = np.fromiter(map(predicate, values[1:]), dtype=bool, count=len(values) - 1)
+        return table
+
+    def nbytes(self) -> int:
+        # The strings are shared by the list and the dict, so count them once
+        folded = sum(
+            sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+            for values in self._folded.values()
+        )
+        return (
+            sum(sys.getsizeof(value) for value in self.values)
+            + sys.getsizeof(self.values) + sys.getsizeof(self._codes) + folded
+        )
+
+
+class CatalogResult:
+    """
+    Matching card ids in (sort value, id) order; `values` holds the sort value
+    of each, or codes into `labels` for string sort keys
+    """
+
+    def __init__(self, ids: np.ndarray, values: np.ndarray, labels: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.values = values
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List[list]:
+        """[sort value, id] pairs, as cached by search_result_cache and encoded in cursors"""
+        values = self.values[start:stop]
+        if self.labels is not None:
+            values = self.labels[values].tolist()
+        elif values.dtype.kind == "f":
+            values = [int(value) if value.is_integer() else value for value in values.tolist()]
+        else:
+            values = values.tolist()
+        return [[value, card_id] for value, card_id in zip(values, self.ids[start:stop].tolist())]
+
+    def position_after(self, card_id: int) -> Optional[int]:
+        """Index of the row following `card_id`, or None if it isn't in the result"""
+        positions = np.flatnonzero(self.ids == card_id)
+        return int(positions[0]) + 1 if len(positions) else None
+
+
+class CardCatalog:
+    """
+    Read-optimized, in-memory copy of the searchable card columns
+
+    Numeric columns (cmc, color bitmasks) are NumPy arrays and string columns
+    are dictionary-encoded (see StringColumn), so a filter tree is evaluated as
+    vectorized boolean masks instead of a SQL scan. Rows are kept in id order;
+    new cards are appended on the next search, edits and deletes are applied
+    through update() and remove(), and the catalog is rebuilt when the
+    persisted catalog generation moves (a bulk load in another process) or
+    after invalidate().
+    Filters it can't evaluate exactly like SQL raise UnsupportedSearch.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self.stale = False
+        # Persisted catalog generation the catalog was built at
+        self.generation = None
+
+    def _reset(self):
+        self.size = 0
+        self.max_id = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.cmc = np.zeros(0, dtype=np.float32)  # NaN for NULL
+        self.color_mask = np.zeros(0, dtype=np.uint8)  # 0 for NULL, which no filter matches
+        self.color_identity_mask = np.zeros(0, dtype=np.uint8)
+        self.alive = np.zeros(0, dtype=bool)
+        self.strings = {
+            "name": StringColumn(np.int32),
+            "type_line": StringColumn(np.int32),
+            "primary_type": StringColumn(np.int16),
+            "rarity": StringColumn(np.int16),
+            "set_code": StringColumn(np.int16),
+        }
+        self.codes = {field: np.zeros(0, dtype=column.dtype) for field, column in self.strings.items()}
+        self._name_order = None
+
+    def build(self, db: Session):
+        """
+        (Re)build the catalog from every card in the database
+        """
+        with self._lock:
+            # Read first, so a change committed during the load triggers another rebuild
+            self.generation = catalog_generation(db)
+            self._reset()
+            self._load(db)
+            self.ready = True
+            self.stale = False
+
+    def sync(self, db: Session):
+        """
+        Bring a built catalog up to date: rebuild it if it was invalidated or
+        other processes changed existing cards since it was built, otherwise
+        append cards inserted since the last sync
+        """
+        if not self.ready:
+            return
+        with self._lock:
+            if self.stale or catalog_generation(db) != self.generation:
+                self.build(db)
+            elif (db.query(func.max(Card.id)).scalar() or 0) > self.max_id:
+                self._load(db)
+
+    def invalidate(self):
+        """Rebuild on the next sync, for bulk changes to existing cards"""
+        self.stale = True
+
+    def _load(self, db: Session):
+        rows = db.query(*_LOADED_COLUMNS).filter(Card.id > self.max_id).order_by(Card.id)
+        batch = []
+        for row in rows.execution_options(yield_per=LOAD_BATCH_SIZE):
+            batch.append(row)
+            if len(batch) == LOAD_BATCH_SIZE:
+                self._append(batch)
+                batch = []
+        if batch:
+            self._append(batch)
+
+    def _grow(self, needed: int):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for attribute in ("ids", "cmc", "color_mask", "color_identity_mask", "alive"):
+            setattr(self, attribute, _resized(getattr(self, attribute), capacity))
+        self.codes = {field: _resized(codes, capacity) for field, codes in self.codes.items()}
+
+    def _append(self, rows: list):
+        start, stop = self.size, self.size + len(rows)
+        self._grow(stop)
+        columns = list(zip(*rows))
+        self.ids[start:stop] = columns[0]
+        for offset, field in enumerate(STRING_FIELDS, start=1):
+            encode = self.strings[field].encode
+            self.codes[field][start:stop] = [encode(value) for value in columns[offset]]
+        self.cmc[start:stop] = [np.nan if value is None else value for value in columns[6]]
+        self.color_mask[start:stop] = [value or 0 for value in columns[7]]
+        self.color_identity_mask[start:stop] = [value or 0 for value in columns[8]]
+        self.alive[start:stop] = True
+        self.size = stop
+        self.max_id = int(self.ids[stop - 1])
+        self._name_order = None
+
+    def _position(self, card_id: int) -> Optional[int]:
+        position = int(np.searchsorted(self.ids[:self.size], card_id))
+        if position < self.size and self.ids[position] == card_id:
+            return position
+        return None
+
+    def update(self, card: Card):
+        """Apply an edited card's values (cards not loaded yet arrive with the next sync)"""
+        with self._lock:
+            position = self._position(card.id)
+            if position is None:
+                return
+            for field in STRING_FIELDS:
+                self.codes[field][position] = self.strings[field].encode(getattr(card, field))
+            self.cmc[position] = np.nan if card.cmc is None else card.cmc
+            self.color_mask[position] = card.color_mask or 0
+            self.color_identity_mask[position] = card.color_identity_mask or 0
+            self._name_order = None
+
+    def remove(self, card_id: int):
+        with self._lock:
+            position = self._position(card_id)
+            if position is not None:
+                self.alive[position] = False
+
+    # Evaluation
+
+    def _text_mask(self, field: str, operator: str, value: str) -> np.ndarray:
+        column = self.strings[field]
+        if operator == "is":
+            table = np.zeros(len(column.values), dtype=bool)
+            code = column.code_of(value)
+            if code is not None:
+                table[code] = True
+        else:
+            # The FTS index matches the term literally; LIKE treats % and _ as wildcards
+            fold = "fts" if operator == "contains" and fts_can_search(field, value) else "like"
+            if fold == "like" and ("%" in value or "_" in value):
+                raise UnsupportedSearch(f"wildcard in {field} {operator} {value}")
+            term = FOLDS[fold](value)
+            if operator == "contains":
+                table = column.lookup(lambda text: term in text, fold)
+            elif operator == "equals_ignoring_case":
+                table = column.lookup(lambda text: text == term, fold)
+            elif operator == "starts_with":
+                table = column.lookup(lambda text: text.startswith(term), fold)
+            elif operator == "ends_with":
+                table = column.lookup(lambda text: text.endswith(term), fold)
+            else:
+                raise UnsupportedSearch(f"{field} {operator}")
+        return table[self.codes[field][:self.size]]
+
+    def _cmc_mask(self, operator: str, value: Any) -> np.ndarray:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise UnsupportedSearch(f"cmc {operator} {value}")
+        cmc = self.cmc[:self.size]
+        if operator in ("is", "equals"):
+            return cmc == number
+        if operator == "greater_than":
+            return cmc > number
+        if operator == "less_than":
+            return cmc < number
+        raise UnsupportedSearch(f"cmc {operator}")
+
+    def _color_mask(self, field: str, operator: str, value: str) -> np.ndarray:
+        mask = color_mask(value)
+        if operator == "superset":
+            accepted = superset_masks(mask)
+        elif operator == "subset":
+            accepted = subset_masks(mask)
+        elif operator == "exactly":
+            accepted = [mask]
+        else:
+            raise UnsupportedSearch(f"{field} {operator}")
+        table = np.zeros(256, dtype=bool)
+        table[accepted] = True
+        return table[getattr(self, MASK_FIELDS[field])[:self.size]]
+
+    def _condition_mask(self, condition: Dict[str, Any]) -> np.ndarray:
+        field, operator, value = condition["field"], condition["operator"], condition["value"]
+        if field in self.strings:
+            return self._text_mask(field, operator, str(value))
+        if field == "cmc":
+            return self._cmc_mask(operator, value)
+        if field in MASK_FIELDS:
+            return self._color_mask(field, operator, str(value))
+        raise UnsupportedSearch(f"{field} is not in the catalog")
+
+    def _group_mask(self, group: Dict[str, Any]) -> Optional[np.ndarray]:
+        masks = [self._condition_mask(condition) for condition in group.get("conditions", [])]
+        masks += [mask for mask in map(self._group_mask, group.get("groups", [])) if mask is not None]
+        if not masks:
+            return None
+        combine = np.logical_and if group.get("type", "AND") == "AND" else np.logical_or
+        mask = combine.reduce(masks)
+        return ~mask if group.get("not") else mask
+
+    def _sorted_names(self) -> np.ndarray:
+        """Every name (NULL as "") in sort order, cached until the names change"""
+        if self._name_order is None:
+            names = np.array([value or "" for value in self.strings["name"].values], dtype=object)
+            order = np.argsort(names, kind="stable")
+            ranks = np.empty(len(order), dtype=np.int32)
+            ranks[order] = np.arange(len(order), dtype=np.int32)
+            self._name_order = (ranks, names[order])
+        return self._name_order
+
+    def search(self, tree: Optional[Dict[str, Any]], order: str = "id") -> CatalogResult:
+        """
+        Cards matching a normalized filter tree (see filter_plans.normalize_filter)
+        ordered by `order` ("id", "name" or "cmc") then id
+        """
+        with self._lock:
+            mask = self._group_mask(tree) if tree else None
+            alive = self.alive[:self.size]
+            positions = np.flatnonzero(alive if mask is None else mask & alive)
+            ids = self.ids[positions]
+            labels = None
+            if order == "name":
+                ranks, labels = self._sorted_names()
+                values = ranks[self.codes["name"][positions]]
+            elif order == "cmc":
+                values = np.nan_to_num(self.cmc[positions], nan=-1.0)
+            else:
+                values = ids
+            ordering = np.lexsort((ids, values))
+            return CatalogResult(ids[ordering], values[ordering], labels)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            arrays = (self.ids, self.cmc, self.color_mask, self.color_identity_mask, self.alive, *self.codes.values())
+            string_bytes = sum(column.nbytes() for column in self.strings.values())
+            row_bytes = sum(array.itemsize for array in arrays)
+            return {
+                "ready": self.ready,
+                "generation": self.generation,
+                "cards": int(self.alive[:self.size].sum()),
+                "distinct": {field: len(column.values) - 1 for field, column in self.strings.items()},
+                "array_bytes": sum(array.nbytes for array in arrays),
+                "string_bytes": string_bytes,
+                "bytes_per_card": row_bytes + string_bytes / self.size if self.size else 0.0
+            }
+
+
+def _resized(array: np.ndarray, capacity: int) -> np.ndarray:
+    resized = np.zeros(capacity, dtype=array.dtype)
+    resized[:len(array)] = array
+    return resized
+
+
+card_catalog = CardCatalog()
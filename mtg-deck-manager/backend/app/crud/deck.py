@@ -1,15 +1,41 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import insert, select, func, literal, cast, union_all, String
+from sqlalchemy.orm import Session, selectinload, joinedload
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 from app.models import Deck, DeckCard, Card
+from app.models.card_fields import colors_from_mask
+from app.crud.stats_cache import deck_stats_cache
+from app.crud.query_cache import sync_catalog_generation
+from app.crud.deck_similarity import deck_similarity_index
+from app.crud.deck_indexes import refresh_deck_indexes, sync_deck_indexes
+from app.crud.deck_probabilities import DeckEntry, cached_deck_probabilities
+from app.crud.card import suggest_cards_for_names
 from app.schemas import DeckCreate, DeckCardCreate
 
 
 def get_deck(db: Session, deck_id: int):
-    return db.query(Deck).filter(Deck.id == deck_id).first()
+    # Load the deck's cards and their card data up front (two extra queries in
+    # total) instead of lazily per card during serialization
+    return db.query(Deck).options(
+        selectinload(Deck.cards).joinedload(DeckCard.card)
+    ).filter(Deck.id == deck_id).first()
 
 
-def get_decks(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Deck).offset(skip).limit(limit).all()
+def get_decks(db: Session, skip: int = 0, limit: int = 100, with_cards: bool = False):
+    query = db.query(Deck)
+    if with_cards:
+        query = query.options(selectinload(Deck.cards).joinedload(DeckCard.card))
+    return query.order_by(Deck.id).offset(skip).limit(limit).all()
+
+
+def iter_decks_with_cards(db: Session, batch_size: int = 25):
+    """
+    Iterate over every deck with its cards, loading `batch_size` decks (and
+    their cards) at a time so memory stays flat however many decks there are
+    """
+    return db.query(Deck).options(
+        selectinload(Deck.cards).joinedload(DeckCard.card)
+    ).order_by(Deck.id).yield_per(batch_size)
 
 
 def create_deck(db: Session, deck: DeckCreate):
@@ -28,10 +54,13 @@ def create_deck(db: Session, deck: DeckCreate):
 def update_deck(db: Session, deck_id: int, deck_data: DeckCreate):
     db_deck = get_deck(db, deck_id)
     if db_deck:
+        old_stamp = db_deck.updated_at
         for key, value in deck_data.model_dump(exclude_unset=True).items():
             setattr(db_deck, key, value)
         db.commit()
         db.refresh(db_deck)
+        # Deck details don't affect statistics; keep the cached entry valid
+        deck_stats_cache.apply(deck_id, old_stamp, db_deck.updated_at, None, 0, False)
     return db_deck
 
 
@@ -40,10 +69,24 @@ def delete_deck(db: Session, deck_id: int):
     if db_deck:
         db.delete(db_deck)
         db.commit()
+        deck_stats_cache.invalidate(deck_id)
+        refresh_deck_indexes(db, [deck_id])
         return True
     return False
 
 
+def _touch_deck(db: Session, deck_id: int):
+    """
+    Bump a deck's updated_at, returning (old, new) stamps for the statistics cache
+    """
+    db_deck = db.query(Deck).filter(Deck.id == deck_id).first()
+    if db_deck is None:
+        return None, None
+    old_stamp = db_deck.updated_at
+    db_deck.updated_at = datetime.utcnow()
+    return old_stamp, db_deck.updated_at
+
+
 def add_card_to_deck(db: Session, deck_id: int, deck_card: DeckCardCreate):
     db_deck_card = DeckCard(
         deck_id=deck_id,
@@ -52,19 +95,46 @@ def add_card_to_deck(db: Session, deck_id: int, deck_card: DeckCardCreate):
         is_sideboard=deck_card.is_sideboard
     )
     db.add(db_deck_card)
+    old_stamp, new_stamp = _touch_deck(db, deck_id)
     db.commit()
     db.refresh(db_deck_card)
+    deck_stats_cache.apply(
+        deck_id, old_stamp, new_stamp, db_deck_card.card,
+        db_deck_card.quantity, db_deck_card.is_sideboard
+    )
+    refresh_deck_indexes(db, [deck_id])
     return db_deck_card
 
 
+def add_cards_to_deck(db: Session, deck_id: int, deck_cards: List[DeckCardCreate]):
+    """
+    Add many cards to a deck with one bulk INSERT, without committing;
+    call refresh_deck_indexes once the caller has committed
+    """
+    if deck_cards:
+        db.execute(insert(DeckCard), [
+            {
+                "deck_id": deck_id,
+                "card_id": deck_card.card_id,
+                "quantity": deck_card.quantity,
+                "is_sideboard": deck_card.is_sideboard
+            }
+            for deck_card in deck_cards
+        ])
+
+
 def remove_card_from_deck(db: Session, deck_id: int, card_id: int):
     db_deck_card = db.query(DeckCard).filter(
         DeckCard.deck_id == deck_id,
         DeckCard.card_id == card_id
     ).first()
     if db_deck_card:
+        card, quantity, is_sideboard = db_deck_card.card, db_deck_card.quantity, db_deck_card.is_sideboard
         db.delete(db_deck_card)
+        old_stamp, new_stamp = _touch_deck(db, deck_id)
         db.commit()
+        deck_stats_cache.apply(deck_id, old_stamp, new_stamp, card, -quantity, is_sideboard)
+        refresh_deck_indexes(db, [deck_id])
         return True
     return False
 
@@ -75,66 +145,173 @@ def update_card_in_deck(db: Session, deck_id: int, card_id: int, quantity: int,
         DeckCard.card_id == card_id
     ).first()
     if db_deck_card:
+        card = db_deck_card.card
+        old_quantity, old_is_sideboard = db_deck_card.quantity, db_deck_card.is_sideboard
         db_deck_card.quantity = quantity
         db_deck_card.is_sideboard = is_sideboard
+        old_stamp, new_stamp = _touch_deck(db, deck_id)
         db.commit()
         db.refresh(db_deck_card)
+        # Swap the entry's old contribution for its new one
+        deck_stats_cache.apply(deck_id, old_stamp, old_stamp, card, -old_quantity, old_is_sideboard)
+        deck_stats_cache.apply(deck_id, old_stamp, new_stamp, card, quantity, is_sideboard)
+        refresh_deck_indexes(db, [deck_id])
         return db_deck_card
     return None
 
 
+def _empty_statistics():
+    return {
+        "total_cards": 0,
+        "main_deck_count": 0,
+        "sideboard_count": 0,
+        "color_distribution": {},
+        "mana_curve": {},
+        "card_types": {},
+        "rarity_distribution": {}
+    }
+
+
+def _compute_decks_statistics(db: Session, existing_ids: List[int]) -> Dict[int, dict]:
+    """
+    Compute statistics for many decks with one aggregate query
+
+    Each histogram is a GROUP BY over deck_cards joined to cards, using the
+    precomputed Card.primary_type and Card.color_mask columns, so only one
+    row per (deck, histogram bucket) leaves the database.
+    """
+    statistics = {deck_id: _empty_statistics() for deck_id in existing_ids}
+    if not existing_ids:
+        return statistics
+
+    quantity = func.sum(DeckCard.quantity)
+
+    def histogram(kind: str, key):
+        return (
+            select(DeckCard.deck_id, literal(kind).label("kind"), key.label("key"), quantity.label("count"))
+            .join(Card, Card.id == DeckCard.card_id)
+            .where(DeckCard.deck_id.in_(existing_ids))
+            .group_by(DeckCard.deck_id, key)
+        )
+
+    statement = union_all(
+        histogram("sideboard", cast(DeckCard.is_sideboard, String)),
+        histogram("cmc", cast(Card.cmc, String)),
+        histogram("type", Card.primary_type),
+        histogram("rarity", Card.rarity),
+        histogram("colors", cast(Card.color_mask, String))
+    )
+
+    for deck_id, kind, key, count in db.execute(statement):
+        stats = statistics[deck_id]
+        if kind == "sideboard":
+            stats["total_cards"] += count
+            if key in ("1", "true"):
+                stats["sideboard_count"] += count
+            else:
+                stats["main_deck_count"] += count
+        elif kind == "cmc":
+            cmc_key = key if key is not None else "Unknown"
+            stats["mana_curve"][cmc_key] = stats["mana_curve"].get(cmc_key, 0) + count
+        elif kind == "type" and key:
+            stats["card_types"][key] = stats["card_types"].get(key, 0) + count
+        elif kind == "rarity" and key:
+            stats["rarity_distribution"][key] = stats["rarity_distribution"].get(key, 0) + count
+        elif kind == "colors" and key:
+            for color in colors_from_mask(int(key)):
+                stats["color_distribution"][color] = stats["color_distribution"].get(color, 0) + count
+
+    return statistics
+
+
+def get_decks_statistics(db: Session, deck_ids: List[int]) -> Dict[int, dict]:
+    """
+    Get statistics for many decks, serving unchanged decks from the statistics
+    cache and computing the rest in one aggregate query.
+    Decks that do not exist are left out of the result.
+    """
+    generation = sync_catalog_generation(db)
+    stamps = dict(db.query(Deck.id, Deck.updated_at).filter(Deck.id.in_(deck_ids)).all())
+
+    statistics = {}
+    for deck_id, stamp in stamps.items():
+        cached = deck_stats_cache.get(deck_id, stamp, generation)
+        if cached is not None:
+            statistics[deck_id] = cached
+
+    missing = [deck_id for deck_id in stamps if deck_id not in statistics]
+    for deck_id, stats in _compute_decks_statistics(db, missing).items():
+        deck_stats_cache.put(deck_id, stamps[deck_id], generation, stats)
+        statistics[deck_id] = stats
+
+    return statistics
+
+
 def get_deck_statistics(db: Session, deck_id: int):
-    deck = get_deck(db, deck_id)
-    if not deck:
+    return get_decks_statistics(db, [deck_id]).get(deck_id)
+
+
+def get_similar_decks(db: Session, deck_id: int, limit: int = 10,
+                      min_similarity: float = 0.0) -> Optional[List[Tuple[Deck, float]]]:
+    """
+    Find the decks whose card lists are most similar to a deck's, as (deck,
+    estimated Jaccard similarity) pairs, most similar first.
+    Returns None if the deck does not exist.
+
+    Candidates come from the MinHash/LSH index (see DeckSimilarityIndex), so
+    decks less similar than its threshold are usually not found.
+    """
+    if db.query(Deck.id).filter(Deck.id == deck_id).first() is None:
         return None
-    
-    # Get all cards in the deck with their details
-    deck_cards = db.query(DeckCard, Card).join(Card).filter(DeckCard.deck_id == deck_id).all()
-    
-    # Initialize statistics
-    total_cards = 0
-    main_deck_count = 0
-    sideboard_count = 0
-    color_distribution = {}
-    mana_curve = {}
-    card_types = {}
-    rarity_distribution = {}
-    
-    # Process each card
-    for deck_card, card in deck_cards:
-        card_count = deck_card.quantity
-        total_cards += card_count
-        
-        if deck_card.is_sideboard:
-            sideboard_count += card_count
-        else:
-            main_deck_count += card_count
-        
-        # Process colors
-        if card.colors:
-            for color in card.colors.split(','):
-                color_distribution[color] = color_distribution.get(color, 0) + card_count
-        
-        # Process mana curve
-        cmc_key = str(card.cmc) if card.cmc is not None else "Unknown"
-        mana_curve[cmc_key] = mana_curve.get(cmc_key, 0) + card_count
-        
-        # Process card types
-        if card.type_line:
-            # Simplify type to main type (Creature, Instant, etc.)
-            main_type = card.type_line.split('—')[0].strip().split(' ')[0]
-            card_types[main_type] = card_types.get(main_type, 0) + card_count
-        
-        # Process rarity
-        if card.rarity:
-            rarity_distribution[card.rarity] = rarity_distribution.get(card.rarity, 0) + card_count
-    
-    return {
-        "total_cards": total_cards,
-        "main_deck_count": main_deck_count,
-        "sideboard_count": sideboard_count,
-        "color_distribution": color_distribution,
-        "mana_curve": mana_curve,
-        "card_types": card_types,
-        "rarity_distribution": rarity_distribution
-    }
\ No newline at end of file
+    sync_deck_indexes(db)
+    matches = deck_similarity_index.similar(deck_id, limit=limit, min_similarity=min_similarity) or []
+    decks = {deck.id: deck for deck in db.query(Deck).filter(Deck.id.in_([match for match, _ in matches]))}
+    return [(decks[match], similarity) for match, similarity in matches if match in decks]
+
+
+def get_deck_suggestions(db: Session, deck_id: int, limit: int = 20) -> Optional[List[Tuple[Card, float, int]]]:
+    """
+    Cards most often played alongside a deck's cards in other decks, as
+    (card, score, decks playing the card) tuples, best first.
+    Returns None if the deck does not exist.
+    """
+    if db.query(Deck.id).filter(Deck.id == deck_id).first() is None:
+        return None
+    names = [
+        name for name, in db.query(Card.name).join(DeckCard, DeckCard.card_id == Card.id)
+        .filter(DeckCard.deck_id == deck_id).distinct()
+    ]
+    return suggest_cards_for_names(db, names, limit=limit)
+
+
+def get_deck_entries(db: Session, deck_id: int) -> Optional[List[DeckEntry]]:
+    """
+    The cards of a deck's main deck as probability engine entries, or None
+    if the deck does not exist
+    """
+    if db.query(Deck.id).filter(Deck.id == deck_id).first() is None:
+        return None
+    rows = (
+        db.query(Card.name, func.sum(DeckCard.quantity), Card.primary_type, Card.cmc,
+                 Card.mana_cost, Card.color_identity_mask)
+        .join(DeckCard, DeckCard.card_id == Card.id)
+        .filter(DeckCard.deck_id == deck_id, DeckCard.is_sideboard.is_(False))
+        .group_by(Card.name)
+        .all()
+    )
+    return [DeckEntry.from_card(*row) for row in rows if row[1]]
+
+
+def get_deck_probabilities(db: Session, deck_id: int, **options) -> Optional[dict]:
+    """
+    Opening hand, land drop and castability odds of a deck's main deck (see
+    deck_probabilities for the options). Returns None if the deck does not exist.
+
+    Results are cached by composition, so decks with the same main deck
+    share them and an unchanged deck is not recomputed.
+    """
+    entries = get_deck_entries(db, deck_id)
+    if entries is None:
+        return None
+    result, cached = cached_deck_probabilities(entries, **options)
+    return {**result, "cached": cached}
@@ -0,0 +1,108 @@
+"""
+In-memory indexes over the contents of every deck: the MinHash/LSH
+similarity index and the card co-occurrence matrix.
+
+Both are loaded from one pass over deck_cards and kept current by the deck,
+card and import code, which call refresh_deck_indexes after committing a
+change to the cards of some decks. Cards are indexed by name, so they are
+rebuilt when the persisted catalog generation moves (e.g. a bulk load in
+another process renamed cards).
+"""
+from contextlib import ExitStack
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Card, DeckCard
+from app.crud.query_cache import catalog_generation
+from app.crud.card_cooccurrence import card_cooccurrence
+from app.crud.deck_similarity import deck_similarity_index
+
+
+# Decks handed to the indexes at a time while loading
+LOAD_BATCH_SIZE = 500
+
+DECK_INDEXES = (deck_similarity_index, card_cooccurrence)
+
+
+def iter_deck_contents(db: Session, deck_ids: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, Dict[str, int]]]:
+    """
+    Yield (deck ID, {card name: quantity}) for every deck with cards, or for
+    the given decks, summing main deck and sideboard copies
+    """
+    query = (
+        db.query(DeckCard.deck_id, Card.name, func.sum(DeckCard.quantity))
+        .join(Card, Card.id == DeckCard.card_id)
+        .group_by(DeckCard.deck_id, Card.name)
+        .order_by(DeckCard.deck_id)
+    )
+    if deck_ids is not None:
+        query = query.filter(DeckCard.deck_id.in_(list(deck_ids)))
+
+    deck_id, cards = None, {}
+    for row_deck_id, name, quantity in query.execution_options(yield_per=5000):
+        if row_deck_id != deck_id:
+            if cards:
+                yield deck_id, cards
+            deck_id, cards = row_deck_id, {}
+        if name is not None and quantity:
+            cards[name] = int(quantity)
+    if cards:
+        yield deck_id, cards
+
+
+def build_deck_indexes(db: Session, indexes=DECK_INDEXES):
+    """
+    (Re)build deck indexes from every deck in the database, reading the
+    decks once however many indexes are built
+    """
+    generation = catalog_generation(db)
+    with ExitStack() as stack:
+        for index in indexes:
+            stack.enter_context(index.building())
+        batch = {}
+        for deck_id, cards in iter_deck_contents(db):
+            batch[deck_id] = cards
+            if len(batch) == LOAD_BATCH_SIZE:
+                for index in indexes:
+                    index.put_many(batch)
+                batch = {}
+        for index in indexes:
+            index.put_many(batch)
+    for index in indexes:
+        index.generation = generation
+
+
+def sync_deck_indexes(db: Session):
+    """
+    Build the deck indexes that aren't built yet, were invalidated or were
+    built before the last catalog change made by another process
+    """
+    generation = catalog_generation(db)
+    stale = [
+        index for index in DECK_INDEXES
+        if not index.ready or index.stale or index.generation != generation
+    ]
+    if stale:
+        build_deck_indexes(db, stale)
+
+
+def refresh_deck_indexes(db: Session, deck_ids: Iterable[int]):
+    """
+    Update the deck indexes after the cards of some decks changed (or the
+    decks were deleted); indexes that aren't built yet are left alone
+    """
+    deck_ids = set(deck_ids)
+    ready = [index for index in DECK_INDEXES if index.ready]
+    if not deck_ids or not ready:
+        return
+    contents = dict(iter_deck_contents(db, deck_ids))
+    for index in ready:
+        index.apply(deck_ids, contents)
+
+
+def invalidate_deck_indexes():
+    """Rebuild the deck indexes on their next sync"""
+    for index in DECK_INDEXES:
+        index.invalidate()
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from math import comb
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.card_fields import COLOR_BITS
+
+
+# Probability engine settings (overridable through the environment)
+PROBABILITY_SAMPLES = int(os.getenv("PROBABILITY_SAMPLES", "100000"))
+PROBABILITY_MAX_SAMPLES = int(os.getenv("PROBABILITY_MAX_SAMPLES", "200000"))
+PROBABILITY_CACHE_SIZE = int(os.getenv("PROBABILITY_CACHE_SIZE", "256"))
+# Computations allowed to run at once; further requests wait their turn
+PROBABILITY_CONCURRENCY = int(os.getenv("PROBABILITY_CONCURRENCY", "2"))
+
+# Shuffles simulated per array operation, bounding memory to a few MB
+SAMPLE_BATCH_SIZE = 50000
+
+OPENING_HAND_SIZE = 7
+
+_COLORED_PIP = re.compile(r"\{([WUBRG])\}")
+
+
+class DeckEntry:
+    """
+    One card of a deck's main deck, with the quantities the engine needs:
+    whether it is a land, the colors a land produces, and the mana value and
+    colored pips ({W}, {U}, ...) a spell needs
+    """
+
+    def __init__(self, name: str, quantity: int, is_land: bool, cmc: int,
+                 pips: Dict[str, int], land_colors: int):
+        self.name = name
+        self.quantity = quantity
+        self.is_land = is_land
+        self.cmc = cmc
+        self.pips = pips
+        self.land_colors = land_colors
+
+    @classmethod
+    def from_card(cls, name: str, quantity: int, primary_type: Optional[str], cmc: Optional[int],
+                  mana_cost: Optional[str], color_identity_mask: Optional[int]) -> "DeckEntry":
+        is_land = primary_type == "Land"
+        pips: Dict[str, int] = {}
+        if not is_land:
+            # The front face's cost; hybrid and Phyrexian symbols can be paid
+            # several ways and only count towards the mana value
+            for color in _COLORED_PIP.findall((mana_cost or "").split("//")[0]):
+                pips[color] = pips.get(color, 0) + 1
+        return cls(
+            name, quantity, is_land, int(cmc or 0), pips,
+            (color_identity_mask or 0) & 31 if is_land else 0
+        )
+
+    def key(self) -> tuple:
+        return (self.name, self.quantity, self.is_land, self.cmc, sorted(self.pips.items()), self.land_colors)
+
+
+def composition_key(entries: List[DeckEntry], **options) -> str:
+    """
+    Digest of a deck composition and the options it is evaluated with, so
+    decks with the same cards share cached results whatever their ID
+    """
+    payload = json.dumps([sorted(entry.key() for entry in entries), sorted(options.items())])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def cards_seen(turn: int, on_the_draw: bool) -> int:
+    """Cards seen by the given turn: the opening hand plus one draw per turn (none on turn 1 on the play)"""
+    return OPENING_HAND_SIZE + turn - (0 if on_the_draw else 1)
+
+
+def _hypergeometric(population: int, successes: int, draws: int) -> List[float]:
+    """P(exactly k successes) for k = 0..draws when drawing without replacement"""
+    draws = min(draws, population)
+    total = comb(population, draws)
+    return [comb(successes, k) * comb(population - successes, draws - k) / total for k in range(draws + 1)]
+
+
+def opening_hand_odds(deck_size: int, lands: int, keep_min_lands: int, keep_max_lands: int,
+                      max_mulligans: int) -> Dict[str, Any]:
+    """
+    Exact land odds of the opening hand
+
+    A hand is kept when it has between keep_min_lands and keep_max_lands
+    lands. Under the London mulligan every mulligan draws a fresh 7 from the
+    whole deck, so the chance of having kept a hand after m mulligans is
+    1 - (1 - p)^(m + 1).
+    """
+    distribution = _hypergeometric(deck_size, lands, OPENING_HAND_SIZE)
+    keep = sum(p for count, p in enumerate(distribution) if keep_min_lands <= count <= keep_max_lands)
+    return {
+        "land_distribution": {str(count): p for count, p in enumerate(distribution)},
+        "at_least_lands": {str(count): sum(distribution[count:]) for count in range(len(distribution))},
+        "keep_min_lands": keep_min_lands,
+        "keep_max_lands": keep_max_lands,
+        "keep": keep,
+        "keep_by_mulligans": [1 - (1 - keep) ** (mulligans + 1) for mulligans in range(max_mulligans + 1)]
+    }
+
+
+def land_drops(deck_size: int, lands: int, turns: int, on_the_draw: bool) -> List[Dict[str, Any]]:
+    """
+    Exact land drop odds per turn, playing a land each turn one is available:
+    the expected lands in play and the chance of having made every drop so far
+    """
+    drops = []
+    for turn in range(1, turns + 1):
+        distribution = _hypergeometric(deck_size, lands, cards_seen(turn, on_the_draw))
+        drops.append({
+            "turn": turn,
+            "expected_lands": sum(min(turn, count) * p for count, p in enumerate(distribution)),
+            "on_curve": sum(distribution[turn:])
+        })
+    return drops
+
+
+def _exact_castable(entry: DeckEntry, deck_size: int, lands: int, turns: int, on_the_draw: bool) -> List[float]:
+    """
+    P(drawn a copy and have cmc lands in play) by each turn, from the
+    multivariate hypergeometric over (this card, lands, everything else)
+    """
+    others = deck_size - lands - entry.quantity
+    by_turn = []
+    for turn in range(1, turns + 1):
+        if turn < entry.cmc:
+            by_turn.append(0.0)
+            continue
+        draws = min(cards_seen(turn, on_the_draw), deck_size)
+        ways = sum(
+            comb(entry.quantity, copies) * comb(lands, land_count) * comb(others, draws - copies - land_count)
+            for copies in range(1, min(entry.quantity, draws) + 1)
+            for land_count in range(entry.cmc, min(lands, draws - copies) + 1)
+        )
+        by_turn.append(ways / comb(deck_size, draws))
+    return by_turn
+
+
+def _simulate_castable(entries: List[DeckEntry], simulated: List[int], turns: int, on_the_draw: bool,
+                       samples: int, seed: int) -> Dict[int, List[float]]:
+    """
+    Monte Carlo castability of the `simulated` entries (indexes into `entries`)
+
+    Each batch shuffles SAMPLE_BATCH_SIZE decks at once (argsort of random
+    keys) and evaluates every turn with array operations: lands in play are
+    the first min(turn, lands seen) lands drawn, and a card is castable once a
+    copy is drawn, lands in play cover its mana value and, for each color,
+    lands producing it cover its pips of that color.
+    """
+    cards = np.repeat(np.arange(len(entries)), [entry.quantity for entry in entries])
+    is_land = np.array([entry.is_land for entry in entries])[cards]
+    needed = {color for index in simulated for color in entries[index].pips}
+    produces = {
+        color: np.array([bool(entry.land_colors & COLOR_BITS[color]) for entry in entries])[cards]
+        for color in needed
+    }
+    seen = [min(cards_seen(turn, on_the_draw), len(cards)) for turn in range(1, turns + 1)]
+    window = seen[-1]
+
+    rng = np.random.default_rng(seed)
+    castable = {index: np.zeros(turns, dtype=np.int64) for index in simulated}
+    for start in range(0, samples, SAMPLE_BATCH_SIZE):
+        size = min(SAMPLE_BATCH_SIZE, samples - start)
+        order = rng.random((size, len(cards)), dtype=np.float32).argsort(axis=1)[:, :window]
+        drawn = cards[order]
+        land_count = np.cumsum(is_land[order], axis=1)
+        sources = {color: np.cumsum(produces[color][order], axis=1) for color in needed}
+        rows = np.arange(size)
+        # Position each simulated card is first drawn at (window if never)
+        first_drawn = {}
+        for index in simulated:
+            copies = drawn == index
+            first_drawn[index] = np.where(copies.any(axis=1), copies.argmax(axis=1), window)
+
+        for turn, count in enumerate(seen, start=1):
+            lands_seen = land_count[:, count - 1]
+            in_play = np.minimum(turn, lands_seen)
+            # Position of the turn-th land drawn, or the last card seen if fewer
+            last_played = np.minimum(count - 1, (land_count < turn).sum(axis=1))
+            colors = {color: sources[color][rows, last_played] for color in needed}
+            for index in simulated:
+                entry = entries[index]
+                ok = (first_drawn[index] < count) & (in_play >= entry.cmc)
+                for color, pips in entry.pips.items():
+                    ok &= colors[color] >= pips
+                castable[index][turn - 1] += int(ok.sum())
+
+    return {index: (counts / samples).tolist() for index, counts in castable.items()}
+
+
+def deck_probabilities(entries: List[DeckEntry], turns: int = 10, on_the_draw: bool = False,
+                       keep_min_lands: int = 2, keep_max_lands: int = 5, max_mulligans: int = 2,
+                       samples: int = PROBABILITY_SAMPLES) -> Dict[str, Any]:
+    """
+    Opening hand, land drop and castability odds of a main deck
+
+    Land odds are exact (hypergeometric). A spell's castability is exact
+    when every land produces all of its colors, so only its mana value
+    matters; otherwise it is estimated from `samples` simulated shuffles.
+    Castability assumes no mulligan and a land played each turn one is in
+    hand, and checks each color separately (a dual land counts for both).
+    """
+    deck_size = sum(entry.quantity for entry in entries)
+    lands = sum(entry.quantity for entry in entries if entry.is_land)
+    land_colors = [entry.land_colors for entry in entries if entry.is_land]
+
+    spells = [index for index, entry in enumerate(entries) if not entry.is_land]
+    exact, simulated = {}, []
+    for index in spells:
+        entry = entries[index]
+        needed = sum(COLOR_BITS[color] for color in entry.pips)
+        if all(colors & needed == needed for colors in land_colors) or not entry.pips:
+            exact[index] = _exact_castable(entry, deck_size, lands, turns, on_the_draw)
+        else:
+            simulated.append(index)
+
+    seed = int(composition_key(entries, turns=turns, on_the_draw=on_the_draw)[:8], 16)
+    estimates = _simulate_castable(entries, simulated, turns, on_the_draw, samples, seed) if simulated else {}
+
+    return {
+        "deck_size": deck_size,
+        "lands": lands,
+        "turns": turns,
+        "on_the_draw": on_the_draw,
+        "samples": samples if simulated else 0,
+        "opening_hand": opening_hand_odds(deck_size, lands, keep_min_lands, keep_max_lands, max_mulligans),
+        "land_drops": land_drops(deck_size, lands, turns, on_the_draw),
+        "cards": sorted(
+            (
+                {
+                    "name": entries[index].name,
+                    "quantity": entries[index].quantity,
+                    "cmc": entries[index].cmc,
+                    "method": "exact" if index in exact else "monte_carlo",
+                    "castable_by_turn": exact[index] if index in exact else estimates[index]
+                }
+                for index in spells
+            ),
+            key=lambda card: (card["cmc"], card["name"])
+        )
+    }
+
+
+class ProbabilityCache:
+    """
+    LRU of probability results keyed by deck composition (see composition_key),
+    so decks with identical main decks, or a deck read again unchanged, skip
+    the computation
+    """
+
+    def __init__(self, max_entries: int = PROBABILITY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def peek(self, key: str) -> Optional[dict]:
+        """get() without counting a hit or miss"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, result: dict):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def cached_deck_probabilities(entries: List[DeckEntry], **options) -> Tuple[Dict[str, Any], bool]:
+    """
+    deck_probabilities through the result cache; also returns whether the
+    result came from the cache
+
+    At most PROBABILITY_CONCURRENCY computations run at once, so a burst of
+    requests can't occupy every worker thread with simulations. A request
+    that waited finds the result in the cache if another one computed it.
+    """
+    options.setdefault("samples", PROBABILITY_SAMPLES)
+    key = composition_key(entries, **options)
+    result = probability_cache.get(key)
+    if result is not None:
+        return result, True
+    with _computing:
+        result = probability_cache.peek(key)
+        if result is not None:
+            return result, True
+        result = deck_probabilities(entries, **options)
+        probability_cache.put(key, result)
+    return result, False
+
+
+_computing = threading.BoundedSemaphore(PROBABILITY_CONCURRENCY)
+
+probability_cache = ProbabilityCache()
@@ -0,0 +1,274 @@
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Signature settings (overridable through the environment): PERMUTATIONS
+# min-hashes per deck, split into BANDS bands of PERMUTATIONS / BANDS rows.
+# Decks become candidates when they agree on every row of some band, which
+# is likely above a Jaccard similarity of about (1 / BANDS) ** (1 / rows).
+DECK_SIMILARITY_PERMUTATIONS = int(os.getenv("DECK_SIMILARITY_PERMUTATIONS", "64"))
+DECK_SIMILARITY_BANDS = int(os.getenv("DECK_SIMILARITY_BANDS", "16"))
+
+# Rows added since the band index was sorted are scanned linearly until there
+# are this many of them (or a tenth of the index), then everything is re-sorted
+REINDEX_MIN_ROWS = 1024
+REINDEX_FRACTION = 0.1
+
+_SEED = 0x5EED_DECC
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads every input bit over the whole 64-bit result"""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _name_hash(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.casefold().encode(), digest_size=8).digest(), "little")
+
+
+class DeckSimilarityIndex:
+    """
+    MinHash signatures of every deck's card multiset, banded into LSH buckets
+
+    A deck is the multiset of its card names, main deck and sideboard together,
+    with each copy a separate element (4 Opt is {Opt#1, ..., Opt#4}), so the
+    share of equal min-hashes between two signatures estimates the Jaccard
+    similarity of their card lists. Printings of the same card count as the
+    same card.
+
+    Each band's keys are kept sorted, so the decks sharing a bucket with a
+    query are found by binary search instead of comparing against every deck.
+    Changed decks get a new row and their old row is marked dead; new rows are
+    scanned linearly until enough accumulate to compact and re-sort the index.
+    """
+
+    def __init__(self, permutations: int = DECK_SIMILARITY_PERMUTATIONS,
+                 bands: int = DECK_SIMILARITY_BANDS):
+        if permutations % bands:
+            raise ValueError("The number of permutations must be a multiple of the number of bands")
+        self.permutations = permutations
+        self.bands = bands
+        self.rows_per_band = permutations // bands
+        # Multiply-shift hash functions ((a * x + b) mod 2^64) >> 32 with odd a
+        # stand in for the random permutations
+        rng = np.random.default_rng(_SEED)
+        self._multipliers = rng.integers(0, 2 ** 64, size=(permutations, 1), dtype=np.uint64) | np.uint64(1)
+        self._increments = rng.integers(0, 2 ** 64, size=(permutations, 1), dtype=np.uint64)
+        self._name_codes: Dict[str, int] = {}
+        self._name_hashes: List[int] = []
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self.stale = False
+        # Persisted catalog generation the index was built at (see deck_indexes)
+        self.generation = None
+
+    def _reset(self):
+        self.size = 0
+        self.deck_ids = np.zeros(0, dtype=np.int64)
+        self.signatures = np.zeros((0, self.permutations), dtype=np.uint32)
+        self.band_keys = np.zeros((0, self.bands), dtype=np.uint64)
+        self.alive = np.zeros(0, dtype=bool)
+        self._rows: Dict[int, int] = {}
+        # Sorted keys of each band and the row each key belongs to, covering rows [0, indexed)
+        self.indexed = 0
+        self._sorted_keys = np.zeros((self.bands, 0), dtype=np.uint64)
+        self._sorted_rows = np.zeros((self.bands, 0), dtype=np.int32)
+
+    # Signatures
+
+    def signatures_of(self, decks: List[Dict[str, int]]) -> np.ndarray:
+        """
+        MinHash signatures (one row per deck) of card name -> quantity mappings;
+        decks must not be empty
+        """
+        names, quantities, counts = [], [], []
+        for cards in decks:
+            entries = 0
+            for name, quantity in cards.items():
+                if quantity <= 0:
+                    continue
+                code = self._name_codes.get(name)
+                if code is None:
+                    code = self._name_codes[name] = len(self._name_codes)
+                    self._name_hashes.append(_name_hash(name))
+                names.append(code)
+                quantities.append(quantity)
+                entries += quantity
+            counts.append(entries)
+
+        # Expand each (name, quantity) to one element per copy: name hash + copy number
+        quantities = np.array(quantities, dtype=np.int64)
+        first_copy = np.repeat(np.cumsum(quantities) - quantities, quantities)
+        copies = (np.arange(len(first_copy)) - first_copy).astype(np.uint64)
+        name_hashes = np.array([self._name_hashes[code] for code in names], dtype=np.uint64)
+        elements = _mix(np.repeat(name_hashes, quantities) + copies * _GOLDEN)
+        # One row per hash function, so each deck's minimum is over a contiguous run
+        hashed = self._multipliers * elements
+        hashed += self._increments
+        hashed >>= np.uint64(32)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return np.minimum.reduceat(hashed, starts, axis=1).T.astype(np.uint32)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        banded = signatures.reshape(len(signatures), self.bands, self.rows_per_band).astype(np.uint64)
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for row in range(self.rows_per_band):
+            keys = _mix(keys ^ banded[:, :, row])
+        return keys
+
+    # Maintenance
+
+    @contextmanager
+    def building(self):
+        """
+        Rebuild the index from the decks passed to put_many inside the block
+        (see deck_indexes.build_deck_indexes); queries wait until it is done
+        """
+        with self._lock:
+            self._reset()
+            self.ready = False
+            try:
+                yield
+            except BaseException:
+                # Drop the partial index; the next sync builds it again
+                self._reset()
+                raise
+            self._reindex()
+            self.ready = True
+            self.stale = False
+
+    def invalidate(self):
+        """Rebuild on the next sync, for bulk changes to card names"""
+        self.stale = True
+
+    def apply(self, deck_ids: Iterable[int], contents: Dict[int, Dict[str, int]]):
+        """
+        Update changed decks to their current contents; decks missing from
+        `contents` no longer exist or have no cards and are dropped
+        """
+        with self._lock:
+            for deck_id in set(deck_ids) - contents.keys():
+                self.remove(deck_id)
+            self.put_many(contents)
+
+    def put_many(self, decks: Dict[int, Dict[str, int]]):
+        """Add or replace the signatures of decks given as card name -> quantity"""
+        decks = {deck_id: cards for deck_id, cards in decks.items() if any(q > 0 for q in cards.values())}
+        if not decks:
+            return
+        signatures = self.signatures_of(list(decks.values()))
+        with self._lock:
+            for deck_id in decks:
+                self.remove(deck_id)
+            start, stop = self.size, self.size + len(decks)
+            self._grow(stop)
+            self.deck_ids[start:stop] = list(decks)
+            self.signatures[start:stop] = signatures
+            self.band_keys[start:stop] = self._band_keys(signatures)
+            self.alive[start:stop] = True
+            self._rows.update(zip(decks, range(start, stop)))
+            self.size = stop
+            if self.size - self.indexed > max(REINDEX_MIN_ROWS, self.indexed * REINDEX_FRACTION):
+                self._reindex()
+
+    def remove(self, deck_id: int):
+        with self._lock:
+            row = self._rows.pop(deck_id, None)
+            if row is not None:
+                self.alive[row] = False
+
+    def _grow(self, needed: int):
+        capacity = len(self.deck_ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for attribute in ("deck_ids", "signatures", "band_keys", "alive"):
+            array = getattr(self, attribute)
+            resized = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            resized[:self.size] = array[:self.size]
+            setattr(self, attribute, resized)
+
+    def _reindex(self):
+        """Drop dead rows and sort every band's keys"""
+        live = np.flatnonzero(self.alive[:self.size])
+        for attribute in ("deck_ids", "signatures", "band_keys", "alive"):
+            array = getattr(self, attribute)
+            array[:len(live)] = array[live]
+        self.size = len(live)
+        self.alive[self.size:] = False
+        self._rows = dict(zip(self.deck_ids[:self.size].tolist(), range(self.size)))
+
+        keys = self.band_keys[:self.size].T
+        order = np.argsort(keys, axis=1, kind="stable")
+        self._sorted_keys = np.take_along_axis(keys, order, axis=1)
+        self._sorted_rows = order.astype(np.int32)
+        self.indexed = self.size
+
+    # Queries
+
+    def _candidates(self, keys: np.ndarray) -> np.ndarray:
+        found = []
+        for band in range(self.bands):
+            band_keys = self._sorted_keys[band]
+            low = np.searchsorted(band_keys, keys[band], side="left")
+            high = np.searchsorted(band_keys, keys[band], side="right")
+            if high > low:
+                found.append(self._sorted_rows[band, low:high])
+        recent = self.band_keys[self.indexed:self.size]
+        found.append(np.flatnonzero((recent == keys).any(axis=1)) + self.indexed)
+        rows = np.unique(np.concatenate(found))
+        return rows[self.alive[rows]]
+
+    def similar_to_signature(self, signature: np.ndarray, limit: int = 10, min_similarity: float = 0.0,
+                             exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Decks sharing an LSH bucket with a signature, as (deck ID, estimated
+        Jaccard similarity) pairs, most similar first (ties by deck ID)
+        """
+        with self._lock:
+            rows = self._candidates(self._band_keys(signature[None, :])[0])
+            deck_ids = self.deck_ids[rows]
+            similarity = (self.signatures[rows] == signature).mean(axis=1)
+            keep = (similarity >= min_similarity) & (deck_ids != exclude)
+            deck_ids, similarity = deck_ids[keep], similarity[keep]
+            order = np.lexsort((deck_ids, -similarity))[:limit]
+            return list(zip(deck_ids[order].tolist(), similarity[order].tolist()))
+
+    def similar(self, deck_id: int, limit: int = 10,
+                min_similarity: float = 0.0) -> Optional[List[Tuple[int, float]]]:
+        """
+        Decks most similar to an indexed deck, or None if the deck isn't
+        indexed (it doesn't exist or has no cards)
+        """
+        with self._lock:
+            row = self._rows.get(deck_id)
+            if row is None:
+                return None
+            return self.similar_to_signature(self.signatures[row].copy(), limit, min_similarity, exclude=deck_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            arrays = (self.deck_ids, self.signatures, self.band_keys, self.alive,
+                      self._sorted_keys, self._sorted_rows)
+            return {
+                "ready": self.ready,
+                "decks": len(self._rows),
+                "permutations": self.permutations,
+                "bands": self.bands,
+                "rows_per_band": self.rows_per_band,
+                "threshold": (1 / self.bands) ** (1 / self.rows_per_band),
+                "unsorted_rows": self.size - self.indexed,
+                "bytes": sum(array.nbytes for array in arrays)
+            }
+
+
+deck_similarity_index = DeckSimilarityIndex()
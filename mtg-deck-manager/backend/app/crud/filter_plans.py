@@ -0,0 +1,222 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models.card_fields import COLOR_BITS, COLORLESS_BIT, color_mask
+
+
+CMC_OPERATORS = {"greater_than", "less_than", "equals"}
+
+# Canonical name for each color operator (see crud.card.COLOR_OPERATORS)
+COLOR_FIELDS = {"colors", "color_identity"}
+COLOR_OPERATOR_NAMES = {
+    "contains": "superset", "superset": "superset", "includes": "superset",
+    "subset": "subset", "within": "subset",
+    "is": "exactly", "exactly": "exactly",
+}
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def canonical_colors(value: str) -> str:
+    mask = color_mask(str(value))
+    if mask == COLORLESS_BIT:
+        return "C"
+    return ",".join(color for color, bit in COLOR_BITS.items() if mask & bit)
+
+
+def normalize_condition(condition: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Canonical form of one condition, or None if it can never produce a clause
+    """
+    field = condition.get("field")
+    operator = condition.get("operator")
+    value = condition.get("value")
+
+    if not field or not operator or value is None or value == "":
+        return None
+
+    if field == "cmc" and operator in CMC_OPERATORS:
+        try:
+            value = int(value)
+        except (ValueError, TypeError):
+            return None
+    elif field in COLOR_FIELDS and operator in COLOR_OPERATOR_NAMES:
+        operator = COLOR_OPERATOR_NAMES[operator]
+        value = canonical_colors(value)
+    else:
+        value = str(value)
+
+    return {"field": field, "operator": operator, "value": value}
+
+
+def _fold_cmc_bounds(conditions: List[Dict[str, Any]], group_type: str) -> List[Dict[str, Any]]:
+    """
+    Merge repeated cmc bounds: in an AND group only the tightest bound matters,
+    in an OR group only the loosest
+    """
+    tighter = {"greater_than": max, "less_than": min}
+    looser = {"greater_than": min, "less_than": max}
+    pick = tighter if group_type == "AND" else looser
+
+    bounds = {}
+    folded = []
+    for condition in conditions:
+        operator = condition["operator"]
+        if condition["field"] == "cmc" and operator in pick:
+            bounds[operator] = pick[operator](bounds.get(operator, condition["value"]), condition["value"])
+        else:
+            folded.append(condition)
+    for operator, value in bounds.items():
+        folded.append({"field": "cmc", "operator": operator, "value": value})
+    return folded
+
+
+def normalize_filter(group: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Normalize a filter tree without changing what it matches: drop empty
+    conditions and groups, lift single-child groups and groups of the same type
+    into their parent, fold repeated cmc bounds, and deduplicate and sort children
+    so equivalent filters share one canonical form. Groups with "not": true
+    match the cards their children don't and are never lifted.
+    """
+    if not group:
+        return None
+
+    group_type = "AND" if group.get("type", "AND") == "AND" else "OR"
+    conditions = [
+        normalized for normalized in map(normalize_condition, group.get("conditions", []))
+        if normalized is not None
+    ]
+    groups = []
+
+    for subgroup in group.get("groups", []):
+        normalized = normalize_filter(subgroup)
+        if normalized is None:
+            continue
+        children = len(normalized["conditions"]) + len(normalized["groups"])
+        if not normalized.get("not") and (normalized["type"] == group_type or children == 1):
+            conditions.extend(normalized["conditions"])
+            groups.extend(normalized["groups"])
+        else:
+            groups.append(normalized)
+
+    conditions = _fold_cmc_bounds(conditions, group_type)
+
+    conditions = sorted({_canonical(c): c for c in conditions}.items())
+    groups = sorted({_canonical(g): g for g in groups}.items())
+    if not conditions and not groups:
+        return None
+
+    negated = bool(group.get("not"))
+
+    # A group holding just one subgroup is that subgroup (or its negation)
+    if not conditions and len(groups) == 1:
+        return negate_filter(groups[0][1]) if negated else groups[0][1]
+
+    normalized = {
+        "type": group_type,
+        "conditions": [condition for _, condition in conditions],
+        "groups": [subgroup for _, subgroup in groups]
+    }
+    if negated:
+        if len(conditions) + len(groups) == 1:
+            # AND and OR of one condition are the same group
+            normalized["type"] = "AND"
+        normalized["not"] = True
+    return normalized
+
+
+def negate_filter(group: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The complement of a normalized group: toggles its "not" flag
+    """
+    negated = {key: value for key, value in group.items() if key != "not"}
+    if not group.get("not"):
+        negated["not"] = True
+    return negated
+
+
+class FilterPlan:
+    """
+    A normalized filter tree with its hash and compiled SQLAlchemy clause
+    """
+
+    def __init__(self, key: str, tree: Optional[Dict[str, Any]], clause):
+        self.key = key
+        self.tree = tree
+        self.clause = clause
+
+
+class FilterPlanCache:
+    """
+    LRU cache of compiled filter plans keyed by the hash of the normalized tree,
+    with a second LRU mapping raw filter_json strings straight to their plan
+    so repeated and paged searches skip JSON parsing and clause construction
+    """
+
+    def __init__(self, compile_filter: Callable[[Dict[str, Any]], Any], max_plans: int = 512):
+        self.compile_filter = compile_filter
+        self.max_plans = max_plans
+        self._plans: "OrderedDict[str, FilterPlan]" = OrderedDict()
+        self._raw: "OrderedDict[str, FilterPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, entries: OrderedDict, key: str, plan: FilterPlan):
+        entries[key] = plan
+        entries.move_to_end(key)
+        while len(entries) > self.max_plans:
+            entries.popitem(last=False)
+
+    def plan_for(self, filter_data: Optional[Dict[str, Any]]) -> FilterPlan:
+        tree = normalize_filter(filter_data)
+        key = hashlib.sha1(_canonical(tree).encode()).hexdigest()
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        plan = FilterPlan(key, tree, self.compile_filter(tree) if tree else None)
+        with self._lock:
+            self._remember(self._plans, key, plan)
+        return plan
+
+    def plan_for_json(self, filter_json: str) -> FilterPlan:
+        """
+        Plan for a raw filter_json string (raises json.JSONDecodeError if invalid)
+        """
+        with self._lock:
+            plan = self._raw.get(filter_json)
+            if plan is not None:
+                self._raw.move_to_end(filter_json)
+                self.hits += 1
+                return plan
+
+        plan = self.plan_for(json.loads(filter_json))
+        with self._lock:
+            self._remember(self._raw, filter_json, plan)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self._raw.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "plans": len(self._plans),
+                "raw_filters": len(self._raw),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,197 @@
+import bisect
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.crud.query_cache import catalog_generation
+from app.models import Card
+
+
+# Sorts after any character that can appear in a folded name
+_MAX_CHAR = "\U0010ffff"
+
+# Letters that Unicode decomposition leaves alone ("Æther Vial")
+_LIGATURES = str.maketrans({"æ": "ae", "œ": "oe", "ø": "o", "ł": "l", "đ": "d"})
+
+
+def fold_name(name: str) -> str:
+    """
+    Normalize a card name for lookup: strip diacritics, casefold and collapse spaces
+    ("Lim-Dûl's Vault" -> "lim-dul's vault")
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().translate(_LIGATURES).split())
+
+
+def name_keys(name: str) -> List[str]:
+    """
+    Keys a card name is indexed under: the full name plus each face of a
+    split or double-faced card ("Fire // Ice" -> "fire // ice", "fire", "ice")
+    """
+    keys = [fold_name(name)]
+    if "//" in name:
+        keys.extend(fold_name(face) for face in name.split("//") if face.strip())
+    return list(dict.fromkeys(keys))
+
+
+class CardNameIndex:
+    """
+    Sorted-array index of folded card names for prefix and fuzzy autocomplete
+
+    Keys are kept in one sorted list, so a prefix lookup is a binary search plus
+    a short scan. Fuzzy lookups walk the same list like a trie, reusing edit-distance
+    rows across shared prefixes and skipping whole prefix ranges that are already
+    too far from the query.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._names: List[str] = []
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+        # Persisted catalog generation the index was built at
+        self.generation = None
+
+    def build(self, db: Session):
+        """
+        (Re)build the index from every card name in the database
+        """
+        generation = catalog_generation(db)
+        counts: Dict[str, int] = {}
+        for (name,) in db.query(Card.name).filter(Card.name.isnot(None)):
+            counts[name] = counts.get(name, 0) + 1
+
+        entries = sorted((key, name) for name in counts for key in name_keys(name))
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._names = [name for _, name in entries]
+            self._counts = counts
+            self.generation = generation
+            self.ready = True
+
+    def sync(self, db: Session):
+        """
+        Build the index if it isn't built yet, or rebuild it if other processes
+        (manage.py bulk-load) changed the catalog since it was built
+        """
+        if not self.ready or catalog_generation(db) != self.generation:
+            self.build(db)
+
+    def add(self, name: Optional[str]):
+        if not name:
+            return
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            if self._counts[name] > 1:
+                return
+            for key in name_keys(name):
+                index = bisect.bisect_left(self._keys, key)
+                while index < len(self._keys) and self._keys[index] == key and self._names[index] < name:
+                    index += 1
+                self._keys.insert(index, key)
+                self._names.insert(index, name)
+
+    def add_many(self, names: Iterable[str]):
+        for name in names:
+            self.add(name)
+
+    def remove(self, name: Optional[str]):
+        if not name:
+            return
+        with self._lock:
+            count = self._counts.get(name, 0)
+            if count > 1:
+                self._counts[name] = count - 1
+                return
+            self._counts.pop(name, None)
+            for key in name_keys(name):
+                index = bisect.bisect_left(self._keys, key)
+                while index < len(self._keys) and self._keys[index] == key:
+                    if self._names[index] == name:
+                        del self._keys[index]
+                        del self._names[index]
+                        break
+                    index += 1
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Card names with a name (or face name) starting with `prefix`, alphabetically
+        """
+        folded = fold_name(prefix)
+        results: List[str] = []
+        with self._lock:
+            index = bisect.bisect_left(self._keys, folded)
+            while index < len(self._keys) and len(results) < limit:
+                if not self._keys[index].startswith(folded):
+                    break
+                name = self._names[index]
+                if name not in results:
+                    results.append(name)
+                index += 1
+        return results
+
+    def fuzzy(self, query: str, max_distance: int = 2, limit: int = 10) -> List[str]:
+        """
+        Card names with a prefix within `max_distance` edits of `query`,
+        closest first. Tolerates typos such as "lightnign bo".
+        """
+        folded = fold_name(query)
+        width = len(folded) + 1
+        matches: List[Tuple[int, str, str]] = []
+
+        with self._lock:
+            keys = self._keys
+            rows = [list(range(width))]
+            previous = ""
+            index = 0
+            while index < len(keys):
+                key = keys[index]
+
+                # Reuse the rows computed for the prefix shared with the previous key
+                common = 0
+                limit_common = min(len(previous), len(key), len(rows) - 1)
+                while common < limit_common and previous[common] == key[common]:
+                    common += 1
+                del rows[common + 1:]
+
+                pruned_at = None
+                for depth in range(common, len(key)):
+                    above = rows[-1]
+                    row = [above[0] + 1]
+                    for column in range(1, width):
+                        cost = 0 if folded[column - 1] == key[depth] else 1
+                        row.append(min(row[column - 1] + 1, above[column] + 1, above[column - 1] + cost))
+                    rows.append(row)
+                    if min(row) > max_distance:
+                        pruned_at = depth + 1
+                        break
+
+                # Distance from the query to the closest prefix of this key
+                best = min(row[-1] for row in rows)
+                next_index = index + 1
+                if pruned_at is not None:
+                    # Keys sharing this prefix can't get any closer, so they all
+                    # score the same as this one; settle them without walking them
+                    next_index = bisect.bisect_left(keys, key[:pruned_at] + _MAX_CHAR, index + 1)
+
+                if best <= max_distance:
+                    for position in range(index, next_index):
+                        matches.append((best, keys[position], self._names[position]))
+
+                previous = key
+                index = next_index
+
+        results: List[str] = []
+        for _, _, name in sorted(matches):
+            if name not in results:
+                results.append(name)
+                if len(results) == limit:
+                    break
+        return results
+
+
+card_name_index = CardNameIndex()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import CatalogState
+
+
+# The in-process version, and the persisted catalog generation it last caught up with
+_catalog_version = {"value": 0, "generation": None}
+_catalog_lock = threading.Lock()
+_catalog_listeners: List[Callable[[], None]] = []
+
+
+def catalog_version() -> int:
+    """
+    Counter bumped whenever the card catalog changes, in this process or (once
+    sync_catalog_generation notices) in another one; cached query results
+    computed under an older version are never served
+    """
+    return _catalog_version["value"]
+
+
+def catalog_generation(db: Session) -> int:
+    """The persisted catalog generation (see bump_catalog_generation)"""
+    return db.scalar(select(CatalogState.generation).where(CatalogState.id == 1)) or 0
+
+
+def bump_catalog_generation(db: Session):
+    """
+    Record a catalog change in the database, in the caller's transaction, for
+    changes made outside the API process (manage.py bulk-load) that the
+    server's in-process caches would otherwise never hear about
+    """
+    db.execute(
+        update(CatalogState).where(CatalogState.id == 1).values(generation=CatalogState.generation + 1)
+    )
+
+
+def sync_catalog_generation(db: Session) -> int:
+    """
+    Catch up with catalog changes committed by other processes: read the
+    persisted generation and, if it moved since this process last read it,
+    bump catalog_version(). Called before cache lookups; returns the generation.
+    """
+    generation = catalog_generation(db)
+    with _catalog_lock:
+        seen = _catalog_version["generation"]
+        _catalog_version["generation"] = generation
+    if seen is not None and seen != generation:
+        bump_catalog_version()
+    return generation
+
+
+def bump_catalog_version():
+    with _catalog_lock:
+        _catalog_version["value"] += 1
+    for listener in _catalog_listeners:
+        listener()
+
+
+def on_catalog_change(listener: Callable[[], None]):
+    """
+    Call `listener` after every catalog change, for caches that live outside
+    this process and can't check catalog_version() themselves
+    """
+    _catalog_listeners.append(listener)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl` seconds and
+    whenever the catalog version moves on
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != catalog_version():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, value: Any, version: Optional[int] = None):
+        """
+        Store a value computed under `version` (read catalog_version() before
+        running the query so a concurrent change can't be cached as current)
+        """
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + self.ttl,
+                catalog_version() if version is None else version,
+                value
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Hashable, Optional
+
+from app.crud.query_cache import TTLCache, catalog_version, on_catalog_change
+
+
+# Search result cache settings (overridable through the environment)
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "memory")
+SEARCH_CACHE_REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL", "redis://localhost:6379/0")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+# Searches matching more cards than this only have their total cached
+SEARCH_CACHE_MAX_IDS = int(os.getenv("SEARCH_CACHE_MAX_IDS", "5000"))
+
+
+class MemoryResultBackend:
+    """
+    In-process LRU with a TTL; entries computed under an older catalog version
+    are never served
+    """
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES, ttl: float = SEARCH_CACHE_TTL):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    def snapshot(self) -> int:
+        return catalog_version()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    def put(self, key: Hashable, value: Dict[str, Any], version: int):
+        self._cache.put(key, value, version)
+
+    def invalidate(self):
+        # Entries carry the catalog version they were computed under
+        pass
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class RedisResultBackend:
+    """
+    Result sets stored in Redis (or any server speaking its protocol), shared by
+    every worker process. Keys embed a generation counter held in Redis, so a
+    catalog change in any process invalidates all of them with one INCR; stale
+    generations are left to expire through the TTL. LRU eviction is left to the
+    server's maxmemory-policy.
+    """
+
+    def __init__(self, url: str = SEARCH_CACHE_REDIS_URL, ttl: float = SEARCH_CACHE_TTL,
+                 prefix: str = "mtg:search:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.RedisError
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _generation_key(self) -> str:
+        return self.prefix + "generation"
+
+    def _entry_key(self, key: Hashable, generation: int) -> str:
+        digest = hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+        return f"{self.prefix}{generation}:{digest}"
+
+    def snapshot(self) -> Optional[int]:
+        try:
+            return int(self.client.get(self._generation_key()) or 0)
+        except self.errors as e:
+            print(f"Search cache unavailable: {e}")
+            return None
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        generation = self.snapshot()
+        raw = None
+        if generation is not None:
+            try:
+                raw = self.client.get(self._entry_key(key, generation))
+            except self.errors as e:
+                print(f"Search cache unavailable: {e}")
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def put(self, key: Hashable, value: Dict[str, Any], version: Optional[int]):
+        if version is None:
+            return
+        try:
+            self.client.set(self._entry_key(key, version), json.dumps(value), ex=self.ttl)
+        except self.errors as e:
+            print(f"Search cache unavailable: {e}")
+
+    def invalidate(self):
+        try:
+            self.client.incr(self._generation_key())
+        except self.errors as e:
+            print(f"Search cache unavailable: {e}")
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "generation": self.snapshot(), "hits": self.hits, "misses": self.misses}
+
+
+def create_result_backend(kind: str = SEARCH_CACHE_BACKEND):
+    """
+    Build the configured backend, falling back to memory if Redis is
+    requested but the redis package is not installed
+    """
+    if kind == "redis":
+        try:
+            return RedisResultBackend()
+        except ImportError:
+            print("SEARCH_CACHE_BACKEND=redis needs the redis package; using the in-memory cache")
+    return MemoryResultBackend()
+
+
+class SearchResultCache:
+    """
+    Cache of complete search results: the ordered (sort value, id) pairs of
+    every matching card plus the total, keyed by the normalized search. Any page
+    of a cached search, by offset or by cursor, is then served with a primary
+    key lookup instead of re-running the search.
+    """
+
+    def __init__(self, backend=None, max_ids: int = SEARCH_CACHE_MAX_IDS):
+        self.backend = backend or create_result_backend()
+        self.max_ids = max_ids
+        on_catalog_change(self.invalidate)
+
+    def snapshot(self):
+        """Version token to read before running a search that will be cached"""
+        return self.backend.snapshot()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        return self.backend.get(key)
+
+    def put(self, key: Hashable, total: int, rows: Optional[list], version):
+        """
+        Store a search's total and, if it is small enough, its ordered rows
+        (None means only the total is cached)
+        """
+        self.backend.put(key, {"total": total, "rows": rows}, version)
+
+    def invalidate(self):
+        self.backend.invalidate()
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.backend.stats(), "max_ids": self.max_ids}
+
+
+search_result_cache = SearchResultCache()
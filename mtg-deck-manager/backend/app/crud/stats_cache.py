@@ -0,0 +1,107 @@
+import copy
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.models import Card
+from app.models.card_fields import colors_from_mask
+
+
+DEFAULT_MAX_DECKS = 2048
+
+
+def _bump(histogram: Dict[str, int], key: str, delta: int):
+    count = histogram.get(key, 0) + delta
+    if count:
+        histogram[key] = count
+    else:
+        histogram.pop(key, None)
+
+
+def apply_card_contribution(stats: dict, card: Card, quantity: int, is_sideboard: bool):
+    """
+    Add (or, with a negative quantity, subtract) one deck entry's contribution
+    to a deck statistics dict, mirroring the aggregate query in get_decks_statistics
+    """
+    stats["total_cards"] += quantity
+    if is_sideboard:
+        stats["sideboard_count"] += quantity
+    else:
+        stats["main_deck_count"] += quantity
+
+    _bump(stats["mana_curve"], str(card.cmc) if card.cmc is not None else "Unknown", quantity)
+    if card.primary_type:
+        _bump(stats["card_types"], card.primary_type, quantity)
+    if card.rarity:
+        _bump(stats["rarity_distribution"], card.rarity, quantity)
+    for color in colors_from_mask(card.color_mask or 0):
+        _bump(stats["color_distribution"], color, quantity)
+
+
+class DeckStatsCache:
+    """
+    In-process LRU of deck statistics, versioned by the deck's updated_at and
+    the persisted catalog generation
+
+    An entry is only served while its stamp matches the deck's current
+    updated_at, so writes from elsewhere invalidate it, and while the catalog
+    generation is the one it was computed under, so bulk loads that change
+    card data (in any process, see query_cache.sync_catalog_generation) do
+    too. Writes through the deck CRUD functions update entries in place
+    (apply) instead of dropping them.
+    """
+
+    def __init__(self, max_decks: int = DEFAULT_MAX_DECKS):
+        self.max_decks = max_decks
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, deck_id: int, stamp: datetime, generation: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(deck_id)
+            if entry is None or entry[0] != stamp or entry[1] != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(deck_id)
+            self.hits += 1
+            return copy.deepcopy(entry[2])
+
+    def put(self, deck_id: int, stamp: datetime, generation: int, stats: dict):
+        with self._lock:
+            self._entries[deck_id] = (stamp, generation, copy.deepcopy(stats))
+            self._entries.move_to_end(deck_id)
+            while len(self._entries) > self.max_decks:
+                self._entries.popitem(last=False)
+
+    def apply(self, deck_id: int, old_stamp: datetime, new_stamp: datetime,
+              card: Optional[Card], quantity: int, is_sideboard: bool):
+        """
+        Move a cached entry from old_stamp to new_stamp, adding one card's contribution
+        """
+        with self._lock:
+            entry = self._entries.get(deck_id)
+            if entry is None:
+                return
+            if entry[0] != old_stamp:
+                del self._entries[deck_id]
+                return
+            if card is not None and quantity:
+                apply_card_contribution(entry[2], card, quantity, is_sideboard)
+            self._entries[deck_id] = (new_stamp, entry[1], entry[2])
+
+    def invalidate(self, deck_id: int):
+        with self._lock:
+            self._entries.pop(deck_id, None)
+
+    def clear(self):
+        """
+        Drop every entry (used when card data that feeds the statistics changes)
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+deck_stats_cache = DeckStatsCache()
@@ -1,14 +1,157 @@
-from sqlalchemy import create_engine
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./mtg_deck_manager.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mtg_deck_manager.db")
+# Database read-only requests go to; defaults to a read-only connection to DATABASE_URL
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# SQLite connection tuning (overridable through the environment)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative: KiB, so 64 MB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+
+# Async driver used for each database backend
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    Map a database URL to the same database through its async driver,
+    e.g. sqlite:///app.db -> sqlite+aiosqlite:///app.db and
+    postgres://... or postgresql+psycopg2://... -> postgresql+asyncpg://...
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def read_only_database_url(url: str) -> Optional[str]:
+    """
+    URL opening a SQLite database file read-only (sqlite:///app.db ->
+    sqlite:///file:app.db?mode=ro&uri=true), or None for in-memory databases,
+    which can't be shared with a second pool. Other databases are returned
+    unchanged; point DATABASE_READ_URL at a replica to split their reads.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return url
+    if not parsed.database or parsed.database == ":memory:" or parsed.query.get("mode") == "memory":
+        return None
+    if parsed.query.get("uri") == "true":
+        database = parsed.database
+    else:
+        database = f"file:{parsed.database}"
+    query = {**parsed.query, "mode": "ro", "uri": "true"}
+    return parsed.set(database=database, query=query).render_as_string(hide_password=False)
+
+
+def sqlite_pragmas(read_only: bool = False) -> list:
+    """
+    PRAGMAs run on every new SQLite connection: WAL lets readers run alongside
+    a writer, synchronous=NORMAL drops the fsync on every commit (safe under
+    WAL), and the page cache, memory-mapped I/O and busy timeout cut disk reads
+    and "database is locked" errors
+    """
+    pragmas = [("busy_timeout", SQLITE_BUSY_TIMEOUT)]
+    if read_only:
+        # The journal mode is a property of the file, set by the writer
+        pragmas.append(("query_only", 1))
+    else:
+        pragmas += [("journal_mode", SQLITE_JOURNAL_MODE), ("synchronous", SQLITE_SYNCHRONOUS)]
+    pragmas += [("cache_size", SQLITE_CACHE_SIZE), ("mmap_size", SQLITE_MMAP_SIZE)]
+    return pragmas
+
+
+def _set_sqlite_pragmas(engine: Engine, read_only: bool):
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_db_engine(url: str, read_only: bool = False) -> Engine:
+    """
+    Create a sync engine, tuning SQLite connections with sqlite_pragmas()
+    """
+    if not _is_sqlite(url):
+        return create_engine(url, pool_pre_ping=True)
+
+    # SQLite connections are shared across the threadpool's threads
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    _set_sqlite_pragmas(engine, read_only)
+    return engine
+
+
+def create_async_db_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    """
+    Create an async engine for the same database through its async driver,
+    tuning SQLite connections with sqlite_pragmas()
+    """
+    if not _is_sqlite(url):
+        return create_async_engine(async_database_url(url), pool_pre_ping=True)
+
+    engine = create_async_engine(async_database_url(url))
+    _set_sqlite_pragmas(engine.sync_engine, read_only)
+    return engine
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API; the sync engine above is kept for migrations,
+# bulk loads and streaming exports, which run outside the event loop
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL)
+# Objects stay readable after commit so responses can be serialized without
+# lazy loads, which an async session can't do implicitly
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Separate read-only pools for GET endpoints, so reads never queue behind or
+# lock out writers (falls back to the main engines for in-memory databases)
+_read_url = SQLALCHEMY_READ_DATABASE_URL or read_only_database_url(SQLALCHEMY_DATABASE_URL)
+read_engine = create_db_engine(_read_url, read_only=True) if _read_url else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+async_read_engine = create_async_db_engine(_read_url, read_only=True) if _read_url else async_engine
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Sync sessions for the CPU-heavy CRUD calls the API runs on worker threads
+# (see async_crud.run_in_thread); like the async sessions, objects stay
+# readable after commit so responses can be serialized once they are closed
+ThreadSessionLocal = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+ReadThreadSessionLocal = sessionmaker(autoflush=False, expire_on_commit=False, bind=read_engine)
+
+
+def thread_sessionmaker_for(db: AsyncSession) -> sessionmaker:
+    """The worker-thread sessionmaker for the same pool (read-only or not) as an async session"""
+    return ReadThreadSessionLocal if db.bind is async_read_engine else ThreadSessionLocal
+
+
 Base = declarative_base()
 
 # Dependency
@@ -17,4 +160,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    """Session for endpoints that only read, served by the read-only pool"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -1,16 +1,51 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import decks_router, cards_router
-from app.database import engine
+from app.database import engine, SessionLocal
+from app.crud.name_index import card_name_index
+from app.crud.columnar import card_catalog
+from app.crud.deck_indexes import build_deck_indexes
+from app.crud.query_cache import sync_catalog_generation
 from app.models import models
+from app.migrations import run_migrations
+from app.utils import start_client, close_client, import_jobs
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Share one pooled Scryfall client across all requests
+    await start_client()
+    
+    # Build the in-memory card name index used by autocomplete, the
+    # columnar catalog card searches are evaluated against and the deck
+    # similarity and card co-occurrence indexes
+    db = SessionLocal()
+    try:
+        sync_catalog_generation(db)
+        card_name_index.build(db)
+        card_catalog.build(db)
+        build_deck_indexes(db)
+    finally:
+        db.close()
+    
+    # Background deck import workers
+    import_jobs.start()
+    
+    yield
+    await import_jobs.stop()
+    await close_client()
+
 
 app = FastAPI(
     title="MTG Deck Manager API",
     description="API for managing Magic: The Gathering decks",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -20,7 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Search-Source", "ETag"],
 )
 
 # Include routers
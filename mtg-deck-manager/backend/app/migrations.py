@@ -0,0 +1,72 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.models.card_fields import card_derived_fields
+from app.models.card_search import create_card_search_index
+
+
+# Columns added to existing tables after their first release: (table, column, type, indexed)
+ADDED_COLUMNS = [
+    ("cards", "primary_type", "VARCHAR", True),
+    ("cards", "color_mask", "INTEGER", True),
+    ("cards", "color_identity", "VARCHAR", False),
+    ("cards", "color_identity_mask", "INTEGER", True),
+]
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _add_missing_columns(engine: Engine):
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, column_type, indexed in ADDED_COLUMNS:
+            existing = {col["name"] for col in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+            if indexed:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})"
+                ))
+
+
+def _backfill_card_fields(engine: Engine):
+    """
+    Fill the derived card columns for rows written before they existed
+    """
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, type_line, colors, color_identity, mana_cost, oracle_text FROM cards "
+                "WHERE color_mask IS NULL OR color_identity_mask IS NULL LIMIT :limit"
+            ), {"limit": BACKFILL_BATCH_SIZE}).all()
+            if not rows:
+                return
+            conn.execute(
+                text(
+                    "UPDATE cards SET primary_type = :primary_type, color_mask = :color_mask, "
+                    "color_identity_mask = :color_identity_mask WHERE id = :id"
+                ),
+                [{"id": row.id, **card_derived_fields(row)} for row in rows]
+            )
+
+
+def _seed_catalog_state(engine: Engine):
+    """
+    Create the single catalog_state row that bulk loads bump
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO catalog_state (id, generation) "
+            "SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM catalog_state WHERE id = 1)"
+        ))
+
+
+def run_migrations(engine: Engine):
+    """
+    Bring an existing database up to date with the current models
+    (run after Base.metadata.create_all)
+    """
+    _add_missing_columns(engine)
+    _backfill_card_fields(engine)
+    _seed_catalog_state(engine)
+    create_card_search_index(engine)
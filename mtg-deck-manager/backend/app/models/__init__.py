@@ -1 +1 @@
-from app.models.models import Deck, Card, DeckCard
\ No newline at end of file
+from app.models.models import Deck, Card, DeckCard, CatalogState
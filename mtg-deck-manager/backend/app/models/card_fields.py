@@ -0,0 +1,94 @@
+import re
+from typing import Dict, List, Optional
+
+
+# Bit assigned to each color in Card.color_mask / Card.color_identity_mask (WUBRG order)
+COLOR_BITS = {"W": 1, "U": 2, "B": 4, "R": 8, "G": 16}
+
+# Set instead of any color bit for colorless cards
+COLORLESS_BIT = 32
+
+# Every mask a card can have: one or more colors, or colorless
+VALID_MASKS = list(range(1, 32)) + [COLORLESS_BIT]
+
+_MANA_SYMBOL = re.compile(r"\{([^}]+)\}")
+
+# Words that can precede a card's main type in its type line
+SUPERTYPES = {"Basic", "Legendary", "Snow", "World", "Ongoing", "Elite", "Host"}
+
+
+def color_mask(colors: Optional[str]) -> int:
+    """
+    Convert a comma-separated color string ("W,U") to a bitmask;
+    no colors (or "C") gives the colorless bit
+    """
+    mask = 0
+    for color in (colors or "").replace(",", "").upper():
+        mask |= COLOR_BITS.get(color, 0)
+    return mask or COLORLESS_BIT
+
+
+def mana_symbol_colors(*texts: Optional[str]) -> str:
+    """
+    Colors of the mana symbols in costs or rules text, e.g. "{2}{W/U}" -> "W,U"
+    """
+    colors = set()
+    for text in texts:
+        for symbol in _MANA_SYMBOL.findall(text or ""):
+            colors.update(color for color in symbol.upper().split("/") if color in COLOR_BITS)
+    return ",".join(color for color in COLOR_BITS if color in colors)
+
+
+def subset_masks(mask: int) -> List[int]:
+    """
+    Every valid mask whose colors all lie within `mask`; colorless always qualifies
+    """
+    colors = mask & ~COLORLESS_BIT
+    return [value for value in VALID_MASKS if value == COLORLESS_BIT or value & ~colors == 0]
+
+
+def superset_masks(mask: int) -> List[int]:
+    """
+    Every valid mask containing all the colors of `mask`
+    """
+    return [value for value in VALID_MASKS if value & mask == mask]
+
+
+def colors_from_mask(mask: int):
+    """
+    List the color letters set in a bitmask, in WUBRG order
+    """
+    return [color for color, bit in COLOR_BITS.items() if mask & bit]
+
+
+def primary_type(type_line: Optional[str]) -> Optional[str]:
+    """
+    Reduce a type line to its main card type, e.g.
+    "Legendary Creature — Elf Druid" -> "Creature"
+    """
+    if not type_line:
+        return None
+    words = type_line.split("—")[0].split("//")[0].split()
+    for word in words:
+        if word not in SUPERTYPES:
+            return word
+    return words[0] if words else None
+
+
+def card_derived_fields(card) -> Dict[str, object]:
+    """
+    Values of the precomputed Card columns for a card (ORM row, schema or result row)
+
+    Cards saved before color identity was recorded get it approximated from
+    their colors plus the mana symbols in their cost and rules text.
+    """
+    color_identity = card.color_identity
+    if color_identity is None:
+        color_identity = ",".join(filter(None, [
+            card.colors, mana_symbol_colors(card.mana_cost, card.oracle_text)
+        ]))
+    return {
+        "primary_type": primary_type(card.type_line),
+        "color_mask": color_mask(card.colors),
+        "color_identity_mask": color_mask(color_identity)
+    }
@@ -0,0 +1,94 @@
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+
+
+# Columns of the cards table mirrored into the full-text index
+FTS_COLUMNS = ["name", "type_line", "oracle_text"]
+
+# Trigram tokens are three characters long, so shorter terms can't use the index
+FTS_MIN_TERM_LENGTH = 3
+
+# Lightweight handle on the FTS5 table for building queries
+cards_fts = table("cards_fts", column("rowid"), column("rank"))
+
+_state = {"enabled": False}
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE cards_fts USING fts5(
+        name, type_line, oracle_text,
+        content='cards', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_fts_after_insert AFTER INSERT ON cards BEGIN
+        INSERT INTO cards_fts(rowid, name, type_line, oracle_text)
+        VALUES (new.id, new.name, new.type_line, new.oracle_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_fts_after_delete AFTER DELETE ON cards BEGIN
+        INSERT INTO cards_fts(cards_fts, rowid, name, type_line, oracle_text)
+        VALUES ('delete', old.id, old.name, old.type_line, old.oracle_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_fts_after_update
+    AFTER UPDATE OF name, type_line, oracle_text ON cards BEGIN
+        INSERT INTO cards_fts(cards_fts, rowid, name, type_line, oracle_text)
+        VALUES ('delete', old.id, old.name, old.type_line, old.oracle_text);
+        INSERT INTO cards_fts(rowid, name, type_line, oracle_text)
+        VALUES (new.id, new.name, new.type_line, new.oracle_text);
+    END
+    """,
+]
+
+
+def create_card_search_index(engine: Engine):
+    """
+    Create the FTS5 trigram index over card text, kept in sync with cards by
+    triggers, and populate it from existing rows the first time.
+    Only SQLite builds with FTS5 get the index; otherwise searches keep using LIKE.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cards_fts'"
+        )).first()
+        try:
+            if not exists:
+                conn.execute(text(_DDL[0]))
+                conn.execute(text("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')"))
+            for statement in _DDL[1:]:
+                conn.execute(text(statement))
+        except Exception as e:
+            print(f"Warning: full-text card search unavailable: {e}")
+            return
+
+    _state["enabled"] = True
+
+
+def card_search_enabled() -> bool:
+    return _state["enabled"]
+
+
+def fts_query(field: str, term: str) -> str:
+    """
+    Build an FTS5 MATCH expression for a substring of one column
+    """
+    return f'{field} : "{term.replace(chr(34), chr(34) * 2)}"'
+
+
+def fts_can_search(field: str, term: str) -> bool:
+    return card_search_enabled() and field in FTS_COLUMNS and len(term) >= FTS_MIN_TERM_LENGTH
+
+
+def fts_matches(field: str, term: str):
+    """
+    Select (rowid, rank) of cards whose `field` contains `term`, best match first
+    """
+    return select(cards_fts.c.rowid, cards_fts.c.rank).where(
+        literal_column("cards_fts").op("MATCH")(fts_query(field, term))
+    )
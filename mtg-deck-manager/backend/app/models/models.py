@@ -30,6 +30,10 @@ class Card(Base):
     mana_cost = Column(String, nullable=True)
     cmc = Column(Integer, nullable=True)
     colors = Column(String, nullable=True)  # Store as comma-separated values
+    color_mask = Column(Integer, nullable=True, index=True)  # WUBRG bitmask derived from colors
+    color_identity = Column(String, nullable=True)  # Store as comma-separated values
+    color_identity_mask = Column(Integer, nullable=True, index=True)  # WUBRG bitmask of color_identity
+    primary_type = Column(String, nullable=True, index=True)  # Main type derived from type_line
     rarity = Column(String, nullable=True)
     set_code = Column(String, nullable=True)
     collector_number = Column(String, nullable=True)
@@ -51,4 +55,13 @@ class DeckCard(Base):
 
     # Relationships
     deck = relationship("Deck", back_populates="cards")
-    card = relationship("Card", back_populates="decks")
\ No newline at end of file
+    card = relationship("Card", back_populates="decks")
+
+
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+
+    id = Column(Integer, primary_key=True)
+    # Bumped in the same transaction as catalog changes made outside the API
+    # process (bulk loads), so running servers notice them
+    generation = Column(Integer, nullable=False, default=0)
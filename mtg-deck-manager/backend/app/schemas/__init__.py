@@ -1,6 +1,7 @@
 from app.schemas.schemas import (
     Card, CardBase, CardCreate, 
-    Deck, DeckBase, DeckCreate, DeckWithCards,
+    Deck, DeckBase, DeckCreate, DeckWithCards, DeckSummary, SimilarDeck,
     DeckCard, DeckCardBase, DeckCardCreate,
-    DeckImport, DeckStatistics, CardSearch
+    DeckImport, DeckStatistics, DeckProbabilities, CardSearch, CardSuggestion,
+    ImportJobProgress, ImportJobStatus
 )
\ No newline at end of file
@@ -11,6 +11,7 @@ class CardBase(BaseModel):
     mana_cost: Optional[str] = None
     cmc: Optional[int] = None
     colors: Optional[str] = None
+    color_identity: Optional[str] = None
     rarity: Optional[str] = None
     set_code: Optional[str] = None
     collector_number: Optional[str] = None
@@ -59,6 +60,15 @@ class DeckCreate(DeckBase):
     pass
 
 
+class DeckSummary(DeckBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class Deck(DeckBase):
     id: int
     created_at: datetime
@@ -73,6 +83,51 @@ class DeckWithCards(Deck):
     cards: List[DeckCard]
 
 
+class SimilarDeck(DeckSummary):
+    similarity: float  # Estimated Jaccard similarity of the two decks' card lists
+
+
+class CardSuggestion(BaseModel):
+    card: Card
+    score: float  # Share of decks playing the given cards that also play this one
+    decks: int  # Decks playing this card
+
+
+
+class OpeningHandOdds(BaseModel):
+    land_distribution: Dict[str, float]  # P(exactly n lands in the opening 7)
+    at_least_lands: Dict[str, float]  # P(at least n lands in the opening 7)
+    keep_min_lands: int
+    keep_max_lands: int
+    keep: float  # P(the opening 7 has a keepable number of lands)
+    keep_by_mulligans: List[float]  # P(kept a hand by the time of 0, 1, ... mulligans)
+
+
+class LandDropOdds(BaseModel):
+    turn: int
+    expected_lands: float  # Expected lands in play
+    on_curve: float  # P(a land was played every turn so far)
+
+
+class CardCastOdds(BaseModel):
+    name: str
+    quantity: int
+    cmc: int
+    method: str  # exact or monte_carlo
+    castable_by_turn: List[float]  # P(castable) by turn 1, 2, ...
+
+
+class DeckProbabilities(BaseModel):
+    deck_size: int
+    lands: int
+    turns: int
+    on_the_draw: bool
+    samples: int  # Simulated shuffles (0 if every card was computed exactly)
+    cached: bool
+    opening_hand: OpeningHandOdds
+    land_drops: List[LandDropOdds]
+    cards: List[CardCastOdds]
+
 # Schema for importing a deck from MTGA format
 class DeckImport(BaseModel):
     deck_text: str
@@ -82,6 +137,27 @@ class DeckImport(BaseModel):
     tags: Optional[str] = None
 
 
+# Schemas for background deck import jobs
+class ImportJobProgress(BaseModel):
+    lines_parsed: int
+    cards_total: int
+    cards_resolved: int
+    rows_written: int
+
+
+class ImportJobStatus(BaseModel):
+    id: str
+    batch_id: Optional[str] = None
+    name: str
+    status: str  # queued, running, succeeded or failed
+    progress: ImportJobProgress
+    deck_id: Optional[int] = None
+    not_found: List[str] = []
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
 # Schema for deck statistics
 class DeckStatistics(BaseModel):
     total_cards: int
@@ -99,5 +175,6 @@ class CardSearch(BaseModel):
     colors: Optional[str] = None
     type_line: Optional[str] = None
     cmc: Optional[int] = None
+    color_identity: Optional[str] = None
     rarity: Optional[str] = None
     set_code: Optional[str] = None
\ No newline at end of file
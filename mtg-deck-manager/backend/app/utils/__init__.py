@@ -1,9 +1,17 @@
 from app.utils.scryfall import (
     get_card_by_name, search_cards, get_card_by_set_and_number,
-    scryfall_to_card_model, get_cards_batch
+    scryfall_to_card_model, get_cards_batch, resolve_card_identifiers,
+    ScryfallFetcher, ScryfallSearch, ScryfallUnavailable, get_default_fetcher,
+    start_client, close_client, get_client, client_stats
 )
 
+from app.utils.scryfall_cache import ScryfallCache, get_scryfall_cache
+
+from app.utils.scryfall_query import parse_scryfall_query, ScryfallQueryError, UnsupportedQuery
+
 from app.utils.deck_parser import (
-    parse_mtga_deck, get_unique_cards_from_deck,
-    fetch_card_data_for_deck, import_deck_to_db
-)
\ No newline at end of file
+    ImportProgress, parse_mtga_deck, get_unique_cards_from_deck,
+    fetch_card_data_for_deck, save_imported_deck, import_deck_to_db
+)
+
+from app.utils.import_jobs import ImportJob, ImportJobQueue, import_jobs
@@ -0,0 +1,162 @@
+import gzip
+import json
+from typing import Any, Dict, IO, Iterator, List
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.models import Card
+from app.models.card_fields import card_derived_fields
+from app.crud.query_cache import bump_catalog_generation
+from app.utils.scryfall import scryfall_to_card_model
+
+
+DEFAULT_BATCH_SIZE = 2000
+READ_CHUNK_SIZE = 1 << 20
+
+CARD_FIELDS = [
+    "name", "scryfall_id", "image_uri", "type_line", "mana_cost", "cmc", "colors",
+    "color_identity", "rarity", "set_code", "collector_number", "oracle_text", "additional_data"
+]
+
+
+def iter_json_array(fp: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Incrementally parse a top-level JSON array, yielding one element at a time
+
+    Only the current read chunk plus the element being decoded are held in
+    memory, so multi-hundred-MB Scryfall dumps can be processed in constant space.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            chunk = fp.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("Bulk data file must contain a JSON array")
+            started = True
+            position += 1
+            continue
+
+        if buffer[position] == "]":
+            return
+
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The element straddles the chunk boundary; read more and retry
+            if eof:
+                raise
+            chunk = fp.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+
+        if end == len(buffer) and not eof:
+            # A bare scalar may continue in the next chunk; decode it again with more data
+            chunk = fp.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+
+        yield element
+        position = end
+
+
+def open_bulk_file(path: str) -> IO[str]:
+    """
+    Open a Scryfall bulk-data dump, transparently handling gzip-compressed files
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _upsert_batch(db: Session, batch: List[Dict[str, Any]], stats: Dict[str, int]):
+    changed_before = stats["inserted"] + stats["updated"]
+    existing = {
+        card.scryfall_id: card
+        for card in db.scalars(
+            select(Card).where(Card.scryfall_id.in_([values["scryfall_id"] for values in batch]))
+        )
+    }
+
+    new_rows = []
+    for values in batch:
+        db_card = existing.get(values["scryfall_id"])
+        if db_card is None:
+            new_rows.append(values)
+            continue
+
+        changed = False
+        for field, value in values.items():
+            if getattr(db_card, field) != value:
+                setattr(db_card, field, value)
+                changed = True
+        if changed:
+            stats["updated"] += 1
+        else:
+            stats["unchanged"] += 1
+
+    if new_rows:
+        db.execute(insert(Card), new_rows)
+        stats["inserted"] += len(new_rows)
+
+    # Only batches that changed the catalog invalidate cached searches; the
+    # generation is persisted because this runs outside the API process
+    if stats["inserted"] + stats["updated"] > changed_before:
+        bump_catalog_generation(db)
+    db.commit()
+    # Drop the batch from the identity map so memory stays bounded
+    db.expunge_all()
+
+
+def load_bulk_file(db: Session, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Upsert every card in a Scryfall default-cards/oracle-cards dump into the cards table
+
+    Entries are streamed from disk and written in batched transactions of
+    `batch_size` cards. Rows whose data is identical to the dump are left untouched,
+    so re-running against a newer dump only updates what changed.
+    """
+    stats = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    batch: Dict[str, Dict[str, Any]] = {}
+
+    with open_bulk_file(path) as fp:
+        for entry in iter_json_array(fp):
+            stats["read"] += 1
+            if not isinstance(entry, dict) or entry.get("object") != "card" or not entry.get("id"):
+                stats["skipped"] += 1
+                continue
+
+            card = scryfall_to_card_model(entry)
+            batch[card.scryfall_id] = {
+                **card.model_dump(include=set(CARD_FIELDS)),
+                **card_derived_fields(card)
+            }
+
+            if len(batch) >= batch_size:
+                _upsert_batch(db, list(batch.values()), stats)
+                batch = {}
+                print(f"Processed {stats['read']} entries...")
+
+        if batch:
+            _upsert_batch(db, list(batch.values()), stats)
+
+    return stats
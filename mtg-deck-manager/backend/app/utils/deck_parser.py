@@ -1,12 +1,46 @@
-from typing import Dict, List, Tuple, Set
+from typing import Callable, Dict, List, Optional, Tuple, Set
 import re
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.crud import get_or_create_card
-from app.schemas import CardCreate
-from app.utils.scryfall import get_card_by_name, scryfall_to_card_model
+from app.crud import (
+    get_cards_by_names, get_cards_by_printings, bulk_get_or_create_cards, add_cards_to_deck,
+    refresh_deck_indexes
+)
+from app.crud.async_crud import run_in_thread
+from app.models import Deck
+from app.schemas import CardCreate, DeckCardCreate
+from app.utils.scryfall import ScryfallFetcher, resolve_card_identifiers
 import asyncio
 
 
+class ImportProgress:
+    """
+    Counters a deck import updates as it goes, so background jobs can report
+    how far along they are
+    """
+
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
+        self.lines_parsed = 0
+        self.cards_total = 0
+        self.cards_resolved = 0
+        self.rows_written = 0
+        self.on_change = on_change
+
+    def update(self, **counters):
+        for name, value in counters.items():
+            setattr(self, name, value)
+        if self.on_change is not None:
+            self.on_change()
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "lines_parsed": self.lines_parsed,
+            "cards_total": self.cards_total,
+            "cards_resolved": self.cards_resolved,
+            "rows_written": self.rows_written
+        }
+
+
 async def parse_mtga_deck(deck_text: str) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
     """
     Parse MTGA deck format and return main deck and sideboard cards
@@ -68,36 +102,178 @@ async def get_unique_cards_from_deck(main_deck: List[Tuple[int, str]], sideboard
     return unique_cards
 
 
-async def fetch_card_data_for_deck(main_deck: List[Tuple[int, str]], sideboard: List[Tuple[int, str]]) -> Dict[str, CardCreate]:
+def card_identifier(card_name: str) -> Dict[str, str]:
     """
-    Fetch card data from Scryfall for all cards in a deck
+    Build a Scryfall collection identifier for a deck line's card name
+
+    MTGA exports may append the printing, e.g. "Lightning Bolt (M10) 146",
+    which is resolved by set and collector number; plain names by name.
     """
-    unique_cards = await get_unique_cards_from_deck(main_deck, sideboard)
+    match = re.match(r'^(.+?)\s+\(([A-Za-z0-9]+)\)\s+(\S+)$', card_name)
+    if match:
+        return {"set": match.group(2).lower(), "collector_number": match.group(3)}
+    return {"name": card_name}
+
+
+def card_name_without_printing(card_name: str) -> str:
+    """
+    Strip an MTGA "(SET) number" suffix from a card name
+    """
+    return re.sub(r'\s+\([A-Za-z0-9]+\)\s+\S+$', '', card_name)
+
+
+def resolve_local_cards(db: Session, card_names: List[str]) -> Dict[str, CardCreate]:
+    """
+    Resolve deck line names against the local card catalog with two batched queries
+    """
+    identifiers = {card_name: card_identifier(card_name) for card_name in card_names}
+    
+    by_name = get_cards_by_names(db, [
+        identifier["name"] for identifier in identifiers.values() if "name" in identifier
+    ])
+    by_printing = get_cards_by_printings(db, [
+        (identifier["set"], identifier["collector_number"])
+        for identifier in identifiers.values() if "name" not in identifier
+    ])
     
-    # Fetch card data for each unique card
     card_data = {}
-    for card_name in unique_cards:
-        scryfall_data = await get_card_by_name(card_name)
-        if scryfall_data:
-            card_model = scryfall_to_card_model(scryfall_data)
-            card_data[card_name] = card_model
+    for card_name, identifier in identifiers.items():
+        if "name" in identifier:
+            db_card = by_name.get(identifier["name"])
+        else:
+            db_card = by_printing.get((identifier["set"], identifier["collector_number"]))
+        if db_card is not None:
+            card_data[card_name] = CardCreate.model_validate(db_card, from_attributes=True)
     
     return card_data
 
 
-async def import_deck_to_db(
+async def fetch_card_data_for_deck(
+    main_deck: List[Tuple[int, str]],
+    sideboard: List[Tuple[int, str]],
+    fetcher: Optional[ScryfallFetcher] = None,
+    db: Optional[AsyncSession] = None,
+    progress: Optional[ImportProgress] = None
+) -> Dict[str, CardCreate]:
+    """
+    Fetch card data from Scryfall for all cards in a deck
+    
+    When a session is given, names already in the local catalog (e.g. loaded with
+    `manage.py bulk-load`) are resolved from the database and never hit the network.
+    The rest are resolved with batched /cards/collection requests (75 per request).
+    Printings Scryfall does not recognise are retried once by name alone;
+    names that still cannot be resolved are left out of the result.
+    """
+    progress = progress or ImportProgress()
+    unique_cards = list(await get_unique_cards_from_deck(main_deck, sideboard))
+    progress.update(cards_total=len(unique_cards))
+    
+    card_data = await db.run_sync(resolve_local_cards, unique_cards) if db is not None else {}
+    progress.update(cards_resolved=len(card_data))
+    unique_cards = [card_name for card_name in unique_cards if card_name not in card_data]
+    if not unique_cards:
+        return card_data
+    
+    identifiers = [card_identifier(card_name) for card_name in unique_cards]
+    cards, not_found = await resolve_card_identifiers(identifiers, fetcher)
+    
+    for card_name, card in zip(unique_cards, cards):
+        if card is not None:
+            card_data[card_name] = card
+    progress.update(cards_resolved=len(card_data))
+    
+    retry_names = [
+        unique_cards[index] for index in not_found
+        if "name" not in identifiers[index]
+    ]
+    if retry_names:
+        retry_cards, _ = await resolve_card_identifiers(
+            [{"name": card_name_without_printing(card_name)} for card_name in retry_names],
+            fetcher
+        )
+        for card_name, card in zip(retry_names, retry_cards):
+            if card is not None:
+                card_data[card_name] = card
+        progress.update(cards_resolved=len(card_data))
+    
+    return card_data
+
+
+def save_imported_deck(
     db: Session,
+    main_deck: List[Tuple[int, str]],
+    sideboard: List[Tuple[int, str]],
+    card_data: Dict[str, CardCreate],
+    deck_name: str,
+    deck_description: str = None,
+    deck_format: str = None,
+    deck_tags: str = None,
+    progress: Optional[ImportProgress] = None
+) -> Deck:
+    """
+    Write a parsed deck and its resolved cards to the database
+    
+    The deck, any missing cards and all deck entries are written with bulk
+    INSERTs in a single transaction, which is rolled back if anything fails.
+    """
+    progress = progress or ImportProgress()
+    try:
+        # Create the deck
+        print("Creating deck in database...")
+        db_deck = Deck(
+            name=deck_name,
+            description=deck_description,
+            format=deck_format,
+            tags=deck_tags
+        )
+        db.add(db_deck)
+        db.flush()
+        progress.update(rows_written=1)
+        print(f"Created deck with ID: {db_deck.id}")
+        
+        # Resolve every card with one query and insert the missing ones in bulk
+        card_names = list(card_data)
+        db_cards = bulk_get_or_create_cards(db, [card_data[card_name] for card_name in card_names])
+        card_ids = {card_name: db_card.id for card_name, db_card in zip(card_names, db_cards)}
+        
+        deck_cards = [
+            DeckCardCreate(card_id=card_ids[card_name], quantity=quantity, is_sideboard=is_sideboard)
+            for is_sideboard, lines in ((False, main_deck), (True, sideboard))
+            for quantity, card_name in lines
+            if card_name in card_ids
+        ]
+        add_cards_to_deck(db, db_deck.id, deck_cards)
+        
+        db.commit()
+        progress.update(rows_written=1 + len(deck_cards))
+    except Exception:
+        db.rollback()
+        progress.update(rows_written=0)
+        raise
+    
+    refresh_deck_indexes(db, [db_deck.id])
+    return db_deck
+
+
+async def import_deck_to_db(
+    db: AsyncSession,
     deck_text: str,
     deck_name: str,
     deck_description: str = None,
     deck_format: str = None,
-    deck_tags: str = None
+    deck_tags: str = None,
+    progress: Optional[ImportProgress] = None
 ) -> Dict:
     """
     Import a deck from MTGA format to the database
-    """
-    from app.crud import create_deck, add_card_to_deck
     
+    Card lookups and Scryfall requests are awaited and the deck is written in
+    one transaction on a worker thread (see save_imported_deck), so an import
+    never blocks the event loop while it waits on the database or the network,
+    or while the deck indexes are refreshed. Pass an
+    ImportProgress to follow the import as it runs.
+    """
+    progress = progress or ImportProgress()
     # Log function entry
     print(f"Starting import_deck_to_db for deck: {deck_name}")
     
@@ -106,26 +282,24 @@ async def import_deck_to_db(
         print("Parsing deck text...")
         main_deck, sideboard = await parse_mtga_deck(deck_text)
         print(f"Parsed deck: {len(main_deck)} main deck cards, {len(sideboard)} sideboard cards")
+        progress.update(lines_parsed=len(main_deck) + len(sideboard))
         
         # Fetch card data from Scryfall
         print("Fetching card data from Scryfall...")
-        card_data = await fetch_card_data_for_deck(main_deck, sideboard)
+        card_data = await fetch_card_data_for_deck(main_deck, sideboard, db=db, progress=progress)
         print(f"Fetched data for {len(card_data)} unique cards")
         
-        # Create the deck
-        from app.schemas import DeckCreate
+        not_found = sorted({
+            card_name for _, card_name in main_deck + sideboard
+            if card_name not in card_data
+        })
+        if not_found:
+            print(f"Cards not found on Scryfall: {not_found}")
         
-        print("Creating deck in database...")
-        deck_data = DeckCreate(
-            name=deck_name,
-            description=deck_description,
-            format=deck_format,
-            tags=deck_tags
+        db_deck = await run_in_thread(
+            db, save_imported_deck, main_deck, sideboard, card_data,
+            deck_name, deck_description, deck_format, deck_tags, progress
         )
-        
-        print(f"Deck data: {deck_data}")
-        db_deck = create_deck(db, deck_data)
-        print(f"Created deck with ID: {db_deck.id}")
     except Exception as e:
         print(f"Error in import_deck_to_db: {str(e)}")
         print(f"Error type: {type(e)}")
@@ -133,44 +307,11 @@ async def import_deck_to_db(
         traceback.print_exc()
         raise
     
-    # Add cards to the deck
-    for quantity, card_name in main_deck:
-        if card_name in card_data:
-            # Get or create the card in the database
-            db_card = get_or_create_card(db, card_data[card_name])
-            
-            # Add the card to the deck
-            from app.schemas import DeckCardCreate
-            
-            deck_card = DeckCardCreate(
-                card_id=db_card.id,
-                quantity=quantity,
-                is_sideboard=False
-            )
-            
-            add_card_to_deck(db, db_deck.id, deck_card)
-    
-    # Add sideboard cards
-    for quantity, card_name in sideboard:
-        if card_name in card_data:
-            # Get or create the card in the database
-            db_card = get_or_create_card(db, card_data[card_name])
-            
-            # Add the card to the deck
-            from app.schemas import DeckCardCreate
-            
-            deck_card = DeckCardCreate(
-                card_id=db_card.id,
-                quantity=quantity,
-                is_sideboard=True
-            )
-            
-            add_card_to_deck(db, db_deck.id, deck_card)
-    
     return {
         "deck_id": db_deck.id,
         "name": db_deck.name,
         "main_deck_count": sum(quantity for quantity, _ in main_deck),
         "sideboard_count": sum(quantity for quantity, _ in sideboard),
-        "unique_cards": len(card_data)
-    }
\ No newline at end of file
+        "unique_cards": len(card_data),
+        "not_found": not_found
+    }
@@ -0,0 +1,203 @@
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from app.crud.async_crud import run_in_thread
+from app.database import AsyncSessionLocal
+from app.schemas import DeckImport
+from app.utils.deck_parser import (
+    ImportProgress, parse_mtga_deck, get_unique_cards_from_deck,
+    fetch_card_data_for_deck, save_imported_deck
+)
+
+
+# Import worker settings (overridable through the environment)
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_QUEUE_SIZE = int(os.getenv("IMPORT_QUEUE_SIZE", "100"))
+IMPORT_JOBS_KEPT = int(os.getenv("IMPORT_JOBS_KEPT", "1000"))
+
+
+class ImportJob:
+    """
+    One deck import submitted to the background queue, with its progress
+    """
+
+    def __init__(self, request: DeckImport, batch_id: Optional[str] = None):
+        self.id = uuid4().hex
+        self.batch_id = batch_id
+        self.request = request
+        self.status = "queued"
+        self.progress = ImportProgress(on_change=self._changed)
+        self.deck_id: Optional[int] = None
+        self.not_found: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._change = asyncio.Event()
+        # Progress is also reported from the worker thread writing the deck
+        self._loop = asyncio.get_running_loop()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def _changed(self):
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if not on_loop:
+            self._loop.call_soon_threadsafe(self._changed)
+            return
+        # Wake everyone waiting on the current event, later waiters get a new one
+        change, self._change = self._change, asyncio.Event()
+        change.set()
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        if self.finished:
+            self.finished_at = datetime.utcnow()
+        self._changed()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait until the job's status or progress changes; False on timeout"""
+        try:
+            await asyncio.wait_for(self._change.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "batch_id": self.batch_id,
+            "name": self.request.name,
+            "status": self.status,
+            "progress": self.progress.to_dict(),
+            "deck_id": self.deck_id,
+            "not_found": self.not_found,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class ImportJobQueue:
+    """
+    Bounded pool of workers running deck imports in the background
+
+    Each submission (one deck or a batch of decks) is queued as a unit. A batch
+    resolves the cards of all its decks together, so cards shared between the
+    decks are looked up once, then writes each deck in its own transaction so
+    one bad deck doesn't fail the others.
+    """
+
+    def __init__(self, workers: int = IMPORT_WORKERS, max_queued: int = IMPORT_QUEUE_SIZE,
+                 jobs_kept: int = IMPORT_JOBS_KEPT):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.jobs_kept = jobs_kept
+        self.jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, requests: List[DeckImport]) -> List[ImportJob]:
+        """
+        Queue deck imports as one unit, returning their jobs
+
+        Raises RuntimeError if the queue isn't running and asyncio.QueueFull
+        if too many submissions are already waiting.
+        """
+        if self._queue is None:
+            raise RuntimeError("The import queue is not running")
+        batch_id = uuid4().hex if len(requests) > 1 else None
+        jobs = [ImportJob(request, batch_id) for request in requests]
+        self._queue.put_nowait(jobs)
+        for job in jobs:
+            self._remember(job)
+        return jobs
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self.jobs.get(job_id)
+
+    def _remember(self, job: ImportJob):
+        self.jobs[job.id] = job
+        # Forget the oldest finished jobs once over the limit
+        while len(self.jobs) > self.jobs_kept:
+            oldest = next(iter(self.jobs.values()))
+            if not oldest.finished:
+                break
+            del self.jobs[oldest.id]
+
+    async def _work(self):
+        while True:
+            jobs = await self._queue.get()
+            try:
+                await self._run(jobs)
+            except Exception as e:
+                print(f"Import batch failed: {e}")
+                for job in jobs:
+                    if not job.finished:
+                        job.set_status("failed", str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, jobs: List[ImportJob]):
+        parsed = {}
+        for job in jobs:
+            job.set_status("running")
+            main_deck, sideboard = await parse_mtga_deck(job.request.deck_text)
+            parsed[job.id] = (main_deck, sideboard)
+            job.progress.update(lines_parsed=len(main_deck) + len(sideboard))
+
+        async with AsyncSessionLocal() as db:
+            # Resolve every deck's cards together; a lone job reports its own progress
+            card_data = await fetch_card_data_for_deck(
+                [line for job in jobs for line in parsed[job.id][0]],
+                [line for job in jobs for line in parsed[job.id][1]],
+                db=db,
+                progress=jobs[0].progress if len(jobs) == 1 else None
+            )
+
+            for job in jobs:
+                main_deck, sideboard = parsed[job.id]
+                card_names = await get_unique_cards_from_deck(main_deck, sideboard)
+                job.not_found = sorted(card_names - card_data.keys())
+                job.progress.update(
+                    cards_total=len(card_names),
+                    cards_resolved=len(card_names) - len(job.not_found)
+                )
+
+                request = job.request
+                try:
+                    db_deck = await run_in_thread(
+                        db, save_imported_deck, main_deck, sideboard,
+                        {name: card_data[name] for name in card_names if name in card_data},
+                        request.name, request.description, request.format, request.tags,
+                        job.progress
+                    )
+                except Exception as e:
+                    print(f"Import of deck {request.name} failed: {e}")
+                    job.set_status("failed", str(e))
+                    continue
+
+                job.deck_id = db_deck.id
+                job.set_status("succeeded")
+
+
+import_jobs = ImportJobQueue()
@@ -1,63 +1,681 @@
 import httpx
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator, Awaitable, Callable, Hashable, Iterable, Tuple
 import asyncio
+import os
+import time
 from app.schemas import CardCreate
+from app.utils.scryfall_cache import (
+    ScryfallCache, get_scryfall_cache, identifier_key, name_key, printing_key, search_key
+)
 
 
-async def get_card_by_name(name: str) -> Optional[Dict[str, Any]]:
+SCRYFALL_API_URL = "https://api.scryfall.com"
+
+# Scryfall asks clients to keep to roughly 10 requests per second
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Maximum number of identifiers accepted by one /cards/collection request
+COLLECTION_BATCH_SIZE = 75
+
+# Shared HTTP client settings (overridable through the environment)
+SCRYFALL_MAX_CONNECTIONS = int(os.getenv("SCRYFALL_MAX_CONNECTIONS", "10"))
+SCRYFALL_MAX_KEEPALIVE = int(os.getenv("SCRYFALL_MAX_KEEPALIVE", "10"))
+SCRYFALL_KEEPALIVE_EXPIRY = float(os.getenv("SCRYFALL_KEEPALIVE_EXPIRY", "30"))
+SCRYFALL_CONNECT_TIMEOUT = float(os.getenv("SCRYFALL_CONNECT_TIMEOUT", "5"))
+SCRYFALL_READ_TIMEOUT = float(os.getenv("SCRYFALL_READ_TIMEOUT", "15"))
+SCRYFALL_HTTP2 = os.getenv("SCRYFALL_HTTP2", "1") == "1"
+
+class ScryfallUnavailable(Exception):
+    """A request whose answer is needed failed after its retries (network error, 429 or 5xx)"""
+
+
+SCRYFALL_HEADERS = {
+    "User-Agent": "MTGDeckManager/0.1",
+    "Accept": "application/json"
+}
+
+
+class ClientStats:
     """
-    Get card data from Scryfall API by exact name
+    Counters for requests sent through the shared Scryfall client
+
+    Whether a request opened a connection or reused a pooled one is read from
+    the transport's connection trace events. Transports that emit none (e.g.
+    httpx.MockTransport) leave their requests untraced, and as_dict reports
+    reuse as unknown (None) until some request is traced.
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.scryfall.com/cards/named",
-            params={"exact": name}
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        return None
 
+    def __init__(self):
+        self.reset()
 
-async def search_cards(query: str) -> List[Dict[str, Any]]:
+    def reset(self):
+        self.requests = 0
+        self.traced_requests = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "traced_requests": self.traced_requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused if self.traced_requests else None,
+            "total_latency": self.total_latency,
+            "average_latency": self.total_latency / self.requests if self.requests else 0.0,
+            "max_latency": self.max_latency
+        }
+
+
+client_stats = ClientStats()
+
+_client: Optional[httpx.AsyncClient] = None
+
+# Trace events marking a new connection, and a request going out on some connection
+CONNECT_EVENTS = ("connection.connect_tcp.complete", "connection.connect_unix_socket.complete")
+SEND_EVENTS = ("http11.send_request_headers.started", "http2.send_request_headers.started")
+
+
+def _connection_tracer(trace: Dict[str, bool]):
+    async def trace_connection(event_name: str, info: Dict[str, Any]):
+        # httpcore emits connect events only when the pool has to open a new connection
+        if event_name in CONNECT_EVENTS:
+            trace["connected"] = True
+            client_stats.connections_opened += 1
+        elif event_name in SEND_EVENTS:
+            trace["sent"] = True
+    return trace_connection
+
+
+async def _on_request(request: httpx.Request):
+    trace = {"connected": False, "sent": False}
+    request.extensions["trace"] = _connection_tracer(trace)
+    request.extensions["scryfall_trace"] = trace
+    request.extensions["scryfall_started_at"] = time.perf_counter()
+
+
+async def _on_response(response: httpx.Response):
+    started_at = response.request.extensions.get("scryfall_started_at")
+    if started_at is not None:
+        latency = time.perf_counter() - started_at
+        client_stats.requests += 1
+        client_stats.total_latency += latency
+        client_stats.max_latency = max(client_stats.max_latency, latency)
+    trace = response.request.extensions.get("scryfall_trace")
+    if trace is not None and trace["sent"]:
+        client_stats.traced_requests += 1
+        if not trace["connected"]:
+            client_stats.connections_reused += 1
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
     """
-    Search for cards using Scryfall API
+    Build a pooled Scryfall client with keep-alive, HTTP/2 (when h2 is installed)
+    and the configured timeouts
+    """
+    return httpx.AsyncClient(
+        headers=SCRYFALL_HEADERS,
+        http2=SCRYFALL_HTTP2 and transport is None and _http2_available(),
+        limits=httpx.Limits(
+            max_connections=SCRYFALL_MAX_CONNECTIONS,
+            max_keepalive_connections=SCRYFALL_MAX_KEEPALIVE,
+            keepalive_expiry=SCRYFALL_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(SCRYFALL_READ_TIMEOUT, connect=SCRYFALL_CONNECT_TIMEOUT),
+        transport=transport,
+        event_hooks={"request": [_on_request], "response": [_on_response]}
+    )
+
+
+async def start_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Create the process-wide Scryfall client (called on application startup)
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = create_client(transport)
+    return _client
+
+
+async def close_client():
+    """
+    Close the process-wide Scryfall client (called on application shutdown)
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide Scryfall client, creating it if startup has not run
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+class TokenBucket:
+    """
+    Async token bucket limiting how many requests may start per second
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller (the leader)
+    does the work and everyone asking for the key meanwhile awaits its result
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.scryfall.com/cards/search",
-            params={"q": query}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("data", [])
-        return []
 
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.led = 0
+        self.shared = 0
 
-async def get_card_by_set_and_number(set_code: str, collector_number: str) -> Optional[Dict[str, Any]]:
+    def claim(self, key: Hashable) -> Tuple[asyncio.Future, bool]:
+        """
+        The in-flight future for `key` and whether the caller now leads it;
+        a leader must finish the key with resolve() or fail()
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.led += 1
+        return future, True
+
+    def resolve(self, key: Hashable, result: Any):
+        future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def fail(self, key: Hashable, error: BaseException):
+        future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+                # Followers may not exist; don't warn about an unretrieved exception
+                future.exception()
+
+    async def wait(self, future: asyncio.Future) -> Any:
+        # Shielded so a cancelled follower doesn't cancel the leader's result
+        return await asyncio.shield(future)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn`, or join the call already running for `key`"""
+        while True:
+            future, leader = self.claim(key)
+            if leader:
+                break
+            try:
+                return await self.wait(future)
+            except asyncio.CancelledError:
+                # Lead a new call if the leader was cancelled, not this caller
+                if not future.cancelled():
+                    raise
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.fail(key, e)
+            raise
+        self.resolve(key, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "led": self.led, "shared": self.shared}
+
+
+class ScryfallFetcher:
     """
-    Get card data from Scryfall API by set code and collector number
+    Bounded-concurrency, rate-limited request engine for the Scryfall API
+
+    At most `max_in_flight` requests are outstanding at once and no more than
+    `requests_per_second` are started. Requests answered with 429 or a 5xx
+    status are retried with exponential backoff (honouring Retry-After).
+    
+    Card lookups go through the persistent response cache (see
+    scryfall_cache.ScryfallCache) unless `use_cache` is False, and concurrent
+    lookups of the same card (by name, id or printing) share one request.
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.scryfall.com/cards/{set_code}/{collector_number}"
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF_SECONDS,
+        base_url: str = SCRYFALL_API_URL,
+        cache: Optional[ScryfallCache] = None,
+        use_cache: bool = True
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self.cache = (cache or get_scryfall_cache()) if use_cache else None
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._bucket = TokenBucket(requests_per_second)
+        self._flights = SingleFlight()
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        path: str,
+        **kwargs
+    ) -> Optional[httpx.Response]:
+        """
+        Send one request, retrying on 429/5xx and transport errors.
+        Returns the final response, or None if the request never got one.
+        """
+        response = None
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            async with self._semaphore:
+                try:
+                    response = await client.request(method, f"{self.base_url}{path}", **kwargs)
+                except httpx.TransportError as e:
+                    print(f"Scryfall request {path} failed: {e}")
+                    response = None
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+            if attempt == self.max_retries:
+                break
+
+            delay = self.backoff * (2 ** attempt)
+            if response is not None and response.headers.get("Retry-After"):
+                try:
+                    delay = max(delay, float(response.headers["Retry-After"]))
+                except ValueError:
+                    pass
+            await asyncio.sleep(delay)
+
+        return response
+
+    async def get_json(
+        self,
+        client: httpx.AsyncClient,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        cache_key: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        GET a JSON resource, or None if it was not found or never answered.
+
+        With a cache key, fresh cached answers (including not-found) are served
+        without a request, expired ones are revalidated with their ETag or
+        Last-Modified, and an expired answer is served if Scryfall is unreachable.
+        Concurrent calls for the same resource share one request.
+        """
+        flight_key = cache_key or (path, tuple(sorted((params or {}).items())))
+        return await self._flights.do(
+            flight_key, lambda: self._get_json(client, path, params, cache_key)
         )
+
+    async def _get_json(
+        self,
+        client: httpx.AsyncClient,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        cache_key: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        cache = self.cache if cache_key else None
+        stale = None
+        if cache is not None:
+            # The cache does blocking SQLite I/O, so it is used from a worker thread
+            entry = await asyncio.to_thread(cache.lookup, cache_key)
+            if entry is not None and entry.fresh:
+                return entry.data()
+            stale = entry
         
+        headers = stale.validators() if stale is not None else None
+        response = await self.request(client, "GET", path, params=params, headers=headers)
+        
+        if response is None:
+            if stale is not None:
+                cache.served_stale(stale)
+                return stale.data()
+            return None
+        if response.status_code == 304 and stale is not None:
+            await asyncio.to_thread(cache.revalidated_entry, stale)
+            return stale.data()
         if response.status_code == 200:
+            if cache is not None:
+                await asyncio.to_thread(
+                    cache.put, cache_key, 200, response.content,
+                    response.headers.get("ETag"), response.headers.get("Last-Modified")
+                )
             return response.json()
+        if response.status_code == 404 and cache is not None:
+            await asyncio.to_thread(cache.put, cache_key, 404)
         return None
 
+    async def fetch_cards_by_name(
+        self,
+        names: Iterable[str],
+        client: Optional[httpx.AsyncClient] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Look up many exact card names concurrently.
+        Returns a dict mapping each requested name to its Scryfall data, or None if not found.
+        """
+        unique_names = list(dict.fromkeys(names))
+        client = client or get_client()
+        results = await asyncio.gather(*[
+            self.get_json(client, "/cards/named", params={"exact": name}, cache_key=name_key(name))
+            for name in unique_names
+        ])
+        return dict(zip(unique_names, results))
+
+    async def fetch_collection(
+        self,
+        identifiers: List[Dict[str, str]],
+        client: Optional[httpx.AsyncClient] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Resolve card identifiers through /cards/collection, 75 per request.
+
+        Each identifier is a dict in one of Scryfall's forms: {"id": ...},
+        {"name": ...}, {"name": ..., "set": ...} or {"set": ..., "collector_number": ...}.
+        Returns a list aligned with `identifiers` holding the card data, or None
+        for identifiers Scryfall reported as not found. Identifiers with a fresh
+        cached answer are not sent; new answers are added to the cache.
+
+        Raises ScryfallUnavailable if a request fails after its retries, so
+        cards are never reported missing because Scryfall couldn't be reached.
+        """
+        client = client or get_client()
+
+        keys = [_identifier_key(identifier) for identifier in identifiers]
+        unique = list(dict(zip(keys, identifiers)).items())
+        cache_keys = {key: identifier_key(identifier) for key, identifier in unique}
+
+        # Identifiers another lookup is already fetching are awaited rather than
+        # sent again; the rest are looked up here and shared with later callers
+        joined, led = {}, []
+        for key, identifier in unique:
+            future, leader = self._flights.claim(cache_keys[key] or key)
+            if leader:
+                led.append((key, identifier))
+            else:
+                joined[key] = future
+
+        # The cache does blocking SQLite I/O, so it is used from a worker thread.
+        # Answers are cached before the flights end, so a later lookup finds them
+        resolved, fetched = {}, {}
+        try:
+            pending = led
+            if self.cache is not None and led:
+                entries = await asyncio.to_thread(
+                    self.cache.lookup_many, [cache_keys[key] for key, _ in led if cache_keys[key]]
+                )
+                pending = []
+                for key, identifier in led:
+                    entry = entries.get(cache_keys[key]) if cache_keys[key] else None
+                    if entry is not None and entry.fresh:
+                        resolved[key] = entry.data()
+                    else:
+                        pending.append((key, identifier))
+
+            chunks = [
+                pending[start:start + COLLECTION_BATCH_SIZE]
+                for start in range(0, len(pending), COLLECTION_BATCH_SIZE)
+            ]
+            for result in await asyncio.gather(*[
+                self._fetch_collection_chunk(client, chunk) for chunk in chunks
+            ]):
+                fetched.update(result)
+
+            if self.cache is not None and fetched:
+                await asyncio.to_thread(self.cache.put_many_json, [
+                    (cache_keys[key], data) for key, data in fetched.items() if cache_keys[key]
+                ])
+        except BaseException as e:
+            for key, _ in led:
+                if key in resolved or key in fetched:
+                    self._flights.resolve(cache_keys[key] or key, resolved.get(key, fetched.get(key)))
+                else:
+                    self._flights.fail(cache_keys[key] or key, e)
+            raise
+
+        resolved.update(fetched)
+        for key, _ in led:
+            self._flights.resolve(cache_keys[key] or key, resolved.get(key))
+
+        cancelled = []
+        for key, future in joined.items():
+            try:
+                resolved[key] = await self._flights.wait(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                cancelled.append(key)
+        if cancelled:
+            # The lookup these were waiting on was cancelled; fetch them here
+            by_key = dict(unique)
+            retried = await self.fetch_collection([by_key[key] for key in cancelled], client)
+            resolved.update(zip(cancelled, retried))
+        return [resolved.get(key) for key in keys]
+
+    async def _fetch_collection_chunk(
+        self,
+        client: httpx.AsyncClient,
+        chunk: List[Tuple[Tuple, Dict[str, str]]]
+    ) -> Dict[Tuple, Optional[Dict[str, Any]]]:
+        """
+        Send one /cards/collection request. Returns the card data by identifier
+        key, with None for identifiers Scryfall reported as not found; raises
+        ScryfallUnavailable if the request failed.
+        """
+        response = await self.request(
+            client, "POST", "/cards/collection",
+            json={"identifiers": [identifier for _, identifier in chunk]}
+        )
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else "no response"
+            raise ScryfallUnavailable(
+                f"Scryfall /cards/collection request for {len(chunk)} cards failed ({status})"
+            )
+
+        payload = response.json()
+        data = payload.get("data", [])
+        not_found = {_identifier_key(identifier) for identifier in payload.get("not_found", [])}
+        found = [(key, identifier) for key, identifier in chunk if key not in not_found]
+
+        results = {key: None for key, _ in chunk if key in not_found}
+
+        # Scryfall returns found cards in request order; fall back to matching
+        # on the identifier fields if the counts ever disagree
+        if len(found) == len(data):
+            results.update(zip([key for key, _ in found], data))
+            return results
+
+        for key, identifier in found:
+            card = next((card for card in data if _card_matches_identifier(card, identifier)), None)
+            if card is not None:
+                results[key] = card
+        return results
+
+
+def _identifier_key(identifier: Dict[str, str]) -> Tuple:
+    return tuple(sorted((field, str(value).lower()) for field, value in identifier.items()))
+
+
+def _card_matches_identifier(card: Dict[str, Any], identifier: Dict[str, str]) -> bool:
+    if "id" in identifier:
+        return card.get("id") == identifier["id"]
+    if "set" in identifier and card.get("set", "").lower() != identifier["set"].lower():
+        return False
+    if "collector_number" in identifier:
+        return card.get("collector_number") == identifier["collector_number"]
+    if "name" in identifier:
+        name = identifier["name"].lower()
+        face_names = [face.get("name", "").lower() for face in card.get("card_faces", [])]
+        return card.get("name", "").lower() == name or name in face_names
+    return False
+
+
+_default_fetcher: Optional[ScryfallFetcher] = None
+
+
+def get_default_fetcher() -> ScryfallFetcher:
+    """
+    Return the process-wide fetcher so concurrent imports share one rate limit
+    """
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = ScryfallFetcher()
+    return _default_fetcher
+
+
+async def get_card_by_name(name: str, client: Optional[httpx.AsyncClient] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get card data from Scryfall API by exact name (cached)
+    """
+    return await get_default_fetcher().get_json(
+        client or get_client(), "/cards/named", params={"exact": name}, cache_key=name_key(name)
+    )
+
+
+class ScryfallSearch:
+    """
+    A Scryfall search whose result pages (175 cards each) are fetched only as
+    its cards are consumed, following has_more/next_page; each page is cached
+    """
+
+    def __init__(
+        self,
+        query: str,
+        client: Optional[httpx.AsyncClient] = None,
+        fetcher: Optional[ScryfallFetcher] = None
+    ):
+        self.query = query
+        self.client = client
+        self.fetcher = fetcher
+        self.total_cards: Optional[int] = None
+        self.pages_fetched = 0
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        fetcher = self.fetcher or get_default_fetcher()
+        client = self.client or get_client()
+        path, params = "/cards/search", {"q": self.query}
+        page = 1
+        while True:
+            cache_key = search_key(self.query) if page == 1 else f"{search_key(self.query)}|page:{page}"
+            data = await fetcher.get_json(client, path, params=params, cache_key=cache_key)
+            if not data:
+                return
+            self.pages_fetched += 1
+            self.total_cards = data.get("total_cards", self.total_cards)
+            for card in data.get("data", []):
+                yield card
+
+            next_page = data.get("next_page")
+            if not data.get("has_more") or not next_page:
+                return
+            # next_page is an absolute URL carrying the query and page number
+            path = next_page[len(fetcher.base_url):] if next_page.startswith(fetcher.base_url) else next_page
+            params = None
+            page += 1
+
+    async def cards(self, skip: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        The matching cards from `skip` on, at most `limit` of them, fetching
+        only the pages they fall on
+        """
+        cards = []
+        if limit is not None and limit <= 0:
+            return cards
+        position = 0
+        async for card in self:
+            if position >= skip:
+                cards.append(card)
+                if limit is not None and len(cards) >= limit:
+                    break
+            position += 1
+        return cards
+
+
+async def search_cards(
+    query: str,
+    client: Optional[httpx.AsyncClient] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for cards using Scryfall API (cached), following every result page
+    unless `limit` caps how many cards are fetched
+    """
+    return await ScryfallSearch(query, client).cards(limit=limit)
+
+
+async def get_card_by_set_and_number(
+    set_code: str,
+    collector_number: str,
+    client: Optional[httpx.AsyncClient] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Get card data from Scryfall API by set code and collector number (cached)
+    """
+    return await get_default_fetcher().get_json(
+        client or get_client(), f"/cards/{set_code}/{collector_number}",
+        cache_key=printing_key(set_code, collector_number)
+    )
+
 
 def scryfall_to_card_model(scryfall_data: Dict[str, Any]) -> CardCreate:
     """
     Convert Scryfall API data to our CardCreate model
     """
+    # Double-faced cards keep colors, images and rules text on their faces
+    faces = scryfall_data.get("card_faces", [])
+    front_face = faces[0] if faces else {}
+    
     # Extract colors as comma-separated string
-    colors = ",".join(scryfall_data.get("colors", []))
+    face_colors = [color for face in faces for color in face.get("colors", [])]
+    colors = ",".join(scryfall_data.get("colors", list(dict.fromkeys(face_colors))))
     
     # Get image URI (prioritize normal size)
-    image_uris = scryfall_data.get("image_uris", {})
+    image_uris = scryfall_data.get("image_uris") or front_face.get("image_uris", {})
     image_uri = image_uris.get("normal") or image_uris.get("large") or image_uris.get("small")
     
     # Create CardCreate object
@@ -67,12 +685,13 @@ def scryfall_to_card_model(scryfall_data: Dict[str, Any]) -> CardCreate:
         image_uri=image_uri,
         type_line=scryfall_data.get("type_line", ""),
         mana_cost=scryfall_data.get("mana_cost", ""),
-        cmc=scryfall_data.get("cmc", 0),
+        cmc=int(scryfall_data.get("cmc") or 0),
         colors=colors,
+        color_identity=",".join(scryfall_data.get("color_identity", [])),
         rarity=scryfall_data.get("rarity", ""),
         set_code=scryfall_data.get("set", ""),
         collector_number=scryfall_data.get("collector_number", ""),
-        oracle_text=scryfall_data.get("oracle_text", ""),
+        oracle_text=scryfall_data.get("oracle_text", front_face.get("oracle_text", "")),
         additional_data={
             "keywords": scryfall_data.get("keywords", []),
             "legalities": scryfall_data.get("legalities", {}),
@@ -81,16 +700,38 @@ def scryfall_to_card_model(scryfall_data: Dict[str, Any]) -> CardCreate:
     )
 
 
-async def get_cards_batch(card_names: List[str]) -> List[CardCreate]:
+async def get_cards_batch(
+    card_names: List[str],
+    fetcher: Optional[ScryfallFetcher] = None
+) -> Dict[str, Optional[CardCreate]]:
+    """
+    Get multiple cards from Scryfall API concurrently, respecting the rate limit.
+    Returns a dict mapping each requested name to its card model, or None if not found.
+    """
+    fetcher = fetcher or get_default_fetcher()
+    results = await fetcher.fetch_cards_by_name(card_names)
+    
+    return {
+        name: scryfall_to_card_model(data) if data else None
+        for name, data in results.items()
+    }
+
+
+async def resolve_card_identifiers(
+    identifiers: List[Dict[str, str]],
+    fetcher: Optional[ScryfallFetcher] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> Tuple[List[Optional[CardCreate]], List[int]]:
     """
-    Get multiple cards from Scryfall API in parallel
+    Resolve many card identifiers with batched /cards/collection requests.
+    Returns the card models aligned with `identifiers` (None where missing)
+    and the indexes of the identifiers Scryfall could not find.
+    Raises ScryfallUnavailable if a request failed after its retries.
     """
-    tasks = [get_card_by_name(name) for name in card_names]
-    results = await asyncio.gather(*tasks)
+    fetcher = fetcher or get_default_fetcher()
+    results = await fetcher.fetch_collection(identifiers, client)
     
-    cards = []
-    for result in results:
-        if result:
-            cards.append(scryfall_to_card_model(result))
+    cards = [scryfall_to_card_model(data) if data else None for data in results]
+    not_found = [index for index, card in enumerate(cards) if card is None]
     
-    return cards
\ No newline at end of file
+    return cards, not_found
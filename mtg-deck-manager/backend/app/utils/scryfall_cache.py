@@ -0,0 +1,318 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Response cache settings (overridable through the environment); set
+# SCRYFALL_CACHE_PATH to an empty string to disable the cache
+SCRYFALL_CACHE_PATH = os.getenv("SCRYFALL_CACHE_PATH", "./scryfall_cache.db")
+SCRYFALL_CACHE_TTL = float(os.getenv("SCRYFALL_CACHE_TTL", str(24 * 3600)))
+SCRYFALL_CACHE_NEGATIVE_TTL = float(os.getenv("SCRYFALL_CACHE_NEGATIVE_TTL", str(6 * 3600)))
+SCRYFALL_CACHE_MAX_BYTES = int(os.getenv("SCRYFALL_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Eviction trims the cache to this fraction of its limit so it doesn't run on every write
+EVICTION_TARGET = 0.9
+
+# Reads buffer their last_used update until this many are pending, then write them at once
+TOUCH_FLUSH_SIZE = 256
+
+# Keys read per SELECT by lookup_many (below SQLite's bound parameter limit)
+LOOKUP_BATCH_SIZE = 500
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def name_key(name: str) -> str:
+    return f"named:{normalize_name(name)}"
+
+
+def printing_key(set_code: str, collector_number: str) -> str:
+    return f"printing:{set_code.strip().lower()}/{collector_number.strip().lower()}"
+
+
+def search_key(query: str) -> str:
+    return f"search:{' '.join(query.split())}"
+
+
+def identifier_key(identifier: Dict[str, str]) -> Optional[str]:
+    """
+    Cache key of a /cards/collection identifier, shared with the matching
+    single-card lookups so both endpoints fill the same entries
+    """
+    if "id" in identifier:
+        return f"id:{identifier['id'].lower()}"
+    if "set" in identifier and "collector_number" in identifier:
+        return printing_key(identifier["set"], identifier["collector_number"])
+    if "name" in identifier and "set" in identifier:
+        return f"{name_key(identifier['name'])}|{identifier['set'].strip().lower()}"
+    if "name" in identifier:
+        return name_key(identifier["name"])
+    return None
+
+
+class CacheEntry:
+    def __init__(self, key: str, status: int, body: Optional[bytes], etag: Optional[str],
+                 last_modified: Optional[str], expires_at: float):
+        self.key = key
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def size(self) -> int:
+        return len(self.body) if self.body else 0
+
+    def data(self) -> Optional[Any]:
+        """The cached JSON, or None for a cached not-found"""
+        return json.loads(self.body) if self.status == 200 and self.body else None
+
+    def validators(self) -> Dict[str, str]:
+        """Headers asking the server whether the cached response is still current"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ScryfallCache:
+    """
+    Persistent cache of Scryfall responses in a SQLite file
+
+    Entries are keyed by normalized request (see the *_key helpers) and expire
+    after `ttl` seconds, or `negative_ttl` for not-found answers. Expired
+    entries are kept so they can be revalidated with their ETag/Last-Modified
+    and served if Scryfall is unreachable. Once the bodies exceed `max_bytes`
+    the least recently used entries are evicted. Reads note their use in
+    memory and write it in batches, so a lookup is a single SELECT.
+
+    Every method does blocking SQLite I/O; call them from a worker thread
+    (asyncio.to_thread) when running on the event loop.
+    """
+
+    def __init__(self, path: str = SCRYFALL_CACHE_PATH, ttl: float = SCRYFALL_CACHE_TTL,
+                 negative_ttl: float = SCRYFALL_CACHE_NEGATIVE_TTL,
+                 max_bytes: int = SCRYFALL_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)")
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.negative_hits = 0
+            self.misses = 0
+            self.revalidated = 0
+            self.stale_served = 0
+            self.evictions = 0
+            self.bytes_saved = 0
+
+    def _entries(self, keys: List[str]) -> Dict[str, CacheEntry]:
+        """Read the entries stored for `keys` and note them as used (call with _lock held)"""
+        entries = {}
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            batch = keys[start:start + LOOKUP_BATCH_SIZE]
+            rows = self._db.execute(
+                "SELECT key, status, body, etag, last_modified, expires_at FROM responses "
+                f"WHERE key IN ({', '.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            entries.update((row[0], CacheEntry(*row)) for row in rows)
+        now = time.time()
+        for key in entries:
+            self._touched[key] = now
+        if len(self._touched) >= TOUCH_FLUSH_SIZE:
+            self._flush_touched()
+        return entries
+
+    def _flush_touched(self):
+        """Write the buffered last_used times (call with _lock held)"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _count_lookup(self, entry: Optional[CacheEntry]):
+        if entry is None or not entry.fresh:
+            self.misses += 1
+        elif entry.status == 200:
+            self.hits += 1
+            self.bytes_saved += entry.size
+        else:
+            self.negative_hits += 1
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """The entry stored for `key`, fresh or expired, or None"""
+        with self._lock:
+            return self._entries([key]).get(key)
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """
+        The entry stored for `key`, counting a hit if it is fresh enough to
+        serve without asking Scryfall or a miss otherwise; expired entries are
+        still returned so the caller can revalidate them
+        """
+        with self._lock:
+            entry = self._entries([key]).get(key)
+            self._count_lookup(entry)
+        return entry
+
+    def lookup_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        """lookup() for many keys with one query per LOOKUP_BATCH_SIZE keys"""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            entries = self._entries(keys)
+            for key in keys:
+                self._count_lookup(entries.get(key))
+        return entries
+
+    def _put(self, key: str, status: int, body: Optional[bytes], etag: Optional[str],
+             last_modified: Optional[str], now: float):
+        ttl = self.ttl if status == 200 else self.negative_ttl
+        size = len(body) if body else 0
+        old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(key, status, body, etag, last_modified, expires_at, last_used, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, status, body, etag, last_modified, now + ttl, now, size)
+        )
+        self._touched.pop(key, None)
+        self.total_bytes += size - (old[0] if old else 0)
+
+    def put(self, key: str, status: int, body: Optional[bytes] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a response: status 200 with its body, or 404 for not found"""
+        with self._lock:
+            self._put(key, status, body, etag, last_modified, time.time())
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def put_json(self, key: str, data: Optional[Any]):
+        """Store parsed card data, or None as not found"""
+        self.put_many_json([(key, data)])
+
+    def put_many_json(self, items: Iterable[Tuple[str, Optional[Any]]]):
+        """put_json() for many (key, data) pairs in one transaction"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for key, data in items:
+                    if data is None:
+                        self._put(key, 404, None, None, None, now)
+                    else:
+                        self._put(key, 200, json.dumps(data).encode(), None, None, now)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                raise
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def revalidated_entry(self, entry: CacheEntry):
+        """Mark an expired entry as confirmed current by a 304 response"""
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_saved += entry.size
+            self._db.execute(
+                "UPDATE responses SET expires_at = ? WHERE key = ?",
+                (time.time() + self.ttl, entry.key)
+            )
+
+    def served_stale(self, entry: CacheEntry):
+        """Count an expired entry served because Scryfall could not be reached"""
+        with self._lock:
+            self.stale_served += 1
+            self.bytes_saved += entry.size
+
+    def _evict(self):
+        # Order by the latest use, including reads not written yet
+        self._flush_touched()
+        target = self.max_bytes * EVICTION_TARGET
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._touched.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, negative = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status != 200), 0) FROM responses"
+            ).fetchone()
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "negative_entries": negative,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+                "revalidated": self.revalidated,
+                "stale_served": self.stale_served,
+                "evictions": self.evictions,
+                "bytes_saved": self.bytes_saved
+            }
+
+
+_cache: Optional[ScryfallCache] = None
+
+
+def get_scryfall_cache() -> Optional[ScryfallCache]:
+    """
+    Return the process-wide response cache, or None if it is disabled
+    """
+    global _cache
+    if _cache is None and SCRYFALL_CACHE_PATH:
+        _cache = ScryfallCache()
+    return _cache
@@ -0,0 +1,263 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ScryfallQueryError(ValueError):
+    """A query that isn't valid Scryfall syntax"""
+
+
+class UnsupportedQuery(Exception):
+    """A valid query using syntax the local catalog can't answer"""
+
+
+# Query keyword aliases and the field each one searches
+KEYWORDS = {
+    "name": "name", "n": "name",
+    "c": "colors", "color": "colors", "colour": "colors",
+    "id": "color_identity", "identity": "color_identity", "ci": "color_identity",
+    "t": "type_line", "type": "type_line",
+    "o": "oracle_text", "oracle": "oracle_text",
+    "cmc": "cmc", "mv": "cmc", "manavalue": "cmc",
+    "r": "rarity", "rarity": "rarity",
+    "s": "set_code", "set": "set_code", "e": "set_code", "edition": "set_code",
+    "f": "legal", "format": "legal", "legal": "legal",
+    "banned": "banned", "restricted": "restricted",
+}
+
+COLOR_NAMES = {
+    "white": "W", "blue": "U", "black": "B", "red": "R", "green": "G", "colorless": "C",
+    "azorius": "WU", "dimir": "UB", "rakdos": "BR", "gruul": "RG", "selesnya": "GW",
+    "orzhov": "WB", "izzet": "UR", "golgari": "BG", "boros": "RW", "simic": "GU",
+    "bant": "GWU", "esper": "WUB", "grixis": "UBR", "jund": "BRG", "naya": "RGW",
+    "abzan": "WBG", "jeskai": "URW", "sultai": "BGU", "mardu": "RWB", "temur": "GUR",
+}
+
+RARITIES = ["common", "uncommon", "rare", "special", "mythic", "bonus"]
+RARITY_ABBREVIATIONS = {rarity[0]: rarity for rarity in RARITIES}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<open>-?\()
+      | (?P<close>\))
+      | (?P<negate>-)?(?:
+            (?P<key>[A-Za-z]+)(?P<op><=|>=|!=|:|=|<|>)(?P<value>"[^"]*"|/(?:[^/\\]|\\.)*/|[^\s()"]+)
+          | (?P<exact>!)?(?P<word>"[^"]*"|[^\s()"]+)
+        )
+    )""", re.VERBOSE)
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _condition(field: str, operator: str, value: Any) -> Dict[str, Any]:
+    return {"field": field, "operator": operator, "value": value}
+
+
+def _group(group_type: str, children: List[Dict[str, Any]], negate: bool = False) -> Dict[str, Any]:
+    """Filter group (see crud.card.process_filter_group) holding condition and group children"""
+    group = {
+        "type": group_type,
+        "conditions": [child for child in children if "field" in child],
+        "groups": [child for child in children if "field" not in child],
+    }
+    if negate:
+        group["not"] = True
+    return group
+
+
+def _negated(node: Dict[str, Any]) -> Dict[str, Any]:
+    return _group("AND", [node], negate=True)
+
+
+def _colors(value: str) -> str:
+    letters = COLOR_NAMES.get(value.lower(), value.upper())
+    if not letters or any(letter not in "WUBRGC" for letter in letters):
+        raise UnsupportedQuery(f"colors {value!r}")
+    if "C" in letters and len(letters) > 1:
+        raise ScryfallQueryError(f"Colorless can't be combined with colors: {value!r}")
+    return ",".join(letters)
+
+
+def _color_term(field: str, op: str, value: str) -> Dict[str, Any]:
+    colors = _colors(value)
+    if op == ":":
+        # c: means at least these colors, id: at most these (commander legality)
+        op = ">=" if field == "colors" else "<="
+    exactly = _condition(field, "exactly", colors)
+    if op == "=":
+        return exactly
+    if op == "!=":
+        return _negated(exactly)
+    comparison = _condition(field, "superset" if op in (">=", ">") else "subset", colors)
+    if op in (">", "<"):
+        return _group("AND", [comparison, _negated(exactly)])
+    return comparison
+
+
+def _cmc_term(op: str, value: str) -> Dict[str, Any]:
+    try:
+        number = int(value)
+    except ValueError:
+        raise UnsupportedQuery(f"mana value {value!r}")
+    equals = _condition("cmc", "equals", number)
+    if op in (":", "="):
+        return equals
+    if op == "!=":
+        return _negated(equals)
+    bound = _condition("cmc", "greater_than" if op.startswith(">") else "less_than", number)
+    if op in (">=", "<="):
+        return _group("OR", [bound, equals])
+    return bound
+
+
+def _rarity_term(op: str, value: str) -> Dict[str, Any]:
+    rarity = RARITY_ABBREVIATIONS.get(value.lower(), value.lower())
+    if rarity not in RARITIES:
+        raise ScryfallQueryError(f"Unknown rarity: {value!r}")
+    if op in (":", "="):
+        return _condition("rarity", "is", rarity)
+    if op == "!=":
+        return _negated(_condition("rarity", "is", rarity))
+    rank = RARITIES.index(rarity)
+    included = {
+        ">": RARITIES[rank + 1:], ">=": RARITIES[rank:],
+        "<": RARITIES[:rank], "<=": RARITIES[:rank + 1],
+    }[op]
+    return _group("OR", [_condition("rarity", "is", other) for other in included])
+
+
+def compile_term(key: str, op: str, value: str) -> Dict[str, Any]:
+    """
+    Compile one keyword term (e.g. t:elf, cmc>=3) to a condition or filter group
+    """
+    field = KEYWORDS.get(key.lower())
+    if field is None:
+        raise UnsupportedQuery(f"keyword {key!r}")
+    if value.startswith("/"):
+        raise UnsupportedQuery(f"regular expression {value}")
+    value = _unquote(value)
+    if not value:
+        raise ScryfallQueryError(f"Missing value for {key}{op}")
+
+    if field in ("colors", "color_identity"):
+        return _color_term(field, op, value)
+    if field == "cmc":
+        return _cmc_term(op, value)
+    if field == "rarity":
+        return _rarity_term(op, value)
+    if op not in (":", "=", "!="):
+        raise UnsupportedQuery(f"{key}{op}")
+
+    if field in ("name", "type_line", "oracle_text"):
+        node = _condition(field, "contains", value)
+    elif field == "set_code":
+        node = _condition(field, "is", value.lower())
+    else:
+        # Format legality: f:, banned: and restricted:
+        node = _condition("legality", field, value.lower())
+    return _negated(node) if op == "!=" else node
+
+
+def tokenize(query: str) -> List[Tuple[str, Any]]:
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if match is None or match.end() == position:
+            raise ScryfallQueryError(f"Unexpected {query[position:].strip()[:20]!r}")
+        position = match.end()
+        if match.group("open"):
+            tokens.append(("open", match.group("open").startswith("-")))
+        elif match.group("close"):
+            tokens.append(("close", None))
+        elif match.group("key"):
+            node = compile_term(match.group("key"), match.group("op"), match.group("value"))
+            tokens.append(("term", _negated(node) if match.group("negate") else node))
+        else:
+            word = match.group("word")
+            if word == "-" and not match.group("exact"):
+                # A `-` followed by a space or nothing negates nothing
+                raise ScryfallQueryError("Expected a search term after '-'")
+            if not match.group("negate") and not match.group("exact") and word.lower() in ("and", "or"):
+                tokens.append((word.lower(), None))
+                continue
+            text = _unquote(word)
+            if not text:
+                continue
+            # Exact names match regardless of case, like on Scryfall
+            node = _condition("name", "equals_ignoring_case" if match.group("exact") else "contains", text)
+            tokens.append(("term", _negated(node) if match.group("negate") else node))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent over the tokens: `or` binds loosest, then `and` (explicit
+    or implied by juxtaposition), then negation and parentheses
+    """
+
+    def __init__(self, tokens: List[Tuple[str, Any]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, Any]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expression(self) -> Dict[str, Any]:
+        children = [self.conjunction()]
+        while self.peek() == "or":
+            self.take()
+            children.append(self.conjunction())
+        return children[0] if len(children) == 1 else _group("OR", children)
+
+    def conjunction(self) -> Dict[str, Any]:
+        children = [self.unary()]
+        while self.peek() not in (None, "or", "close"):
+            if self.peek() == "and":
+                self.take()
+            children.append(self.unary())
+        return children[0] if len(children) == 1 else _group("AND", children)
+
+    def unary(self) -> Dict[str, Any]:
+        kind, value = self.take() if self.peek() else (None, None)
+        if kind == "term":
+            return value
+        if kind == "open":
+            node = self.expression()
+            if self.peek() != "close":
+                raise ScryfallQueryError("Missing closing parenthesis")
+            self.take()
+            return _negated(node) if value else node
+        raise ScryfallQueryError(f"Expected a search term, got {kind or 'end of query'}")
+
+
+def parse_scryfall_query(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Compile a Scryfall search query to a filter group for search_cards_advanced,
+    or None for an empty query (every card)
+
+    Supports name words, "quoted phrases" and !"exact names", c:/color:,
+    id:/identity:, t:/type:, o:/oracle:, cmc:/mv:, r:/rarity:, s:/set:,
+    f:/format:, banned: and restricted: with :, =, !=, <, <=, > and >= where
+    they make sense, implicit or explicit `and`, `or`, `-` negation and
+    parentheses. Negated groups carry "not": true.
+
+    Raises ScryfallQueryError for malformed queries and UnsupportedQuery for
+    valid ones using other keywords (e.g. pow>=3 or is:commander) or regular
+    expressions, which only Scryfall can answer.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    parser = _Parser(tokens)
+    node = parser.expression()
+    if parser.peek() is not None:
+        raise ScryfallQueryError("Unbalanced closing parenthesis")
+    return node if "field" not in node else _group("AND", [node])
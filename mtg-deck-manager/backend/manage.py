@@ -0,0 +1,905 @@
+import argparse
+from contextlib import contextmanager
+
+# Vocabulary of synthetic card names, subtypes and rules text; each word is
+# one and a half times rarer than the one before it
+_SYNTHETIC_WORDS = [
+    "Goblin", "Dragon", "Angel", "Knight", "Wizard", "Zombie", "Elf",
+    "Sphinx", "Hydra", "Vampire", "Merfolk", "Phoenix", "Kraken"
+]
+_SYNTHETIC_TYPES = ["Creature", "Instant", "Sorcery", "Artifact", "Enchantment", "Planeswalker", "Land"]
+
+
+def bulk_load(args):
+    from app.database import SessionLocal, engine
+    from app.migrations import run_migrations
+    from app.models import models
+    from app.utils.bulk_data import load_bulk_file
+
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        stats = load_bulk_file(db, args.path, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print(
+        f"Read {stats['read']} entries: {stats['inserted']} inserted, "
+        f"{stats['updated']} updated, {stats['unchanged']} unchanged, {stats['skipped']} skipped"
+    )
+
+
+@contextmanager
+def _benchmark_database():
+    """
+    Point the app at a throwaway SQLite database with the Scryfall response
+    cache disabled and create its tables, removing it afterwards. The engines
+    are created when app.database is imported, so this must come first.
+    """
+    import os
+    import shutil
+    import sys
+    import tempfile
+
+    if "app.database" in sys.modules:
+        raise RuntimeError("app.database was imported before the benchmark database was set up")
+    directory = tempfile.mkdtemp(prefix="mtg-deck-manager-benchmark-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ["SCRYFALL_CACHE_PATH"] = ""
+    try:
+        from app.database import engine
+        from app.migrations import run_migrations
+        from app.models import models
+
+        models.Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _synthetic_scryfall_cards(count: int, seed: int, start: int = 1):
+    """
+    Scryfall-shaped card objects whose names, creature types and rules text
+    are drawn from _SYNTHETIC_WORDS, so text searches match anywhere from a
+    fraction of a percent to most of the cards
+    """
+    import random
+    import uuid
+
+    rng = random.Random(seed)
+    weights = [1.5 ** -rank for rank in range(len(_SYNTHETIC_WORDS))]
+    for number in range(start, start + count):
+        first, second, third = rng.choices(_SYNTHETIC_WORDS, weights, k=3)
+        card_type = rng.choice(_SYNTHETIC_TYPES)
+        colors = [] if card_type == "Land" else sorted(
+            rng.sample("WUBRG", rng.choice([0, 1, 1, 1, 2, 3])), key="WUBRG".index
+        )
+        cmc = 0 if card_type == "Land" else rng.randint(len(colors), 7)
+        generic = cmc - len(colors)
+        yield {
+            "object": "card",
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": f"{first} {second} {number}",
+            "type_line": f"{card_type} \u2014 {second}" if card_type == "Creature" else card_type,
+            "mana_cost": "" if card_type == "Land" else (f"{{{generic}}}" if generic else "") + "".join(
+                f"{{{color}}}" for color in colors
+            ),
+            "cmc": cmc,
+            "colors": colors,
+            "color_identity": colors,
+            "rarity": rng.choice(["common", "common", "uncommon", "rare", "mythic"]),
+            "set": f"s{rng.randrange(200):02d}",
+            "collector_number": str(number),
+            "oracle_text": f"Whenever another {third} you control dies, create a 1/1 {first} token.",
+        }
+
+
+def _insert_synthetic_cards(db, count: int, seed: int, batch_size: int = 5000) -> float:
+    """Insert synthetic cards like a bulk load does, returning the seconds taken"""
+    import time
+
+    from sqlalchemy import insert
+
+    from app.models import Card
+    from app.models.card_fields import card_derived_fields
+    from app.utils.bulk_data import CARD_FIELDS
+    from app.utils.scryfall import scryfall_to_card_model
+
+    start = time.perf_counter()
+    batch = []
+    for entry in _synthetic_scryfall_cards(count, seed):
+        card = scryfall_to_card_model(entry)
+        batch.append({**card.model_dump(include=set(CARD_FIELDS)), **card_derived_fields(card)})
+        if len(batch) == batch_size:
+            db.execute(insert(Card), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Card), batch)
+    db.commit()
+    return time.perf_counter() - start
+
+
+def _synthetic_decks(count: int, swaps: int, seed: int):
+    """
+    Decks of a few hundred archetypes (15 four-ofs and a basic land), each
+    with `swaps` cards replaced by random ones, keyed by deck ID
+    """
+    import random
+
+    rng = random.Random(seed)
+    pool = [f"Card {number}" for number in range(20000)]
+    archetypes = []
+    for _ in range(max(1, count // 200)):
+        cards = dict.fromkeys(rng.sample(pool, 15), 4)
+        cards[rng.choice(["Plains", "Island", "Swamp", "Mountain", "Forest"])] = 20
+        archetypes.append(cards)
+
+    def variant(cards):
+        cards = dict(cards)
+        for name in rng.sample(sorted(cards), swaps):
+            cards.pop(name)
+            cards[rng.choice(pool)] = rng.randint(1, 4)
+        return cards
+
+    return rng, {deck_id: variant(rng.choice(archetypes)) for deck_id in range(1, count + 1)}
+
+
+def _load_index(index, decks) -> float:
+    """Build a deck index from synthetic decks, returning the seconds taken"""
+    import time
+
+    from app.crud.deck_indexes import LOAD_BATCH_SIZE
+
+    start = time.perf_counter()
+    items = list(decks.items())
+    with index.building():
+        for offset in range(0, len(items), LOAD_BATCH_SIZE):
+            index.put_many(dict(items[offset:offset + LOAD_BATCH_SIZE]))
+    return time.perf_counter() - start
+
+
+def benchmark_similarity(args):
+    """
+    Time the deck similarity index on synthetic decks (no database needed);
+    every deck has near neighbours from its archetype to find
+    """
+    import time
+
+    import numpy as np
+
+    from app.crud.deck_similarity import DeckSimilarityIndex
+
+    rng, decks = _synthetic_decks(args.decks, args.swaps, args.seed)
+    index = DeckSimilarityIndex()
+    build_time = _load_index(index, decks)
+
+    def jaccard(a, b):
+        shared = sum(min(quantity, b.get(name, 0)) for name, quantity in a.items())
+        return shared / (sum(a.values()) + sum(b.values()) - shared)
+
+    queries = rng.sample(sorted(decks), min(args.queries, len(decks)))
+    start = time.perf_counter()
+    results = {deck_id: index.similar(deck_id, limit=args.limit) for deck_id in queries}
+    lsh_time = (time.perf_counter() - start) / len(queries)
+
+    # Baselines: the signature of every deck, then the exact card lists of every deck
+    start = time.perf_counter()
+    for deck_id in queries:
+        row = index._rows[deck_id]
+        (index.signatures[:index.size] == index.signatures[row]).mean(axis=1)
+    scan_time = (time.perf_counter() - start) / len(queries)
+
+    # Quality against exact similarities: how many decks above the threshold
+    # were candidates, and how close the returned top k is to the exact top k
+    threshold = index.stats()["threshold"]
+    exact_queries = queries[:20]
+    above = candidates_above = 0
+    returned_similarity = best_similarity = 0.0
+    errors = []
+    start = time.perf_counter()
+    for deck_id in exact_queries:
+        similarity = {other: jaccard(decks[deck_id], cards) for other, cards in decks.items() if other != deck_id}
+        candidates = {other for other, _ in index.similar(deck_id, limit=len(decks))}
+        relevant = [other for other, value in similarity.items() if value >= threshold]
+        above += len(relevant)
+        candidates_above += len(candidates.intersection(relevant))
+        returned_similarity += sum(similarity[other] for other, _ in results[deck_id])
+        best_similarity += sum(sorted(similarity.values(), reverse=True)[:args.limit])
+        errors += [abs(estimate - similarity[other]) for other, estimate in results[deck_id]]
+    exact_time = (time.perf_counter() - start) / len(exact_queries)
+
+    stats = index.stats()
+    print(f"{args.decks} decks: built in {build_time:.2f} s, {stats['bytes'] / 2 ** 20:.1f} MB "
+          f"({stats['permutations']} permutations, {stats['bands']} bands, threshold {threshold:.2f})")
+    print(f"LSH query: {lsh_time * 1000:.2f} ms, "
+          f"{np.mean([len(matches) for matches in results.values()]):.1f} results")
+    print(f"Signature scan of every deck: {scan_time * 1000:.2f} ms")
+    print(f"Exact Jaccard against every deck: {exact_time * 1000:.1f} ms")
+    print(f"Decks above the threshold found as candidates: {candidates_above / above if above else 1.0:.3f}")
+    print(f"Exact similarity of the top {args.limit} returned vs the true top {args.limit}: "
+          f"{returned_similarity / best_similarity if best_similarity else 1.0:.3f}, "
+          f"mean estimate error {np.mean(errors) if errors else 0.0:.3f}")
+
+
+def benchmark_suggestions(args):
+    """
+    Time the card co-occurrence matrix on synthetic decks (no database
+    needed): building it, suggesting cards for partial decks, and applying
+    deck changes, checked against counting over every deck
+    """
+    import time
+    from collections import Counter
+
+    import numpy as np
+
+    from app.crud.card_cooccurrence import CardCooccurrence
+
+    rng, decks = _synthetic_decks(args.decks, args.swaps, args.seed)
+    index = CardCooccurrence()
+    build_time = _load_index(index, decks)
+
+    # Partial decks: a few cards of random decks
+    partials = [rng.sample(sorted(decks[rng.randint(1, args.decks)]), args.cards) for _ in range(args.queries)]
+    start = time.perf_counter()
+    results = [index.suggest(cards, limit=args.limit) for cards in partials]
+    query_time = (time.perf_counter() - start) / len(partials)
+
+    def brute_force(cards):
+        # Cards no deck plays any more don't count towards the average
+        playing = {card: [deck for deck in decks.values() if card in deck] for card in cards}
+        played = [card for card in cards if playing[card]]
+        scores = Counter()
+        for card in played:
+            for deck in playing[card]:
+                for other in deck:
+                    scores[other] += 1 / len(playing[card]) / len(played)
+        return scores
+
+    checked = partials[:10]
+    start = time.perf_counter()
+    mismatches = 0
+    for cards, result in zip(checked, results):
+        expected = brute_force(cards)
+        mismatches += sum(not np.isclose(score, expected[name]) for name, score, _ in result)
+    scan_time = (time.perf_counter() - start) / len(checked)
+
+    # Deck changes: swap one card in random decks, applied through the delta
+    changes = []
+    for deck_id in rng.sample(sorted(decks), min(args.updates, len(decks))):
+        cards = dict(decks[deck_id])
+        cards.pop(rng.choice(sorted(cards)))
+        cards[f"Card {rng.randrange(20000)}"] = 4
+        decks[deck_id] = cards
+        changes.append(deck_id)
+    start = time.perf_counter()
+    for deck_id in changes:
+        index.apply([deck_id], {deck_id: decks[deck_id]})
+    update_time = (time.perf_counter() - start) / max(1, len(changes))
+
+    def check_current():
+        return sum(
+            not np.isclose(score, brute_force(cards)[name])
+            for cards in checked for name, score, _ in index.suggest(cards, limit=args.limit)
+        )
+
+    mismatches += check_current()
+    delta_entries = index.stats()["delta_entries"]
+    start = time.perf_counter()
+    index._merge_delta()
+    merge_time = time.perf_counter() - start
+    mismatches += check_current()
+
+    stats = index.stats()
+    print(f"{args.decks} decks, {stats['cards']} cards: built in {build_time:.2f} s, "
+          f"{stats['stored_entries']} stored entries, {stats['bytes'] / 2 ** 20:.1f} MB")
+    print(f"Suggestions for {args.cards} cards: {query_time * 1000:.2f} ms")
+    print(f"Counting over every deck: {scan_time * 1000:.1f} ms")
+    print(f"Deck change: {update_time * 1000:.3f} ms, "
+          f"merging {delta_entries} delta entries into the CSR arrays: {merge_time:.2f} s")
+    print(f"Scores differing from the count over every deck: {mismatches}")
+
+
+def benchmark_catalog(args):
+    """
+    Time card searches against the in-memory columnar catalog and against SQL
+    on synthetic cards in a throwaway database, checking both find the same cards
+    """
+    import statistics
+    import time
+
+    with _benchmark_database():
+        from app.crud.card import SORT_COLUMNS, filter_plan_cache
+        from app.crud.columnar import CardCatalog
+        from app.database import SessionLocal
+        from app.models import Card
+
+        rarest = _SYNTHETIC_WORDS[-1]
+        searches = {
+            "type contains Creature": {"conditions": [
+                {"field": "type_line", "operator": "contains", "value": "Creature"}]},
+            f"name contains {rarest}": {"conditions": [
+                {"field": "name", "operator": "contains", "value": rarest}]},
+            "red, cmc < 3": {"conditions": [
+                {"field": "colors", "operator": "superset", "value": "R"},
+                {"field": "cmc", "operator": "less_than", "value": 3}]},
+            "identity within W,U, rare or mythic": {"conditions": [
+                {"field": "color_identity", "operator": "subset", "value": "W,U"}],
+                "groups": [{"type": "OR", "conditions": [
+                    {"field": "rarity", "operator": "is", "value": "rare"},
+                    {"field": "rarity", "operator": "is", "value": "mythic"}]}]},
+            "not an Elf or Goblin, set s07": {"conditions": [
+                {"field": "set_code", "operator": "is", "value": "s07"}],
+                "groups": [{"type": "OR", "not": True, "conditions": [
+                    {"field": "type_line", "operator": "contains", "value": "Elf"},
+                    {"field": "type_line", "operator": "contains", "value": "Goblin"}]}]},
+        }
+
+        db = SessionLocal()
+        try:
+            load_time = _insert_synthetic_cards(db, args.cards, args.seed)
+            catalog = CardCatalog()
+            start = time.perf_counter()
+            catalog.build(db)
+            build_time = time.perf_counter() - start
+
+            stats = catalog.stats()
+            print(f"{args.cards} cards: inserted in {load_time:.2f} s, catalog built in {build_time:.2f} s, "
+                  f"{stats['bytes_per_card']:.1f} bytes per card "
+                  f"({(stats['array_bytes'] + stats['string_bytes']) / 2 ** 20:.1f} MB)")
+
+            mismatches = 0
+            for label, tree in searches.items():
+                plan = filter_plan_cache.plan_for({"type": "AND", "groups": [], **tree})
+                sort_key = SORT_COLUMNS[args.order]
+                query = db.query(Card.id).filter(plan.clause).order_by(sort_key, Card.id)
+
+                sql_times, catalog_times = [], []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    sql_ids = [card_id for card_id, in query]
+                    sql_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    result = catalog.search(plan.tree, args.order)
+                    catalog_times.append(time.perf_counter() - start)
+                mismatches += sql_ids != result.ids.tolist()
+                print(f"{label}: {len(result)} cards, SQL {statistics.median(sql_times) * 1000:.1f} ms, "
+                      f"catalog {statistics.median(catalog_times) * 1000:.2f} ms")
+            print(f"Searches where the catalog and SQL disagree: {mismatches}")
+        finally:
+            db.close()
+
+
+def benchmark_fts(args):
+    """
+    Time substring searches of card text through the FTS5 trigram index
+    against LIKE scans on synthetic cards in a throwaway database, checking
+    both find the same cards
+    """
+    import statistics
+    import time
+
+    with _benchmark_database():
+        from app.crud.card import text_contains
+        from app.database import SessionLocal
+        from app.models import Card
+        from app.models.card_search import card_search_enabled
+
+        if not card_search_enabled():
+            print("This SQLite build has no FTS5; every text search is a LIKE scan")
+            return
+
+        searches = [
+            ("name", _SYNTHETIC_WORDS[0]), ("name", _SYNTHETIC_WORDS[6]), ("name", _SYNTHETIC_WORDS[-1]),
+            ("name", str(args.cards // 7)), ("type_line", _SYNTHETIC_WORDS[-2]),
+            ("oracle_text", f"{_SYNTHETIC_WORDS[-1]} token"), ("oracle_text", "dies"),
+        ]
+
+        db = SessionLocal()
+        try:
+            load_time = _insert_synthetic_cards(db, args.cards, args.seed)
+            print(f"{args.cards} cards inserted and indexed in {load_time:.2f} s")
+
+            mismatches = 0
+            for field, term in searches:
+                timings = {}
+                for label, clause in (("LIKE", getattr(Card, field).ilike(f"%{term}%")),
+                                      ("FTS5", text_contains(field, term))):
+                    query = db.query(Card.id).filter(clause).order_by(Card.id)
+                    times = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        ids = [card_id for card_id, in query]
+                        times.append(time.perf_counter() - start)
+                    timings[label] = (statistics.median(times), ids)
+                mismatches += timings["LIKE"][1] != timings["FTS5"][1]
+                print(f"{field} contains {term!r}: {len(timings['LIKE'][1])} cards, "
+                      f"LIKE {timings['LIKE'][0] * 1000:.1f} ms, FTS5 {timings['FTS5'][0] * 1000:.1f} ms")
+            print(f"Searches where FTS5 and LIKE disagree: {mismatches}")
+        finally:
+            db.close()
+
+
+def benchmark_filters(args):
+    """
+    Time compiling a large nested advanced-search filter (no database needed):
+    a plan cache miss parses, normalizes, hashes and compiles it, a hit on the
+    same filter_json is a dictionary lookup, and an equivalent filter written
+    differently is parsed and normalized but reuses the compiled plan
+    """
+    import json
+    import random
+    import time
+
+    from app.crud.card import process_filter_group
+    from app.crud.filter_plans import FilterPlanCache
+
+    rng = random.Random(args.seed)
+    fields = [
+        ("name", "contains", lambda: rng.choice(_SYNTHETIC_WORDS)),
+        ("type_line", "contains", lambda: rng.choice(_SYNTHETIC_TYPES)),
+        ("colors", "contains", lambda: ",".join(rng.sample("WUBRG", rng.randint(1, 3)))),
+        ("color_identity", "within", lambda: "".join(rng.sample("WUBRG", rng.randint(1, 4)))),
+        ("cmc", "less_than", lambda: rng.randint(1, 8)),
+        ("rarity", "is", lambda: rng.choice(["common", "uncommon", "rare", "mythic"])),
+        ("legality", "legal", lambda: rng.choice(["standard", "modern", "commander"])),
+    ]
+
+    def condition():
+        field, operator, value = rng.choice(fields)
+        return {"field": field, "operator": operator, "value": value()}
+
+    # Groups of `conditions` conditions, each nested in the one before
+    tree = None
+    for depth in range(args.groups):
+        group = {"type": "OR" if depth % 2 else "AND", "conditions": [condition() for _ in range(args.conditions)]}
+        group["groups"] = [tree] if tree else []
+        group["not"] = depth % 5 == 4
+        tree = group
+    filter_json = json.dumps(tree)
+    reordered_json = json.dumps(tree, sort_keys=True)
+
+    cache = FilterPlanCache(process_filter_group)
+
+    def timed(prepare, run):
+        total = 0.0
+        for _ in range(args.repeat):
+            prepare()
+            start = time.perf_counter()
+            run()
+            total += time.perf_counter() - start
+        return total / args.repeat
+
+    miss = timed(cache.clear, lambda: cache.plan_for_json(filter_json))
+    hit = timed(lambda: None, lambda: cache.plan_for_json(filter_json))
+    equivalent = timed(lambda: cache._raw.pop(reordered_json, None), lambda: cache.plan_for_json(reordered_json))
+    same_plan = cache.plan_for_json(reordered_json) is cache.plan_for_json(filter_json)
+
+    print(f"Filter of {args.groups} nested groups of {args.conditions} conditions ({len(filter_json)} bytes of JSON)")
+    print(f"Plan cache miss (parse, normalize, hash, compile): {miss * 1000:.2f} ms")
+    print(f"Plan cache hit on the same filter_json: {hit * 1e6:.1f} us")
+    print(f"Equivalent filter written differently (parse, normalize, hash): {equivalent * 1000:.2f} ms, "
+          f"{'same' if same_plan else 'different'} plan")
+
+
+def benchmark_imports(args):
+    """
+    Time writing resolved deck imports (a 60-card deck of four-ofs and a
+    250-card deck of singletons) in a throwaway database, counting the
+    statements and commits each issues, first with every card new to the
+    catalog and then with every card already in it
+    """
+    import io
+    import statistics
+    import time
+    import uuid
+    from contextlib import redirect_stdout
+
+    from sqlalchemy import event
+
+    with _benchmark_database():
+        from app.database import SessionLocal, engine
+        from app.schemas import CardCreate
+        from app.utils.deck_parser import save_imported_deck
+
+        counts = {"statements": 0, "commits": 0}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            counts["statements"] += 1
+
+        @event.listens_for(engine, "commit")
+        def count_commit(conn):
+            counts["commits"] += 1
+
+        db = SessionLocal()
+        try:
+            _insert_synthetic_cards(db, args.cards, args.seed)
+        finally:
+            db.close()
+        for quantity, lines in ((4, 15), (1, 250)):
+            results = {"new": [], "existing": []}
+            for repeat in range(args.repeat):
+                card_data = {}
+                for number in range(lines):
+                    name = f"Imported {repeat} {quantity}x{lines} Card {number}"
+                    card_data[name] = CardCreate(
+                        name=name, scryfall_id=str(uuid.uuid4()), type_line="Creature", cmc=2
+                    )
+                main_deck = [(quantity, name) for name in card_data]
+                for cards in ("new", "existing"):
+                    db = SessionLocal()
+                    try:
+                        counts.update(statements=0, commits=0)
+                        start = time.perf_counter()
+                        # Without the progress messages printed for every import
+                        with redirect_stdout(io.StringIO()):
+                            save_imported_deck(db, main_deck, [], card_data, "Benchmark")
+                        results[cards].append((time.perf_counter() - start, counts["statements"], counts["commits"]))
+                    finally:
+                        db.close()
+            for cards, runs in results.items():
+                elapsed, statements, commits = zip(*runs)
+                print(f"{quantity * lines}-card deck, {cards} cards: {statistics.median(elapsed) * 1000:.1f} ms, "
+                      f"{max(statements)} statements, {max(commits)} commits")
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None where /proc isn't available"""
+    import os
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+async def _asgi_get(app, path: str, query: str = "", accept: str = "application/json"):
+    """
+    GET a path straight from an ASGI app without buffering the response body,
+    returning (seconds to the first body byte, seconds in total, body bytes)
+    """
+    import asyncio
+    import time
+
+    disconnected = asyncio.Event()
+    state = {"first": None, "bytes": 0, "requested": False}
+
+    async def receive():
+        if not state["requested"]:
+            state["requested"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            if state["first"] is None:
+                state["first"] = time.perf_counter() - start
+            state["bytes"] += len(message["body"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"benchmark"), (b"accept", accept.encode())],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    disconnected.set()
+    return state["first"] if state["first"] is not None else elapsed, elapsed, state["bytes"]
+
+
+def benchmark_export(args):
+    """
+    Time exporting every card and deck through the API as one JSON response
+    and as an NDJSON stream, from synthetic cards and decks in a throwaway
+    database: time to the first byte, total time and the growth of the
+    process's resident memory (sampled while the response is sent)
+    """
+    import asyncio
+    import gc
+    import random
+    import threading
+
+    from sqlalchemy import insert
+
+    with _benchmark_database():
+        from app.database import SessionLocal
+        from app.main import app
+        from app.models import Deck, DeckCard
+
+        db = SessionLocal()
+        try:
+            _insert_synthetic_cards(db, args.cards, args.seed)
+            rng = random.Random(args.seed)
+            db.execute(insert(Deck), [{"id": deck_id, "name": f"Deck {deck_id}"}
+                                      for deck_id in range(1, args.decks + 1)])
+            db.execute(insert(DeckCard), [
+                {"deck_id": deck_id, "card_id": card_id, "quantity": 4, "is_sideboard": False}
+                for deck_id in range(1, args.decks + 1)
+                for card_id in rng.sample(range(1, args.cards + 1), 15)
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+        def measure(path, query, accept):
+            gc.collect()
+            baseline = _rss_bytes()
+            peak = [baseline]
+            done = threading.Event()
+
+            def sample():
+                while not done.wait(0.002):
+                    peak[0] = max(peak[0], _rss_bytes())
+
+            sampler = threading.Thread(target=sample) if baseline is not None else None
+            if sampler:
+                sampler.start()
+            try:
+                first, total, size = asyncio.run(_asgi_get(app, path, query, accept))
+            finally:
+                done.set()
+                if sampler:
+                    sampler.join()
+            growth = f"+{(peak[0] - baseline) / 2 ** 20:.0f} MB peak RSS" if baseline is not None else "RSS n/a"
+            return f"first byte {first * 1000:.0f} ms, total {total:.2f} s, {size / 2 ** 20:.1f} MB, {growth}"
+
+        print(f"{args.cards} cards, {args.decks} decks of 15 cards")
+        # NDJSON first, so memory the JSON responses leave allocated can't flatter it
+        print(f"Cards as NDJSON: {measure('/api/cards/', '', 'application/x-ndjson')}")
+        print(f"Cards as JSON: {measure('/api/cards/', f'limit={args.cards}', 'application/json')}")
+        print(f"Decks with their cards as NDJSON: {measure('/api/decks/', '', 'application/x-ndjson')}")
+        print(f"Deck summaries as JSON: {measure('/api/decks/', f'limit={args.decks}', 'application/json')}")
+
+
+def benchmark_concurrency(args):
+    """
+    Measure card search throughput and latency from concurrent searchers on
+    the read-only pool, alone and while `manage.py bulk-load` writes synthetic
+    cards into the same throwaway database from another process
+    """
+    import json
+    import os
+    import random
+    import statistics
+    import subprocess
+    import sys
+    import threading
+    import time
+
+    with _benchmark_database() as directory:
+        from app.crud.card import search_cards
+        from app.database import ReadSessionLocal, SessionLocal
+
+        db = SessionLocal()
+        try:
+            _insert_synthetic_cards(db, args.cards, args.seed)
+        finally:
+            db.close()
+
+        # The dump for the bulk load: new cards numbered after the existing ones
+        dump = os.path.join(directory, "bulk.json")
+        with open(dump, "w") as fp:
+            json.dump(list(_synthetic_scryfall_cards(args.load, args.seed + 1, start=args.cards + 1)), fp)
+
+        def run_searchers(running):
+            latencies = []
+            lock = threading.Lock()
+
+            def searcher(number):
+                rng = random.Random(number)
+                db = ReadSessionLocal()
+                try:
+                    while running():
+                        # Numbers in card names, so searches rarely repeat
+                        name = str(rng.randrange(100, args.cards))
+                        start = time.perf_counter()
+                        search_cards(db, name=name, sort="name", limit=20)
+                        elapsed = time.perf_counter() - start
+                        db.rollback()
+                        with lock:
+                            latencies.append(elapsed)
+                finally:
+                    db.close()
+
+            threads = [threading.Thread(target=searcher, args=(number,)) for number in range(args.searchers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return latencies, time.perf_counter() - start
+
+        def report(label, latencies, elapsed):
+            latencies = sorted(latencies)
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{label}: {len(latencies) / elapsed:.0f} searches/s, "
+                  f"p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+                  f"max {latencies[-1] * 1000:.1f} ms")
+
+        print(f"{args.searchers} searchers, {args.cards} cards, bulk load of {args.load} more "
+              f"in batches of {args.batch_size}")
+        deadline = time.perf_counter() + args.seconds
+        report("Searches alone", *run_searchers(lambda: time.perf_counter() < deadline))
+
+        load = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "bulk-load", dump, "--batch-size", str(args.batch_size)],
+            stdout=subprocess.DEVNULL
+        )
+        latencies, elapsed = run_searchers(lambda: load.poll() is None)
+        if load.returncode != 0:
+            raise RuntimeError(f"bulk load exited with status {load.returncode}")
+        report(f"Searches during the bulk load ({elapsed:.1f} s)", latencies, elapsed)
+
+
+def benchmark_scryfall(args):
+    """
+    Time looking up a deck's worth of card names against a simulated Scryfall
+    API (no network needed) answering every request after a fixed latency:
+    one request at a time, through the bounded, rate-limited ScryfallFetcher,
+    and through /cards/collection
+    """
+    import asyncio
+    import json
+    import time
+
+    import httpx
+
+    from app.utils.scryfall import SCRYFALL_API_URL, ScryfallFetcher
+
+    names = [f"Card {number}" for number in range(1, args.cards + 1)]
+    in_flight = {"now": 0, "peak": 0, "requests": 0}
+
+    async def handle(request):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        in_flight["requests"] += 1
+        try:
+            await asyncio.sleep(args.latency)
+        finally:
+            in_flight["now"] -= 1
+        if request.url.path == "/cards/collection":
+            identifiers = json.loads(request.content)["identifiers"]
+            data = [{"object": "card", "name": identifier["name"]} for identifier in identifiers]
+            return httpx.Response(200, json={"object": "list", "not_found": [], "data": data})
+        return httpx.Response(200, json={"object": "card", "name": request.url.params["exact"]})
+
+    async def sequential(client):
+        for name in names:
+            await client.get(f"{SCRYFALL_API_URL}/cards/named", params={"exact": name})
+
+    def fetcher():
+        return ScryfallFetcher(max_in_flight=args.max_in_flight, requests_per_second=args.rate, use_cache=False)
+
+    async def by_name(client):
+        await fetcher().fetch_cards_by_name(names, client)
+
+    async def collection(client):
+        await fetcher().fetch_collection([{"name": name} for name in names], client)
+
+    async def run(label, strategy):
+        in_flight.update(peak=0, requests=0)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+            start = time.perf_counter()
+            await strategy(client)
+            elapsed = time.perf_counter() - start
+        print(f"{label}: {elapsed:.2f} s, {in_flight['requests']} requests, {in_flight['peak']} at once")
+
+    async def main():
+        print(f"{args.cards} names, {args.latency * 1000:.0f} ms per request, "
+              f"fetcher limited to {args.max_in_flight} in flight and {args.rate:g} requests/s")
+        await run("One request at a time", sequential)
+        await run("ScryfallFetcher, one request per name", by_name)
+        await run("ScryfallFetcher, /cards/collection", collection)
+
+    asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MTG Deck Manager management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bulk_parser = subparsers.add_parser(
+        "bulk-load",
+        help="Load a Scryfall bulk-data dump (default-cards or oracle-cards) into the card catalog"
+    )
+    bulk_parser.add_argument("path", help="Path to the bulk-data JSON file (optionally .gz)")
+    bulk_parser.add_argument("--batch-size", type=int, default=2000, help="Cards per transaction")
+    bulk_parser.set_defaults(func=bulk_load)
+
+    similarity_parser = subparsers.add_parser(
+        "benchmark-similarity", help="Time the deck similarity index on synthetic decks"
+    )
+    similarity_parser.add_argument("--decks", type=int, default=10000, help="Number of decks to index")
+    similarity_parser.add_argument("--queries", type=int, default=200, help="Similar-deck queries to time")
+    similarity_parser.add_argument("--limit", type=int, default=10, help="Decks returned per query")
+    similarity_parser.add_argument("--swaps", type=int, default=4, help="Cards each deck swaps from its archetype")
+    similarity_parser.add_argument("--seed", type=int, default=0)
+    similarity_parser.set_defaults(func=benchmark_similarity)
+
+    suggestions_parser = subparsers.add_parser(
+        "benchmark-suggestions", help="Time the card co-occurrence matrix on synthetic decks"
+    )
+    suggestions_parser.add_argument("--decks", type=int, default=50000, help="Number of decks to index")
+    suggestions_parser.add_argument("--cards", type=int, default=8, help="Cards in each partial deck")
+    suggestions_parser.add_argument("--queries", type=int, default=200, help="Suggestion queries to time")
+    suggestions_parser.add_argument("--limit", type=int, default=20, help="Cards suggested per query")
+    suggestions_parser.add_argument("--updates", type=int, default=1000, help="Deck changes to apply")
+    suggestions_parser.add_argument("--swaps", type=int, default=4, help="Cards each deck swaps from its archetype")
+    suggestions_parser.add_argument("--seed", type=int, default=0)
+    suggestions_parser.set_defaults(func=benchmark_suggestions)
+
+    catalog_parser = subparsers.add_parser(
+        "benchmark-catalog", help="Time card searches against the in-memory catalog and SQL on synthetic cards"
+    )
+    catalog_parser.add_argument("--cards", type=int, default=100000, help="Number of cards to generate")
+    catalog_parser.add_argument("--repeat", type=int, default=5, help="Times each search is run (median reported)")
+    catalog_parser.add_argument("--order", choices=["id", "name", "cmc"], default="id", help="Result order")
+    catalog_parser.add_argument("--seed", type=int, default=0)
+    catalog_parser.set_defaults(func=benchmark_catalog)
+
+    fts_parser = subparsers.add_parser(
+        "benchmark-fts", help="Time card text searches through the FTS5 index and LIKE scans on synthetic cards"
+    )
+    fts_parser.add_argument("--cards", type=int, default=100000, help="Number of cards to generate")
+    fts_parser.add_argument("--repeat", type=int, default=5, help="Times each search is run (median reported)")
+    fts_parser.add_argument("--seed", type=int, default=0)
+    fts_parser.set_defaults(func=benchmark_fts)
+
+    filters_parser = subparsers.add_parser(
+        "benchmark-filters", help="Time compiling a nested advanced-search filter with and without the plan cache"
+    )
+    filters_parser.add_argument("--groups", type=int, default=20, help="Nested filter groups")
+    filters_parser.add_argument("--conditions", type=int, default=3, help="Conditions in each group")
+    filters_parser.add_argument("--repeat", type=int, default=200, help="Times each case is run (mean reported)")
+    filters_parser.add_argument("--seed", type=int, default=0)
+    filters_parser.set_defaults(func=benchmark_filters)
+
+    imports_parser = subparsers.add_parser(
+        "benchmark-imports", help="Time writing 60- and 250-card deck imports, counting statements and commits"
+    )
+    imports_parser.add_argument("--cards", type=int, default=20000, help="Synthetic cards already in the catalog")
+    imports_parser.add_argument("--repeat", type=int, default=10, help="Imports of each deck (median reported)")
+    imports_parser.add_argument("--seed", type=int, default=0)
+    imports_parser.set_defaults(func=benchmark_imports)
+
+    concurrency_parser = subparsers.add_parser(
+        "benchmark-concurrency", help="Measure card search throughput while a bulk load writes to the database"
+    )
+    concurrency_parser.add_argument("--cards", type=int, default=20000, help="Cards in the catalog before the load")
+    concurrency_parser.add_argument("--load", type=int, default=60000, help="Cards the bulk load inserts")
+    concurrency_parser.add_argument("--batch-size", type=int, default=2000, help="Bulk load cards per transaction")
+    concurrency_parser.add_argument("--searchers", type=int, default=8, help="Threads searching at once")
+    concurrency_parser.add_argument("--seconds", type=float, default=5.0, help="Length of the searches-only run")
+    concurrency_parser.add_argument("--seed", type=int, default=0)
+    concurrency_parser.set_defaults(func=benchmark_concurrency)
+
+    export_parser = subparsers.add_parser(
+        "benchmark-export", help="Time exporting every card and deck as JSON and as NDJSON streams"
+    )
+    export_parser.add_argument("--cards", type=int, default=60000, help="Number of cards to generate")
+    export_parser.add_argument("--decks", type=int, default=1000, help="Number of decks to generate")
+    export_parser.add_argument("--seed", type=int, default=0)
+    export_parser.set_defaults(func=benchmark_export)
+
+    scryfall_parser = subparsers.add_parser(
+        "benchmark-scryfall", help="Time card lookups against a simulated Scryfall API with fixed latency"
+    )
+    scryfall_parser.add_argument("--cards", type=int, default=42, help="Distinct card names to look up")
+    scryfall_parser.add_argument("--latency", type=float, default=0.15, help="Seconds each request takes")
+    scryfall_parser.add_argument("--max-in-flight", type=int, default=8, help="Fetcher's concurrent requests")
+    scryfall_parser.add_argument("--rate", type=float, default=10.0, help="Fetcher's requests started per second")
+    scryfall_parser.set_defaults(func=benchmark_scryfall)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
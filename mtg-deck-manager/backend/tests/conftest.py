@@ -0,0 +1,203 @@
+import asyncio
+import copy
+import json
+import os
+import sys
+import tempfile
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from itertools import count
+
+import pytest
+from sqlalchemy import event
+
+# Point the app at a throwaway database and disable the Scryfall response
+# cache before anything imports app.database
+_data_dir = tempfile.mkdtemp(prefix="mtg-deck-manager-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/test.db"
+os.environ["SCRYFALL_CACHE_PATH"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements():
+    """
+    Context manager counting the SQL statements every engine (sync and
+    async, read and write) executes inside its block, and the transactions
+    they commit
+    """
+    engines = {
+        database.engine, database.read_engine,
+        database.async_engine.sync_engine, database.async_read_engine.sync_engine
+    }
+
+    @contextmanager
+    def counting():
+        counter = StatementCounter()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            counter.statements.append(statement)
+
+        def record_commit(conn):
+            counter.commits += 1
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", record)
+            event.listen(engine, "commit", record_commit)
+        try:
+            yield counter
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", record)
+                event.remove(engine, "commit", record_commit)
+
+    return counting
+
+
+_card_numbers = count(1)
+
+
+@pytest.fixture
+def make_card(client):
+    """Create a card through the API, returning its JSON"""
+    def make(**fields):
+        number = next(_card_numbers)
+        fields.setdefault("name", f"Test Card {number}")
+        fields.setdefault("scryfall_id", f"test-card-{number}")
+        response = client.post("/api/cards/", json=fields)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def make_deck(client, make_card):
+    """Create a deck holding `cards` new cards, returning its ID"""
+    def make(cards: int = 0, name: str = "Test Deck") -> int:
+        response = client.post("/api/decks/", json={"name": name})
+        assert response.status_code == 201, response.text
+        deck_id = response.json()["id"]
+        for _ in range(cards):
+            card = make_card()
+            response = client.post(f"/api/decks/{deck_id}/cards", json={"card_id": card["id"], "quantity": 2})
+            assert response.status_code == 200, response.text
+        return deck_id
+    return make
+
+
+@pytest.fixture
+def bulk_load(tmp_path):
+    """
+    Upsert Scryfall-style card dicts the way manage.py bulk-load does, outside
+    the API's request path, returning the load's counters
+    """
+    from app.utils.bulk_data import load_bulk_file
+
+    def load(cards):
+        path = tmp_path / "cards.json"
+        path.write_text(json.dumps([{"object": "card", "type_line": "Instant", **card} for card in cards]))
+        db = database.SessionLocal()
+        try:
+            return load_bulk_file(db, str(path))
+        finally:
+            db.close()
+    return load
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class ScryfallStub:
+    """
+    Stand-in for the Scryfall API answering /cards/collection from recorded
+    cards (tests/fixtures/scryfall_collection.json). Names starting with
+    "Missing" are reported not found and any other name is answered with the
+    recorded Llanowar Elves under that name. Every request is recorded.
+    """
+
+    def __init__(self, latency: float = 0.0, status_code: int = 200):
+        with open(os.path.join(FIXTURES, "scryfall_collection.json")) as fixture:
+            self.recorded = json.load(fixture)["data"]
+        self.latency = latency
+        self.status_code = status_code
+        self.requests = []
+        self.identifiers = Counter()
+
+    def card_for(self, identifier):
+        name = identifier.get("name", "")
+        for card in self.recorded:
+            faces = [face["name"].lower() for face in card.get("card_faces", [])]
+            if name.lower() in [card["name"].lower(), *faces]:
+                return card
+        if not name or name.lower().startswith("missing"):
+            return None
+        card = copy.deepcopy(next(card for card in self.recorded if card["name"] == "Llanowar Elves"))
+        card["name"] = name
+        card["id"] = str(uuid.uuid5(uuid.NAMESPACE_URL, name.lower()))
+        return card
+
+    async def handle(self, request):
+        import httpx
+
+        self.requests.append(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, json={"object": "error"})
+        identifiers = json.loads(request.content)["identifiers"]
+        self.identifiers.update(identifier.get("name", "").lower() for identifier in identifiers)
+        data, not_found = [], []
+        for identifier in identifiers:
+            card = self.card_for(identifier)
+            if card is None:
+                not_found.append(identifier)
+            else:
+                data.append(card)
+        return httpx.Response(200, json={"object": "list", "not_found": not_found, "data": data})
+
+    def client(self):
+        import httpx
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    def fetcher(self):
+        from app.utils.scryfall import ScryfallFetcher
+
+        return ScryfallFetcher(use_cache=False, requests_per_second=1000, backoff=0.01)
+
+
+@pytest.fixture
+def scryfall_stub(monkeypatch):
+    """
+    Serve the app's Scryfall requests from a ScryfallStub, returning it so
+    tests can inspect the requests or make it slow or fail
+    """
+    from app.utils import scryfall
+
+    stub = ScryfallStub()
+    client = stub.client()
+    monkeypatch.setattr(scryfall, "get_client", lambda: client)
+    monkeypatch.setattr(scryfall, "_default_fetcher", stub.fetcher())
+    return stub
@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+import pytest
+
+from app.utils.scryfall import ScryfallUnavailable, resolve_card_identifiers
+
+
+def _resolve(stub, identifiers):
+    async def run():
+        async with stub.client() as client:
+            return await resolve_card_identifiers(identifiers, stub.fetcher(), client)
+    return asyncio.run(run())
+
+
+def test_identifiers_are_batched_deduplicated_and_mapped_back(scryfall_stub):
+    recorded = ["Lightning Bolt", "Counterspell", "Delver of Secrets"]
+    names = recorded + [f"Synthetic Card {number}" for number in range(77)] + ["Missing One", "Missing Two", "Missing Three"]
+    assert len(names) == 83
+    # The same cards again, differing only in case
+    identifiers = [{"name": name} for name in names] + [{"name": "lightning bolt"}, {"name": "MISSING TWO"}]
+
+    cards, not_found = _resolve(scryfall_stub, identifiers)
+
+    assert sorted(len(json.loads(request.content)["identifiers"]) for request in scryfall_stub.requests) == [8, 75]
+    assert sum(scryfall_stub.identifiers.values()) == 83
+    assert max(scryfall_stub.identifiers.values()) == 1
+
+    assert not_found == [80, 81, 82, 84]
+    assert cards[0].name == "Lightning Bolt" and cards[0].set_code == "m10" and cards[0].cmc == 1
+    assert cards[83].scryfall_id == cards[0].scryfall_id
+    assert cards[2].name == "Delver of Secrets // Insectile Aberration"
+    assert cards[2].mana_cost == "" and cards[2].image_uri.endswith(".jpg")
+    assert cards[10].name == "Synthetic Card 7"
+
+
+def test_failed_requests_are_not_reported_as_not_found(scryfall_stub):
+    scryfall_stub.status_code = 503
+    with pytest.raises(ScryfallUnavailable):
+        _resolve(scryfall_stub, [{"name": "Lightning Bolt"}, {"name": "Counterspell"}])
+    # Retried before giving up
+    assert len(scryfall_stub.requests) > 1
+
+
+def test_import_fails_instead_of_dropping_cards(client, scryfall_stub):
+    scryfall_stub.status_code = 503
+    before = client.get("/api/decks/").json()
+
+    response = client.post("/api/decks/import", json={
+        "name": "Unreachable", "deck_text": "4 Lightning Bolt\n4 Counterspell"
+    })
+    assert response.status_code == 503
+    assert client.get("/api/decks/").json() == before
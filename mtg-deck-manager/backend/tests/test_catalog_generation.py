@@ -0,0 +1,68 @@
+def search_names(client, name):
+    response = client.get("/api/cards/search", params={"name": name})
+    assert response.status_code == 200, response.text
+    return sorted(card["name"] for card in response.json())
+
+
+def test_search_cache_sees_bulk_load(client, make_card, bulk_load):
+    make_card(name="Glimmerwisp Original", scryfall_id="generation-1")
+    assert search_names(client, "Glimmerwisp") == ["Glimmerwisp Original"]
+    # Served from the search result cache now
+    assert search_names(client, "Glimmerwisp") == ["Glimmerwisp Original"]
+
+    stats = bulk_load([
+        {"id": "generation-1", "name": "Renamed Wisp"},
+        {"id": "generation-2", "name": "Glimmerwisp Newcomer"},
+    ])
+    assert stats["updated"] == 1 and stats["inserted"] == 1
+
+    assert search_names(client, "Glimmerwisp") == ["Glimmerwisp Newcomer"]
+
+
+def test_unchanged_bulk_load_keeps_the_cache(client, bulk_load):
+    from app.crud.query_cache import catalog_version
+
+    bulk_load([{"id": "generation-3", "name": "Steady Wisp"}])
+    search_names(client, "Steady Wisp")
+    version = catalog_version()
+
+    stats = bulk_load([{"id": "generation-3", "name": "Steady Wisp"}])
+    assert stats["unchanged"] == 1
+
+    search_names(client, "Steady Wisp")
+    assert catalog_version() == version
+
+
+def _catalog_ids(tree):
+    from app import database
+    from app.crud.columnar import card_catalog
+
+    db = database.SessionLocal()
+    try:
+        card_catalog.sync(db)
+    finally:
+        db.close()
+    return list(card_catalog.search(tree).ids)
+
+
+def test_catalog_sees_cards_changed_by_bulk_load(client, make_card, bulk_load):
+    card = make_card(name="Catalog Wisp", scryfall_id="generation-4", set_code="gnx", cmc=2)
+    by_cmc = {"type": "AND", "conditions": [
+        {"field": "set_code", "operator": "is", "value": "gnx"},
+        {"field": "cmc", "operator": "equals", "value": 5}
+    ]}
+    assert _catalog_ids(by_cmc) == []
+
+    # Updates an existing row, so the id-based append alone would miss it
+    bulk_load([{"id": "generation-4", "name": "Catalog Wisp", "set": "gnx", "cmc": 5}])
+    assert _catalog_ids(by_cmc) == [card["id"]]
+
+
+def test_autocomplete_sees_cards_renamed_by_bulk_load(client, make_card, bulk_load):
+    make_card(name="Quillback Drifter", scryfall_id="generation-5")
+    response = client.get("/api/cards/autocomplete", params={"name_prefix": "Quillback"})
+    assert response.json() == ["Quillback Drifter"]
+
+    bulk_load([{"id": "generation-5", "name": "Quillback Rover"}])
+    response = client.get("/api/cards/autocomplete", params={"name_prefix": "Quillback"})
+    assert response.json() == ["Quillback Rover"]
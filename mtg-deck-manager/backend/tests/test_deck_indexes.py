@@ -0,0 +1,71 @@
+import pytest
+
+from app import database
+from app.crud.card_cooccurrence import card_cooccurrence
+from app.crud.deck_indexes import sync_deck_indexes
+from app.crud.deck_similarity import deck_similarity_index
+
+
+def _add_cards(client, deck_id, cards):
+    for card in cards:
+        response = client.post(f"/api/decks/{deck_id}/cards", json={"card_id": card["id"], "quantity": 1})
+        assert response.status_code == 200, response.text
+
+
+def _suggested_names(client, deck_id):
+    response = client.get(f"/api/decks/{deck_id}/suggestions")
+    assert response.status_code == 200, response.text
+    return [suggestion["card"]["name"] for suggestion in response.json()]
+
+
+def test_deck_indexes_see_cards_renamed_by_bulk_load(client, make_card, make_deck, bulk_load):
+    shared = make_card(name="Index Shared Card")
+    partner = make_card(name="Index Partner Card", scryfall_id="deck-index-partner")
+    deck_id, other_id = make_deck(name="Index Deck"), make_deck(name="Index Other Deck")
+    _add_cards(client, deck_id, [shared])
+    _add_cards(client, other_id, [shared, partner])
+    assert "Index Partner Card" in _suggested_names(client, deck_id)
+
+    bulk_load([{"id": "deck-index-partner", "name": "Index Partner Renamed"}])
+
+    names = _suggested_names(client, deck_id)
+    assert "Index Partner Renamed" in names
+    assert "Index Partner Card" not in names
+
+
+def test_failed_similarity_build_is_retried(client, make_deck):
+    make_deck(cards=2)
+    with pytest.raises(RuntimeError):
+        with deck_similarity_index.building():
+            raise RuntimeError("deck_cards unreadable")
+    assert not deck_similarity_index.ready
+    assert deck_similarity_index.stats()["decks"] == 0
+
+    db = database.SessionLocal()
+    try:
+        sync_deck_indexes(db)
+    finally:
+        db.close()
+    assert deck_similarity_index.ready
+    assert deck_similarity_index.stats()["decks"] > 0
+
+
+def test_failed_cooccurrence_build_is_retried(client, make_deck):
+    make_deck(cards=2)
+    with pytest.raises(RuntimeError):
+        with card_cooccurrence.building():
+            card_cooccurrence.put_many({1: {"Half Built Card": 1, "Other Card": 1}})
+            raise RuntimeError("deck_cards unreadable")
+    assert not card_cooccurrence.ready
+    assert card_cooccurrence.stale
+    assert card_cooccurrence.stats()["decks"] == 0
+    # Puts outside a build are applied, not left pending
+    assert not card_cooccurrence._building and not card_cooccurrence._pending
+
+    db = database.SessionLocal()
+    try:
+        sync_deck_indexes(db)
+    finally:
+        db.close()
+    assert card_cooccurrence.ready and not card_cooccurrence.stale
+    assert card_cooccurrence.stats()["decks"] > 0
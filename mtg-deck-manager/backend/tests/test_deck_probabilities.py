@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from app.crud import deck_probabilities
+from app.crud.deck_probabilities import (
+    PROBABILITY_CONCURRENCY, PROBABILITY_MAX_SAMPLES, DeckEntry, _exact_castable, _simulate_castable,
+    opening_hand_odds
+)
+from app.models.card_fields import COLOR_BITS
+
+
+def _dual_color_deck(client, make_card, make_deck):
+    deck_id = make_deck(name="Probability Deck")
+    cards = [
+        make_card(name="Probability Plains", type_line="Basic Land — Plains", color_identity="W"),
+        make_card(name="Probability Island", type_line="Basic Land — Island", color_identity="U"),
+        make_card(name="Probability Spell", type_line="Instant", mana_cost="{W}{U}", cmc=2, colors="W,U"),
+    ]
+    for card, quantity in zip(cards, (12, 12, 4)):
+        response = client.post(f"/api/decks/{deck_id}/cards", json={"card_id": card["id"], "quantity": quantity})
+        assert response.status_code == 200, response.text
+    return deck_id
+
+
+def test_samples_are_capped(client, make_card, make_deck):
+    deck_id = _dual_color_deck(client, make_card, make_deck)
+    response = client.get(f"/api/decks/{deck_id}/probabilities", params={"samples": PROBABILITY_MAX_SAMPLES + 1})
+    assert response.status_code == 422
+
+    response = client.get(f"/api/decks/{deck_id}/probabilities", params={"samples": 1000})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["deck_size"] == 28 and body["lands"] == 24
+    assert [card["method"] for card in body["cards"]] == ["monte_carlo"]
+
+
+def test_computations_are_limited(client, make_card, make_deck, monkeypatch):
+    deck_id = _dual_color_deck(client, make_card, make_deck)
+    compute = deck_probabilities.deck_probabilities
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow_compute(entries, **options):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.2)
+        with lock:
+            running[0] -= 1
+        return compute(entries, **options)
+
+    monkeypatch.setattr(deck_probabilities, "deck_probabilities", slow_compute)
+
+    # Distinct turn counts, so no request is answered from the cache
+    responses = []
+    threads = [
+        threading.Thread(target=lambda turns=turns: responses.append(client.get(
+            f"/api/decks/{deck_id}/probabilities", params={"turns": turns, "samples": 1000}
+        )))
+        for turns in range(1, PROBABILITY_CONCURRENCY + 3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert peak[0] == PROBABILITY_CONCURRENCY
+
+
+def test_opening_hand_land_odds():
+    odds = opening_hand_odds(deck_size=60, lands=24, keep_min_lands=2, keep_max_lands=5, max_mulligans=2)
+    assert odds["at_least_lands"]["2"] == pytest.approx(0.85734, abs=1e-5)
+    assert sum(odds["land_distribution"].values()) == pytest.approx(1.0)
+
+
+def test_exact_castability_of_a_two_drop():
+    two_drop = DeckEntry("Two Drop", 4, False, 2, {"G": 1}, 0)
+    by_turn = _exact_castable(two_drop, deck_size=60, lands=24, turns=3, on_the_draw=False)
+    assert by_turn[0] == 0.0
+    assert by_turn[1] == pytest.approx(0.3904, abs=1e-4)
+    assert by_turn[2] == pytest.approx(0.4510, abs=1e-4)
+
+
+def test_simulation_matches_exact_odds_of_a_mono_color_deck():
+    entries = [
+        DeckEntry("Forest", 24, True, 0, {}, COLOR_BITS["G"]),
+        DeckEntry("Two Drop", 4, False, 2, {"G": 1}, 0),
+        DeckEntry("Four Drop", 4, False, 4, {"G": 2}, 0),
+        *(DeckEntry(f"Filler {number}", 4, False, 3, {"G": 1}, 0) for number in range(7)),
+    ]
+    simulated = _simulate_castable(entries, [1, 2], turns=6, on_the_draw=True, samples=100000, seed=0)
+    for index in (1, 2):
+        exact = _exact_castable(entries[index], deck_size=60, lands=24, turns=6, on_the_draw=True)
+        # About six standard errors of 100,000 samples
+        assert simulated[index] == pytest.approx(exact, abs=0.01)
+
@@ -0,0 +1,20 @@
+from app.crud.stats_cache import deck_stats_cache
+
+
+def test_stats_follow_bulk_load_card_changes(client, make_card, bulk_load):
+    card = make_card(name="Stat Shifter", scryfall_id="stats-1", cmc=2, type_line="Instant")
+    deck_id = client.post("/api/decks/", json={"name": "Stats"}).json()["id"]
+    client.post(f"/api/decks/{deck_id}/cards", json={"card_id": card["id"], "quantity": 3})
+
+    first = client.get(f"/api/decks/{deck_id}/stats")
+    assert first.json()["mana_curve"] == {"2": 3}
+    hits = deck_stats_cache.hits
+    assert client.get(f"/api/decks/{deck_id}/stats").json()["mana_curve"] == {"2": 3}
+    assert deck_stats_cache.hits == hits + 1
+
+    bulk_load([{"id": "stats-1", "name": "Stat Shifter", "cmc": 5, "type_line": "Creature — Shifter"}])
+
+    second = client.get(f"/api/decks/{deck_id}/stats")
+    assert second.json()["mana_curve"] == {"5": 3}
+    assert second.json()["card_types"] == {"Creature": 3}
+    assert second.headers["ETag"] != first.headers["ETag"]
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from app.crud import card as card_crud
+
+
+def test_slow_search_does_not_block_other_requests(client, make_deck, monkeypatch):
+    deck_id = make_deck(cards=1)
+    started = threading.Event()
+
+    def slow_search(db, **filters):
+        started.set()
+        time.sleep(1.0)
+        return [], 0, None
+
+    monkeypatch.setattr(card_crud, "search_cards", slow_search)
+
+    search_finished = []
+    search = threading.Thread(
+        target=lambda: search_finished.append((client.get("/api/cards/search?name=slow"), time.monotonic()))
+    )
+    search.start()
+    assert started.wait(5)
+
+    response = client.get(f"/api/decks/{deck_id}")
+    deck_finished = time.monotonic()
+    search.join()
+
+    assert response.status_code == 200
+    search_response, search_finished_at = search_finished[0]
+    assert search_response.status_code == 200, search_response.text
+    # The deck was served while the search was still running on its thread
+    assert deck_finished < search_finished_at
+
+
+def test_import_writes_deck_on_worker_thread(client, make_card):
+    first, second = make_card(), make_card()
+    deck_text = f"4 {first['name']}\n\n2 {second['name']}"
+
+    response = client.post("/api/decks/import", json={"name": "Imported", "deck_text": deck_text})
+    assert response.status_code == 201, response.text
+    cards = {(entry["card"]["name"], entry["quantity"], entry["is_sideboard"]) for entry in response.json()["cards"]}
+    assert cards == {(first["name"], 4, False), (second["name"], 2, True)}
+
+
+def test_import_job_reports_progress_from_worker_thread(client, make_card):
+    card = make_card()
+    response = client.post("/api/decks/import/jobs", json={"name": "Queued", "deck_text": f"3 {card['name']}"})
+    assert response.status_code == 202, response.text
+
+    # The event stream only ends once the job's final status has been signalled
+    with client.stream("GET", f"/api/decks/import/jobs/{response.json()['id']}/events") as events:
+        body = "".join(events.iter_text())
+    assert "event: succeeded" in body
+
+    job = client.get(f"/api/decks/import/jobs/{response.json()['id']}").json()
+    assert job["status"] == "succeeded"
+    assert job["progress"]["rows_written"] == 2
@@ -0,0 +1,60 @@
+import uuid
+
+
+from app import database
+from app.schemas import CardCreate
+from app.utils.deck_parser import save_imported_deck
+
+
+def test_get_deck_statements_do_not_grow_with_its_cards(client, count_statements, make_deck):
+    counts = []
+    for cards in (5, 15, 30):
+        deck_id = make_deck(cards)
+        with count_statements() as statements:
+            response = client.get(f"/api/decks/{deck_id}")
+        assert response.status_code == 200
+        assert len(response.json()["cards"]) == cards
+        counts.append(len(statements))
+
+    # The deck, then its entries with their cards
+    assert counts == [2, 2, 2]
+
+
+def test_deck_list_is_one_statement(client, count_statements, make_deck):
+    for _ in range(3):
+        make_deck(4)
+
+    with count_statements() as statements:
+        response = client.get("/api/decks/", params={"limit": 100})
+    assert response.status_code == 200
+    assert len(response.json()) >= 3
+    assert "cards" not in response.json()[0]
+    assert len(statements) == 1
+
+
+def test_deck_import_is_one_commit_whatever_its_size(client, count_statements):
+    counts = {}
+    # A 60-card deck of four-ofs and a 250-card deck of singletons
+    for quantity, lines in ((4, 15), (1, 250)):
+        card_data = {}
+        for number in range(lines):
+            name = f"Imported {quantity}x{lines} Card {number}"
+            card_data[name] = CardCreate(name=name, scryfall_id=str(uuid.uuid4()), type_line="Creature", cmc=2)
+        main_deck = [(quantity, name) for name in card_data]
+
+        # First with every card missing from the catalog, then with every card in it
+        counts[quantity * lines] = []
+        for _ in range(2):
+            db = database.SessionLocal()
+            try:
+                with count_statements() as statements:
+                    deck = save_imported_deck(db, main_deck, [], card_data, "Imported")
+                assert sum(entry.quantity for entry in deck.cards) == quantity * lines
+            finally:
+                db.close()
+            assert statements.commits == 1
+            counts[quantity * lines].append(len(statements))
+
+    # Bulk statements: the same number for both decks, fewer once the cards exist
+    assert counts[60] == counts[250]
+    assert counts[60][1] < counts[60][0]
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import httpx
+
+from app.utils import scryfall_cache
+from app.utils.scryfall import ScryfallFetcher
+from app.utils.scryfall_cache import ScryfallCache, name_key
+
+
+class TracedCache(ScryfallCache):
+    """ScryfallCache recording each SQL statement and the thread that ran it"""
+
+    def __init__(self, path):
+        super().__init__(path=str(path))
+        self.statements = []
+        self._db.set_trace_callback(lambda statement: self.statements.append((statement, threading.get_ident())))
+
+    def selects(self):
+        return [statement for statement, _ in self.statements if statement.startswith("SELECT key")]
+
+    def touches(self):
+        return [statement for statement, _ in self.statements if statement.startswith("UPDATE responses SET last_used")]
+
+
+def _named_transport(requests):
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(200, json={"object": "card", "name": request.url.params["exact"]})
+    return httpx.MockTransport(handle)
+
+
+def test_a_miss_reads_the_cache_once_off_the_loop(tmp_path):
+    cache = TracedCache(tmp_path / "cache.db")
+    requests = []
+
+    async def run():
+        async with httpx.AsyncClient(transport=_named_transport(requests)) as client:
+            fetcher = ScryfallFetcher(cache=cache, requests_per_second=1000)
+            first = await fetcher.get_json(client, "/cards/named", {"exact": "Opt"}, name_key("Opt"))
+            second = await fetcher.get_json(client, "/cards/named", {"exact": "Opt"}, name_key("Opt"))
+            return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(run())
+    assert first == second == {"object": "card", "name": "Opt"}
+    assert len(requests) == 1
+    # One SELECT for the miss and one for the hit; reads don't write last_used
+    assert len(cache.selects()) == 2
+    assert cache.touches() == []
+    assert all(thread != loop_thread for _, thread in cache.statements)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_collection_lookups_read_the_cache_in_one_query(tmp_path):
+    cache = TracedCache(tmp_path / "cache.db")
+    cache.put_many_json([(name_key(f"Cached {number}"), {"name": f"Cached {number}"}) for number in range(40)])
+    cache.statements.clear()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(500))) as client:
+            fetcher = ScryfallFetcher(cache=cache, requests_per_second=1000)
+            return await fetcher.fetch_collection([{"name": f"Cached {number}"} for number in range(40)], client)
+
+    cards = asyncio.run(run())
+    assert [card["name"] for card in cards] == [f"Cached {number}" for number in range(40)]
+    assert len(cache.selects()) == 1
+    assert cache.stats()["hits"] == 40
+
+
+def test_last_used_is_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(scryfall_cache, "TOUCH_FLUSH_SIZE", 10)
+    cache = TracedCache(tmp_path / "cache.db")
+    cache.put_many_json([(f"key:{number}", {"number": number}) for number in range(25)])
+
+    for number in range(25):
+        assert cache.lookup(f"key:{number}").data() == {"number": number}
+    # executemany traces each row; the 20 flushed reads were written in two batches
+    assert len(cache.touches()) == 20
+    assert len(cache._touched) == 5
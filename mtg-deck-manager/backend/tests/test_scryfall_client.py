@@ -0,0 +1,60 @@
+import asyncio
+import http.server
+import threading
+
+import httpx
+
+from app.utils import scryfall
+from app.utils.scryfall import client_stats, create_client
+
+
+class _OkHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+async def _get_many(client: httpx.AsyncClient, url: str, times: int):
+    try:
+        for _ in range(times):
+            response = await client.get(url)
+            assert response.status_code == 200
+    finally:
+        await client.aclose()
+
+
+def test_reuse_is_unknown_without_connection_events():
+    client_stats.reset()
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+    asyncio.run(_get_many(create_client(transport), f"{scryfall.SCRYFALL_API_URL}/cards/named", 3))
+
+    stats = client_stats.as_dict()
+    assert stats["requests"] == 3
+    assert stats["traced_requests"] == 0
+    assert stats["connections_opened"] == 0
+    assert stats["connections_reused"] is None
+
+
+def test_pooled_connection_is_reused():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client_stats.reset()
+        asyncio.run(_get_many(create_client(), f"http://127.0.0.1:{server.server_port}/", 3))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = client_stats.as_dict()
+    assert stats["traced_requests"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 2
@@ -0,0 +1,41 @@
+import pytest
+
+from app.utils.scryfall_query import ScryfallQueryError, parse_scryfall_query
+
+
+@pytest.mark.parametrize("query", ["- bolt", "bolt -", "bolt - t:instant", "(bolt -)"])
+def test_dangling_negation_is_an_error(query):
+    with pytest.raises(ScryfallQueryError):
+        parse_scryfall_query(query)
+
+
+def test_negated_terms_still_parse():
+    node = parse_scryfall_query("-bolt -t:instant")
+    assert [child["not"] for child in node["groups"]] == [True, True]
+
+
+def _scryfall_search(client, query):
+    response = client.get("/api/cards/search/scryfall", params={"q": query})
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Search-Source"] == "local"
+    return [card["name"] for card in response.json()]
+
+
+def test_exact_name_ignores_case(client, make_card):
+    make_card(name="Glacial Fortress Exact")
+    make_card(name="Glacial Fortress Exact Copy")
+
+    assert _scryfall_search(client, '!"glacial FORTRESS exact"') == ["Glacial Fortress Exact"]
+
+
+def test_exact_name_has_no_wildcards(client, make_card):
+    make_card(name="Percent_Card 100%")
+    make_card(name="PercentXCard 100 and more")
+
+    assert _scryfall_search(client, '!"percent_card 100%"') == ["Percent_Card 100%"]
+    assert _scryfall_search(client, '!"percent_card%"') == []
+
+
+def test_dangling_negation_is_a_bad_request(client):
+    response = client.get("/api/cards/search/scryfall", params={"q": "- bolt"})
+    assert response.status_code == 400
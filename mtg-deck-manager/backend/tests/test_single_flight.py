@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from app import database
+from app.crud.card import insert_cards_ignoring_conflicts
+from app.utils.scryfall import ScryfallFetcher, SingleFlight, get_default_fetcher
+
+
+def _counting_transport(requests):
+    async def handle(request: httpx.Request):
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        if request.url.path == "/cards/collection":
+            identifiers = json.loads(request.content)["identifiers"]
+            return httpx.Response(200, json={
+                "data": [{"name": identifier["name"]} for identifier in identifiers],
+                "not_found": []
+            })
+        return httpx.Response(200, json={"name": request.url.params["exact"]})
+    return httpx.MockTransport(handle)
+
+
+async def _with_client(requests, run):
+    async with httpx.AsyncClient(transport=_counting_transport(requests)) as client:
+        fetcher = ScryfallFetcher(use_cache=False, requests_per_second=1000)
+        return await run(fetcher, client)
+
+
+def test_concurrent_name_lookups_share_one_request():
+    requests = []
+
+    async def run(fetcher, client):
+        return await asyncio.gather(*[
+            fetcher.fetch_cards_by_name(["Lightning Bolt"], client) for _ in range(5)
+        ])
+
+    results = asyncio.run(_with_client(requests, run))
+    assert len(requests) == 1
+    assert all(result == {"Lightning Bolt": {"name": "Lightning Bolt"}} for result in results)
+
+
+def test_concurrent_collection_lookups_send_each_identifier_once():
+    requests = []
+
+    async def run(fetcher, client):
+        return await asyncio.gather(
+            fetcher.fetch_collection([{"name": "Opt"}, {"name": "Shock"}], client),
+            fetcher.fetch_collection([{"name": "Shock"}, {"name": "Duress"}], client)
+        )
+
+    first, second = asyncio.run(_with_client(requests, run))
+    sent = [
+        identifier["name"]
+        for request in requests
+        for identifier in json.loads(request.content)["identifiers"]
+    ]
+    assert sorted(sent) == ["Duress", "Opt", "Shock"]
+    assert [card["name"] for card in first] == ["Opt", "Shock"]
+    assert [card["name"] for card in second] == ["Shock", "Duress"]
+
+
+def test_followers_see_the_leaders_error():
+    flights = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*[flights.do("key", failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+    assert len(calls) == 2
+
+
+def test_inserting_an_existing_card_is_skipped(client):
+    row = {"name": "Conflict Card", "scryfall_id": "conflict-card"}
+    db = database.SessionLocal()
+    try:
+        assert insert_cards_ignoring_conflicts(db, [row]) == ["Conflict Card"]
+        # As if a concurrent import inserted the same card first
+        assert insert_cards_ignoring_conflicts(db, [row]) == []
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_concurrent_imports_fetch_each_card_once(client, scryfall_stub):
+    from sqlalchemy import func, select
+
+    from app.models import Card
+
+    scryfall_stub.latency = 0.2
+    names = [f"Stress Card {number}" for number in range(20)]
+    deck_text = "\n".join(f"2 {name}" for name in names[:15]) + "\n\n" + "\n".join(f"1 {name}" for name in names[15:])
+
+    # Direct imports and queued jobs of the same list, all in flight at once
+    responses = []
+    threads = [
+        threading.Thread(target=lambda number=number: responses.append(client.post(
+            "/api/decks/import", json={"name": f"Stress Deck {number}", "deck_text": deck_text}
+        )))
+        for number in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    jobs = [
+        client.post("/api/decks/import/jobs", json={"name": f"Stress Job {number}", "deck_text": deck_text}).json()
+        for number in range(4)
+    ]
+    for thread in threads:
+        thread.join()
+    for job in jobs:
+        with client.stream("GET", f"/api/decks/import/jobs/{job['id']}/events") as events:
+            "".join(events.iter_text())
+
+    assert [response.status_code for response in responses] == [201] * 4, [response.text for response in responses]
+    for response in responses:
+        assert sum(entry["quantity"] for entry in response.json()["cards"]) == 35
+    for job in jobs:
+        status = client.get(f"/api/decks/import/jobs/{job['id']}").json()
+        assert status["status"] == "succeeded", status["error"]
+        assert status["not_found"] == []
+
+    assert {name: scryfall_stub.identifiers[name.lower()] for name in names} == {name: 1 for name in names}
+    # The lookups really overlapped: later imports joined the first one's requests
+    assert get_default_fetcher()._flights.stats()["shared"] > 0
+
+    db = database.SessionLocal()
+    try:
+        duplicates = db.execute(
+            select(Card.scryfall_id).where(Card.name.like("Stress Card %"))
+            .group_by(Card.scryfall_id).having(func.count() > 1)
+        ).all()
+        stored = db.scalar(select(func.count()).select_from(Card).where(Card.name.like("Stress Card %")))
+    finally:
+        db.close()
+    assert duplicates == []
+    assert stored == len(names)